@@ -1,12 +1,28 @@
 """
 Main application entry point
 """
-import logging
-from flask import Flask
-from flask_socketio import SocketIO
-import os
 import config
 
+
+def _monkey_patch(async_mode: str):
+    """Make the standard library cooperative for eventlet/gevent.
+
+    Must run before Flask, Socket.IO or Redis are imported so their sockets,
+    locks and sleeps are green. Harmless if a gunicorn eventlet/gevent worker
+    already patched the process.
+    """
+    if async_mode == 'eventlet':
+        import eventlet
+        eventlet.monkey_patch()
+    elif async_mode == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+
+
+_monkey_patch(config.ASYNC_MODE)
+
+import logging
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,14 +32,27 @@ def create_app():
     Returns:
         tuple: Flask application and Socket.IO instance
     """
+    from flask import Flask
+    from flask_socketio import SocketIO
+
     # Initialize Flask application
     app = Flask(__name__)
     app.config['SECRET_KEY'] = config.SECRET_KEY
     # Initialize Socket.IO
-    socketio = SocketIO(app, async_mode='threading', cors_allowed_origins=config.CORS_ALLOWED_ORIGINS)
+    socketio = SocketIO(
+        app,
+        async_mode=config.ASYNC_MODE,
+        cors_allowed_origins=config.CORS_ALLOWED_ORIGINS,
+        message_queue=config.SOCKETIO_MESSAGE_QUEUE,
+        channel=config.SOCKETIO_CHANNEL,
+    )
+    if config.SOCKETIO_MESSAGE_QUEUE:
+        logger.info("Socket.IO message queue enabled (channel=%s)", config.SOCKETIO_CHANNEL)
 
     # Import services first (order matters to avoid circular imports)
-    from services import room_service, game_service
+    from services import room_service, game_service, recording_service, room_log
+    recording_service.start()
+    room_log.start_archiver(socketio)
 
     # Initialize networking components
     from networking import init_networking
@@ -33,20 +62,34 @@ def create_app():
     from routes import init_routes
     init_routes(app, socketio)
 
+    # Load the trial bank once the worker is up rather than on the first room
+    if config.PRELOAD_TRIAL_BANK:
+        from services import sequence_service
+        socketio.start_background_task(sequence_service.warm)
+
     return app, socketio
 
-# Create the application
-app, socketio = create_app()
+
+def __getattr__(name):
+    """Build the application on first access to ``app``/``socketio``
+    (gunicorn's ``app:app``), not when the module is imported"""
+    if name in ('app', 'socketio'):
+        global app, socketio
+        app, socketio = create_app()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Start the server if run directly
 if __name__ == '__main__':
+    app, socketio = create_app()
     logger.info("Starting Multiplayer Puzzle Game server...")
 
     # Print available routes for debugging
     logger.info("Available routes:")
     for rule in app.url_map.iter_rules():
-        logger.info(f"  {rule}")
+        logger.info("  %s", rule)
 
-    logger.info("Starting Socket.IO server...")
+    logger.info("Starting Socket.IO server (%s)...", config.ASYNC_MODE)
 
-    socketio.run(app, host="0.0.0.0", port=8000, debug=False, use_reloader=False)
+    socketio.run(app, host="0.0.0.0", port=config.PORT, debug=False, use_reloader=False)
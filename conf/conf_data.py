@@ -1,4 +1,4 @@
-import os.path as p
+import os
 
 # recordings_dir: str = p.join(
 #     "C:",
@@ -7,12 +7,23 @@ import os.path as p
 #     "helperhinderer-main",
 #     "recordings",
 # )
-recordings_dir: str = r"/home/shrinath/helperhinderer/recordings"
+recordings_dir: str = os.environ.get("RECORDINGS_DIR", r"/home/shrinath/helperhinderer/recordings")
+
+
+def ensure_recordings_dir() -> str:
+    """Create recordings_dir if needed and return it.
+
+    Checked on first use rather than at import, so importing this module never
+    fails on machines that do not record.
+    """
+    try:
+        os.makedirs(recordings_dir, exist_ok=True)
+    except OSError as e:
+        raise ValueError(
+            f"recordings_dir {recordings_dir} in conf_data.py does not exist and cannot be created ({e})"
+        ) from e
+    return recordings_dir
 
-if not p.exists(recordings_dir):
-    raise ValueError(
-        f"recordings_dir {recordings_dir} in conf_data.py does not exist, please create it"
-    )
 
 append_saver_blockProviderFilename: str = "block_provider.txt"
 append_saver_blockFilename: str = "blocks.txt"
@@ -20,3 +31,4 @@ append_saver_trialFilename: str = "trials.txt"
 append_saver_tickFilename: str = "engine_ticks.csv"
 append_saver_flipFilename: str = "ui_last_flip.csv"
 append_saver_gameStateFilename: str = "gameStates.txt"
+append_saver_eventFilename: str = "events.jsonl"
@@ -1,25 +1,91 @@
-# services/game_config.py
+# conf/game_config.py
+# Trial sequence played by every room (services/sequence_service.py).
+# Ported from assets/premade_blocks/test_blocks.py and
+# assets/premade_trials/test_trials.py: positions, target, who may enter it
+# ("capturer"), first turn and turn limit. Boxes, walls, reward decay and
+# split rewards have no counterpart in the engine and are left out; a
+# capture scores 1 point unless a trial sets "reward".
 GAME_CONFIG = {
-    "board_size": 4,
-    "trials": [
+    "board_size": 5,
+    "blocks": [
         {
-            # fixed starting positions for this trial
-            "start_positions": {
-                "R": [0, 0],    # player 0 (red)
-                "B": [3, 3],    # player 1 (blue)
-            },
-            "target": [2, 1],
-            "capturer": "R",   # only R can capture; B blocks
-            "time_limit_sec": 20000,
-            'turn':'R'
+            "descriptor": "Practice",
+            "count_scores": False,   # practice: no points
+            "instructions": [
+                "Dies ist eine Übungsrunde. Du erhältst keine Punkte.",
+                "Spieler 0 ist immer Rot. Spieler 1 ist immer Blau.",
+                "Verwende die Pfeiltasten, um dich zu bewegen. Du kannst bis zu 2 Züge pro Runde machen.",
+                "Drücke die Leertaste, um eine Box zu platzieren (falls erlaubt).",
+                "Der Spieler mit dem Stern über sich kann das Ziel betreten.",
+                "Der andere Spieler kann versuchen, eine Box in der Nähe zu bewegen oder zu platzieren (mit der Leertaste).",
+                "Probiere Bewegung, das Erreichen des Sterns und das Platzieren einer Box aus, um dich mit der Steuerung vertraut zu machen.",
+            ],
+            "trials": [
+                {"start_positions": {"R": [4, 0], "B": [4, 4]}, "target": [0, 4],
+                 "capturer": "R", "turn": "R", "max_turns": 20},
+                {"start_positions": {"R": [0, 0], "B": [0, 4]}, "target": [4, 0],
+                 "capturer": "B", "turn": "R", "max_turns": 20},
+            ],
         },
         {
-            "start_positions": { "R": [3, 0], "B": [0, 3] },
-            "target": [1, 2],
-            "capturer": "B",
-            "time_limit_sec": 20000,
-            'turn':'B'
+            "descriptor": "Hinderer",
+            "instructions": [
+                "Spieler 0 ist immer Rot. Spieler 1 ist immer Blau.",
+                "Der Spieler mit dem Stern über sich kann das Ziel betreten.",
+                "Der andere Spieler kann versuchen, mit der Leertaste eine Box zu platzieren oder zu bewegen, um den Spieler mit dem Stern zu blockieren.",
+                "Dein Ziel ist es, entweder den Stern zu erreichen (wenn du ihn hast) oder den anderen Spieler zu verlangsamen (wenn du ihn nicht hast).",
+                "Belohnung: Der Spieler, der den Stern erreicht, erhält die gesamte Belohnung.",
+            ],
+            "trials": [
+                {"start_positions": {"R": [0, 0], "B": [0, 4]}, "target": [2, 0],
+                 "capturer": "B", "turn": "R", "max_turns": 12},
+                {"start_positions": {"R": [0, 4], "B": [4, 4]}, "target": [0, 2],
+                 "capturer": "B", "turn": "R", "max_turns": 12},
+                {"start_positions": {"R": [4, 0], "B": [4, 4]}, "target": [2, 4],
+                 "capturer": "R", "turn": "R", "max_turns": 12},
+                {"start_positions": {"R": [0, 0], "B": [4, 0]}, "target": [4, 2],
+                 "capturer": "R", "turn": "R", "max_turns": 12},
+            ],
         },
-        # add more trials...
-    ]
+        {
+            "descriptor": "Helper",
+            "instructions": [
+                "Spieler 0 ist immer Rot. Spieler 1 ist immer Blau.",
+                "Der Spieler mit dem Stern über sich kann das Ziel betreten.",
+                "Der andere Spieler kann versuchen, mit der Leertaste eine nahegelegene Box zu bewegen oder zu entfernen, um dem Spieler mit dem Stern zu helfen, das Ziel zu erreichen.",
+                "Dein Ziel ist es, entweder den Stern zu erreichen (wenn du ihn hast) oder dem anderen Spieler zu helfen.",
+                "Belohnung: Wenn der Spieler mit dem Stern das Ziel erreicht, wird die Belohnung zwischen beiden Spielern aufgeteilt.",
+            ],
+            "trials": [
+                {"start_positions": {"R": [0, 4], "B": [0, 0]}, "target": [2, 0],
+                 "capturer": "R", "turn": "R", "max_turns": 12},
+                {"start_positions": {"R": [4, 4], "B": [0, 4]}, "target": [0, 2],
+                 "capturer": "R", "turn": "R", "max_turns": 12},
+                {"start_positions": {"R": [4, 4], "B": [4, 0]}, "target": [2, 4],
+                 "capturer": "B", "turn": "R", "max_turns": 15},
+                {"start_positions": {"R": [4, 0], "B": [0, 0]}, "target": [4, 2],
+                 "capturer": "B", "turn": "R", "max_turns": 12},
+            ],
+        },
+        {
+            "descriptor": "Unknown",
+            "instructions": [
+                "Spieler 0 ist immer Rot. Spieler 1 ist immer Blau.",
+                "Der Spieler mit dem Stern über sich kann das Ziel betreten.",
+                "Der andere Spieler kann entscheiden, ob er hilft oder hindert, indem er mit der Leertaste eine Box bewegt oder platziert.",
+                "Dein Ziel hängt davon ab, ob du helfen oder blockieren möchtest.",
+                "Belohnung: Manchmal wird die Belohnung geteilt. In anderen Fällen erhält nur der Spieler, der den Stern erreicht, die Belohnung.",
+            ],
+            "trials": [
+                {"start_positions": {"R": [0, 4], "B": [0, 0]}, "target": [2, 0],
+                 "capturer": "R", "turn": "R", "max_turns": 12},
+                {"start_positions": {"R": [4, 0], "B": [0, 0]}, "target": [0, 2],
+                 "capturer": "R", "turn": "R", "max_turns": 12},
+                {"start_positions": {"R": [4, 4], "B": [4, 0]}, "target": [2, 4],
+                 "capturer": "B", "turn": "R", "max_turns": 12},
+                {"start_positions": {"R": [4, 4], "B": [0, 4]}, "target": [4, 2],
+                 "capturer": "B", "turn": "R", "max_turns": 12},
+            ],
+        },
+    ],
 }
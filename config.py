@@ -4,23 +4,133 @@ Configuration settings for the application
 import logging
 import os
 
+import log_pipeline
+
 # Flask settings
 SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key')  # Change this in production
 DEBUG = os.environ.get('DEBUG', 'True').lower() == 'true'
 
+# Server concurrency model: 'threading' (OS threads), or a cooperative mode,
+# 'eventlet' or 'gevent' (green threads; the standard library is monkey patched
+# at startup so Redis calls yield instead of blocking the worker)
+ASYNC_MODE = os.environ.get('ASYNC_MODE', 'threading').lower()
+ASYNC_MODES = ('threading', 'eventlet', 'gevent')
+if ASYNC_MODE not in ASYNC_MODES:
+    raise ValueError(f"ASYNC_MODE must be one of {ASYNC_MODES}, got {ASYNC_MODE!r}")
+PORT = int(os.environ.get('PORT', 8000))
+
+# Redis connection pool (shared by all handlers of a worker; green-safe once patched)
+REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', 50))
+REDIS_POOL_TIMEOUT = float(os.environ.get('REDIS_POOL_TIMEOUT', 5))
+
 # Socket.IO settings
 CORS_ALLOWED_ORIGINS = "*"
+# Message queue shared by all workers so emits reach sockets held by any process.
+# Leave unset for a single worker; set to a Redis URL (e.g. redis://localhost:6379/0)
+# when running several workers behind the room-affinity proxy (deploy/nginx).
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE') or None
+SOCKETIO_CHANNEL = os.environ.get('SOCKETIO_CHANNEL', 'flask-socketio')
 
 # Game settings
 DEFAULT_MAX_PLAYERS = 2
 ROOM_CODE_LENGTH = 6
+# Load the trial bank in the background right after startup (it is never
+# loaded at import); False leaves it to the first room
+PRELOAD_TRIAL_BANK = os.environ.get('PRELOAD_TRIAL_BANK', 'True').lower() == 'true'
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging: records are queued and written by a background thread
+# (log_pipeline). LOG_FORMAT 'text' (classic lines + key=value fields) or 'kv';
+# LOG_RATES caps INFO/DEBUG records per second per message template of a
+# logger, e.g. "networking.socket_events=20"; LOG_LEVELS sets single loggers,
+# e.g. "models.game_room=WARNING"
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text').lower()
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+LOG_RATES = os.environ.get('LOG_RATES', 'networking.socket_events=20,models.game_room=20')
+LOG_LEVELS = os.environ.get('LOG_LEVELS', '')
+log_pipeline.configure(LOG_LEVEL, LOG_FORMAT, LOG_QUEUE_SIZE,
+                       log_pipeline.parse_spec(LOG_RATES), log_pipeline.parse_spec(LOG_LEVELS))
 logger = logging.getLogger(__name__)
 
+# Reconnect/resume: events kept per room for replay, and how long they live
+ROOM_EVENT_BUFFER = int(os.environ.get('ROOM_EVENT_BUFFER', 64))
+ROOM_EVENT_TTL = int(os.environ.get('ROOM_EVENT_TTL', 6 * 3600))
+
+# /api/rooms: in-process cache lifetime for listing pages (seconds), max page size
+ROOM_LIST_CACHE_TTL = float(os.environ.get('ROOM_LIST_CACHE_TTL', 2.0))
+ROOM_LIST_MAX_LIMIT = 200
+# /api/room/<code>: serialized responses cached per room (latest version only)
+ROOM_INFO_CACHE_SIZE = int(os.environ.get('ROOM_INFO_CACHE_SIZE', 512))
+
+# Move rate limits (token buckets: sustained moves/sec, burst size)
+MOVE_RATE_PER_SID = float(os.environ.get('MOVE_RATE_PER_SID', 10))
+MOVE_BURST_PER_SID = float(os.environ.get('MOVE_BURST_PER_SID', 5))
+MOVE_RATE_PER_ROOM = float(os.environ.get('MOVE_RATE_PER_ROOM', 20))
+MOVE_BURST_PER_ROOM = float(os.environ.get('MOVE_BURST_PER_ROOM', 10))
+
+# Presence: a socket is online while it heartbeats; sessions silent for
+# PRESENCE_TTL seconds are swept every PRESENCE_SWEEP_INTERVAL seconds. A player
+# offline for PRESENCE_GRACE seconds loses their seat (the room goes with its
+# last player)
+PRESENCE_TTL = int(os.environ.get('PRESENCE_TTL', 30))
+PRESENCE_HEARTBEAT_INTERVAL = int(os.environ.get('PRESENCE_HEARTBEAT_INTERVAL', 10))
+PRESENCE_SWEEP_INTERVAL = float(os.environ.get('PRESENCE_SWEEP_INTERVAL', 10))
+PRESENCE_GRACE = float(os.environ.get('PRESENCE_GRACE', 60))
+
+# Moderator dashboard: push period, forced refresh period (presence/RTT) and
+# maximum rooms per subscription
+DASHBOARD_INTERVAL = float(os.environ.get('DASHBOARD_INTERVAL', 1.0))
+DASHBOARD_REFRESH = float(os.environ.get('DASHBOARD_REFRESH', 5.0))
+DASHBOARD_MAX_ROOMS = int(os.environ.get('DASHBOARD_MAX_ROOMS', 100))
+
+# Game event recording (services/recording_service.py): bounded queue, writer
+# batch size and flush period, and fsync policy ('always', 'interval', 'never')
+RECORDING_ENABLED = os.environ.get('RECORDING_ENABLED', 'True').lower() == 'true'
+RECORDING_QUEUE_SIZE = int(os.environ.get('RECORDING_QUEUE_SIZE', 10000))
+RECORDING_BATCH_SIZE = int(os.environ.get('RECORDING_BATCH_SIZE', 500))
+RECORDING_FLUSH_INTERVAL = float(os.environ.get('RECORDING_FLUSH_INTERVAL', 0.5))
+RECORDING_FSYNC = os.environ.get('RECORDING_FSYNC', 'interval')
+RECORDING_FSYNC_INTERVAL = float(os.environ.get('RECORDING_FSYNC_INTERVAL', 5.0))
+RECORDING_MAX_OPEN_FILES = int(os.environ.get('RECORDING_MAX_OPEN_FILES', 64))
+# Pack a room's recording into the columnar events.hhc when its game ends
+RECORDING_PACK_ON_FINISH = os.environ.get('RECORDING_PACK_ON_FINISH', 'True').lower() == 'true'
+
+# Room mutation log (Redis Streams): entries kept per room, snapshot period,
+# stream TTL after the last write, and the disk archiver (consumer group)
+ROOM_LOG_MAXLEN = int(os.environ.get('ROOM_LOG_MAXLEN', 5000))
+ROOM_LOG_SNAPSHOT_EVERY = int(os.environ.get('ROOM_LOG_SNAPSHOT_EVERY', 50))
+ROOM_LOG_TTL = int(os.environ.get('ROOM_LOG_TTL', 7 * 86400))
+ROOM_LOG_ARCHIVER = os.environ.get('ROOM_LOG_ARCHIVER', 'True').lower() == 'true'
+ROOM_LOG_ARCHIVE_INTERVAL = float(os.environ.get('ROOM_LOG_ARCHIVE_INTERVAL', 2.0))
+ROOM_LOG_ARCHIVE_BATCH = int(os.environ.get('ROOM_LOG_ARCHIVE_BATCH', 1000))
+ROOM_LOG_ARCHIVE_STREAMS = 100       # streams per XREADGROUP call
+ROOM_LOG_CLAIM_IDLE = float(os.environ.get('ROOM_LOG_CLAIM_IDLE', 60.0))
+
+# /metrics (Prometheus text format); when METRICS_TOKEN is set scrapers must
+# send "Authorization: Bearer <token>"
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Per-event Redis command/latency/payload profile (/metrics/redis); adds a
+# little overhead to every Redis call, so off by default
+REDIS_PROFILE = os.environ.get('REDIS_PROFILE', 'False').lower() == 'true'
+
+# Move traces (trace_service): fraction of board_update moves traced end to
+# end, and how many finished traces each worker keeps for /debug/traces.
+# The endpoint is off unless TRACE_TOKEN is set, and callers must send
+# "Authorization: Bearer <token>".
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 0.01))
+TRACE_BUFFER_SIZE = int(os.environ.get('TRACE_BUFFER_SIZE', 2000))
+TRACE_TOKEN = os.environ.get('TRACE_TOKEN', '')
+
+# On-demand CPU/memory profiling of a live worker (/debug/profile,
+# /debug/memory); off unless PROFILE_TOKEN is set, and callers must send
+# "Authorization: Bearer <token>". Runs last at most PROFILE_MAX_SECONDS.
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILE_MAX_SECONDS = float(os.environ.get('PROFILE_MAX_SECONDS', 60))
+
+# Session replay: snapshot period (moves); seeking replays at most this many
+REPLAY_SNAPSHOT_EVERY = int(os.environ.get('REPLAY_SNAPSHOT_EVERY', 64))
+
 # Game constants
 TICK_RATE = 0.05  # 20 FPS
\ No newline at end of file
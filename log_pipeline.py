@@ -0,0 +1,330 @@
+"""
+Non-blocking, structured logging for the whole process.
+
+``configure`` replaces the root handlers with one that only enqueues the
+record. A background OS thread formats and writes the records, so the caller
+never waits on stderr/journald. With eventlet or gevent this is still a
+real thread, started through the unpatched ``_thread`` module, because a
+green thread would block the hub on every write. Messages are formatted lazily, in
+the writer: log with ``%s`` arguments or ``extra`` fields, never f-strings,
+and pass scalars (the record is formatted after the call returns, so a
+mutable argument may have changed by then).
+
+Fields passed as ``extra`` are written as ``key=value`` pairs::
+
+    logger.info("player moved", extra={"room": code, "player": pid, "dx": dx, "dy": dy})
+
+``LOG_FORMAT=kv`` writes the whole line as pairs (``ts= level= logger=
+msg= ...``). ``text`` keeps the classic layout and appends the pairs.
+
+High-frequency messages are sampled per logger. ``LOG_RATES`` and
+``set_rate`` give a logger (and its children) a budget in records per
+second for each message template. A template that exceeds its budget is
+skipped, and the next record written for it carries ``sampled=N`` (the
+number skipped). Warnings and errors are never sampled. ``LOG_LEVELS``
+raises or lowers single loggers. A record that arrives while
+LOG_QUEUE_SIZE records are already waiting is dropped and counted in
+``get_stats``.
+"""
+import _thread
+import atexit
+import logging
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# LogRecord attributes; anything else on a record came from ``extra``
+_RESERVED = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime", "sampled"}
+_MAX_TEMPLATES = 4096
+
+_stats = {"queued": 0, "written": 0, "dropped": 0, "sampled": 0}
+
+
+def parse_spec(spec: str) -> Dict[str, str]:
+    """``"a.b=1,c=WARNING"`` -> ``{"a.b": "1", "c": "WARNING"}``"""
+    out = {}
+    for part in (spec or "").split(","):
+        name, sep, value = part.strip().partition("=")
+        if sep and name.strip():
+            out[name.strip()] = value.strip()
+    return out
+
+
+# ----------------------- Formatting -----------------------
+def _quote(value) -> str:
+    s = str(value)
+    if not s or any(c in s for c in ' ="\n\\'):
+        return '"' + s.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+    return s
+
+
+def _fields(record: logging.LogRecord) -> str:
+    pairs = [f"{k}={_quote(v)}" for k, v in record.__dict__.items() if k not in _RESERVED]
+    if getattr(record, "sampled", 0):
+        pairs.append(f"sampled={record.sampled}")
+    return " ".join(pairs)
+
+
+def _message(record: logging.LogRecord) -> str:
+    try:
+        return record.getMessage()
+    except Exception as e:  # bad %-args must not kill the writer
+        return f"{record.msg!r} % {record.args!r} ({e})"
+
+
+class TextFormatter(logging.Formatter):
+    """Classic ``asctime - name - level - message`` lines, then the extra fields"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    def format(self, record):
+        record.message = _message(record)
+        record.asctime = self.formatTime(record)
+        line = self.formatMessage(record)
+        fields = _fields(record)
+        if fields:
+            line = f"{line} | {fields}"
+        if record.exc_info:
+            line = f"{line}\n{self.formatException(record.exc_info)}"
+        if record.stack_info:
+            line = f"{line}\n{self.formatStack(record.stack_info)}"
+        return line
+
+
+class KeyValueFormatter(logging.Formatter):
+    """One ``key=value`` line per record; tracebacks are escaped onto the line"""
+
+    def format(self, record):
+        ts = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}"
+        line = (f"ts={ts} level={record.levelname.lower()} logger={record.name} "
+                f"msg={_quote(_message(record))}")
+        fields = _fields(record)
+        if fields:
+            line = f"{line} {fields}"
+        if record.exc_info:
+            line = f"{line} exc={_quote(self.formatException(record.exc_info))}"
+        return line
+
+
+# ----------------------- Sampling -----------------------
+class RateFilter(logging.Filter):
+    """Per-logger budget of records per second for each message template
+
+    Runs in the caller's thread, before the record is queued; a skipped record
+    costs one dict lookup and a little arithmetic.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._rates: Dict[str, Tuple[float, float]] = {}          # logger prefix -> (rate, burst)
+        self._resolved: Dict[str, Optional[Tuple[float, float]]] = {}
+        # (logger, template) -> [tokens, last refill, skipped since last written]
+        self._buckets: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def set_rate(self, name: str, per_second: Optional[float], burst: Optional[float] = None) -> None:
+        with self._lock:
+            if per_second is None:
+                self._rates.pop(name, None)
+            else:
+                self._rates[name] = (float(per_second), float(burst if burst is not None else max(1.0, per_second)))
+            self._resolved.clear()
+            self._buckets.clear()
+
+    def _rate_for(self, name: str) -> Optional[Tuple[float, float]]:
+        if name in self._resolved:
+            return self._resolved[name]
+        rate, probe = None, name
+        while probe:
+            if probe in self._rates:
+                rate = self._rates[probe]
+                break
+            probe = probe.rpartition(".")[0]
+        self._resolved[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self._rates:
+            return True
+        with self._lock:
+            rate = self._rate_for(record.name)
+            if rate is None:
+                return True
+            per_second, burst = rate
+            key = (record.name, str(record.msg))
+            now = time.monotonic()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= _MAX_TEMPLATES:
+                    self._buckets.clear()
+                bucket = self._buckets[key] = [burst, now, 0]
+            else:
+                bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * per_second)
+                bucket[1] = now
+            if bucket[0] < 1.0:
+                bucket[2] += 1
+                _bump("sampled")
+                return False
+            bucket[0] -= 1.0
+            if bucket[2]:
+                record.sampled, bucket[2] = bucket[2], 0
+            return True
+
+
+# ----------------------- Queue and writer -----------------------
+class QueueHandler(logging.Handler):
+    """Enqueues records untouched; formatting happens in the writer thread"""
+
+    def __init__(self, q: "queue.SimpleQueue", capacity: int):
+        super().__init__()
+        self.queue = q
+        self.capacity = capacity
+
+    def handle(self, record):
+        # no handler lock: SimpleQueue.put is atomic and never blocks
+        if self.filter(record):
+            self.emit(record)
+        return record
+
+    def emit(self, record):
+        if self.queue.qsize() >= self.capacity:
+            _bump("dropped")
+            return
+        _bump("queued")
+        self.queue.put(record)
+
+
+_STOP = object()
+
+
+def _writer(q: "queue.SimpleQueue", handlers, done) -> None:
+    try:
+        while True:
+            record = q.get()
+            if record is _STOP:
+                return
+            for handler in handlers:
+                if record.levelno >= handler.level:
+                    try:
+                        handler.handle(record)
+                    except Exception:
+                        handler.handleError(record)
+            _bump("written")
+    finally:
+        done.release()
+
+
+def os_thread_api():
+    """``(start_new_thread, allocate_lock)`` of real OS threads, even after
+    eventlet/gevent monkey patching
+
+    The low-level ``_thread`` API is used rather than ``threading.Thread``:
+    a Thread started before monkey patching fails its own bookkeeping on exit
+    once ``threading`` has been greened.
+    """
+    if "eventlet" in sys.modules:
+        from eventlet import patcher
+        if patcher.is_monkey_patched("thread"):
+            real = patcher.original("_thread")
+            return real.start_new_thread, real.allocate_lock
+    if "gevent" in sys.modules:
+        from gevent import monkey
+        if monkey.is_module_patched("_thread"):
+            return (monkey.get_original("_thread", "start_new_thread"),
+                    monkey.get_original("_thread", "allocate_lock"))
+    return _thread.start_new_thread, _thread.allocate_lock
+
+
+def os_thread_ident() -> int:
+    """Id of the OS thread running the caller, even after eventlet/gevent
+    monkey patching (the patched ``threading.get_ident`` names the greenlet)
+    """
+    if "eventlet" in sys.modules:
+        from eventlet import patcher
+        if patcher.is_monkey_patched("thread"):
+            return patcher.original("_thread").get_ident()
+    if "gevent" in sys.modules:
+        from gevent import monkey
+        if monkey.is_module_patched("_thread"):
+            return monkey.get_original("_thread", "get_ident")()
+    return _thread.get_ident()
+
+
+# Counters are bumped from handler threads and the writer (a real OS thread
+# in every mode), so they need a real lock; it is held for one addition.
+_stats_lock = os_thread_api()[1]()
+
+
+def _bump(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+_queue: Optional["queue.SimpleQueue"] = None
+_done = None        # held while the writer runs
+_rate_filter = RateFilter()
+
+
+def configure(level: str = "INFO", fmt: str = "text", capacity: int = 10000,
+              rates: Optional[Dict[str, str]] = None, levels: Optional[Dict[str, str]] = None) -> None:
+    """Route all logging through the queue and start the writer thread
+
+    Args:
+        level: Root level
+        fmt: 'text' or 'kv'
+        capacity: Records waiting for the writer before new ones are dropped
+        rates: logger -> records/second per message template (``LOG_RATES``)
+        levels: logger -> level name (``LOG_LEVELS``)
+    """
+    global _queue, _done
+    if _done is not None:
+        return
+    out = logging.StreamHandler(sys.stderr)
+    out.setFormatter(KeyValueFormatter() if fmt == "kv" else TextFormatter())
+
+    _queue = queue.SimpleQueue()
+    handler = QueueHandler(_queue, capacity)
+    handler.addFilter(_rate_filter)
+    for name, rate in (rates or {}).items():
+        _rate_filter.set_rate(name, float(rate))
+
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+    for name, lvl in (levels or {}).items():
+        logging.getLogger(name).setLevel(lvl.upper())
+
+    start_new_thread, allocate_lock = os_thread_api()
+    _done = allocate_lock()
+    _done.acquire()
+    start_new_thread(_writer, (_queue, [out], _done))
+    atexit.register(shutdown)
+
+
+def set_rate(name: str, per_second: Optional[float], burst: Optional[float] = None) -> None:
+    """Limit INFO/DEBUG records of logger ``name`` (and children) to
+    ``per_second`` per message template; None removes the limit"""
+    _rate_filter.set_rate(name, per_second, burst)
+
+
+def shutdown(timeout: float = 2.0) -> None:
+    """Write what is queued and stop the writer"""
+    global _done
+    if _done is None:
+        return
+    _queue.put(_STOP)
+    if _done.acquire(timeout=timeout):
+        _done.release()
+    _done = None
+
+
+def get_stats() -> Dict[str, int]:
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["depth"] = _queue.qsize() if _queue is not None else 0
+    return stats
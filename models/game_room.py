@@ -3,18 +3,21 @@ Game room model for managing players and game state
 """
 from typing import Dict, List, Optional
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 class GameRoom:
     """Class representing a game room with players"""
 
-    def __init__(self, room_code: str, max_players: int = 2):
+    def __init__(self, room_code: str, max_players: int = 2, load_sequence: bool = True):
         """Initialize a new game room
 
         Args:
             room_code: Unique identifier for the room
             max_players: Maximum number of players allowed (excluding moderator)
+            load_sequence: Position the room on the first trial of the sequence
+                (skipped by from_meta, which restores it from storage)
         """
         self.room_code = room_code
         self.players = {}  # player_id -> player_info
@@ -22,36 +25,44 @@ class GameRoom:
         self.started = False
         self.active = True
         self.moderator_id = None  # Special ID for moderator (not a player)
+        self.created_at = time.time()
         self.engine = None
         self.ui = None
         self.playerInput = None
 
         # --- NEW: game config snapshot on room creation ---
-        # We read the game config immediately and store:
-        #   - self.trials: full list of trials
-        #   - self.current_trial_index: index of the active trial (starts at 0)
+        # We read the first block of the trial sequence immediately and store:
+        #   - self.trials: trials of the current block
+        #   - self.current_block_index / current_trial_index: the active trial
+        #   - self.next_trial: prefetched layout of the following trial
         self.trials: List[dict] = []
+        self.current_block_index: int = 0
         self.current_trial_index: int = 0
+        self.next_trial: Optional[dict] = None
+        self.scores: Dict[str, float] = {"R": 0, "B": 0}
+        self.finished = False
+        if not load_sequence:
+            return
         try:
             # Import here to avoid unexpected import cycles
-            from conf import game_config  # contains GAME_CONFIG
-            cfg = getattr(game_config, "GAME_CONFIG", {}) or {}
-            trials = cfg.get("trials", [])
-            # Make a shallow copy so room has its own snapshot
-            self.trials = list(trials) if isinstance(trials, list) else []
-            self.current_trial_index = 0
-            # logger.info(
-            #     f"[{self.room_code}] Loaded game config: {len(self.trials)} trials; current_trial_index set to 0"
-            # )
+            from services import sequence_service
+            sequence_service.begin(self)
         except Exception as e:
-            logger.exception(f"[{self.room_code}] Failed to load GAME_CONFIG trials: {e}")
+            logger.exception("[%s] Failed to load trial sequence: %s", self.room_code, e)
             # leave trials empty and index 0; game_service can still populate later if needed
 
         # logger.info(f"Created game room {room_code} with max {max_players} players")
     
-    def update_player_position(self, player_id: str, dx: int, dy: int) -> bool:
+    def player_role(self, player_id: str) -> Optional[str]:
+        """Return 'R' or 'B' for a real player, None for unknown players"""
+        player_info = self.players.get(player_id)
+        if not player_info or player_info.get("moderator"):
+            return None
+        return "R" if player_info.get("player_number") == 0 else "B"
+
+    def check_move(self, player_id: str, dx: int, dy: int) -> Optional[str]:
         """
-        Update a player's position in the current trial and toggle turn.
+        Validate a move against the current trial without applying it.
 
         Args:
             player_id: ID of the player moving
@@ -59,42 +70,102 @@ class GameRoom:
             dy: delta y
 
         Returns:
-            bool: True if update succeeded, False otherwise
+            str: rejection reason, or None if the move is legal
         """
-        try:
-            current_trial_index = int(self.current_trial_index or 0)
-        except Exception:
-            current_trial_index = 0
+        if self.finished:
+            return "game_finished"
 
-        if not self.trials or not (0 <= current_trial_index < len(self.trials)):
-            logger.warning(f"[{self.room_code}] update_player_position: No active trial")
-            return False
+        trial = self.current_trial()
+        if not trial:
+            return "no_active_trial"
 
-        trial = self.trials[current_trial_index]
+        role = self.player_role(player_id)
+        if role is None:
+            return "unknown_player"
 
-        # Determine role (R or B) based on player_number
-        player_info = self.players.get(player_id)
-        if not player_info:
-            logger.warning(f"[{self.room_code}] update_player_position: Player not found {player_id}")
-            return False
+        if trial.get("turn") and trial["turn"] != role:
+            return "not_your_turn"
 
-        role = "R" if player_info.get("player_number") == 0 else "B"
+        if not isinstance(dx, int) or not isinstance(dy, int) or abs(dx) + abs(dy) != 1:
+            return "invalid_step"
 
-        old_pos = trial.get("start_positions", {}).get(role)
+        positions = trial.get("start_positions", {})
+        old_pos = positions.get(role)
         if not old_pos:
-            logger.warning(f"[{self.room_code}] update_player_position: No old pos for {role}")
+            return "no_position"
+
+        new_pos = [old_pos[0] + dx, old_pos[1] + dy]
+        size = int(trial.get("board_size") or 4)
+        if not (0 <= new_pos[0] < size and 0 <= new_pos[1] < size):
+            return "out_of_bounds"
+
+        other = positions.get("B" if role == "R" else "R")
+        if other and list(other) == new_pos:
+            return "occupied"
+
+        if list(trial.get("target") or []) == new_pos and trial.get("capturer") != role:
+            return "target_blocked"
+
+        return None
+
+    def update_player_position(self, player_id: str, dx: int, dy: int) -> bool:
+        """
+        Update a player's position in the current trial and toggle turn.
+
+        Args:
+            player_id: ID of the player moving
+            dx: delta x
+            dy: delta y
+
+        Returns:
+            bool: True if update succeeded, False otherwise
+        """
+        reason = self.check_move(player_id, dx, dy)
+        if reason:
+            logger.warning("move rejected", extra={"room": self.room_code, "player": player_id, "reason": reason})
             return False
 
+        trial = self.current_trial()
+        role = self.player_role(player_id)
+        old_pos = trial["start_positions"][role]
+
         # Compute new position
         new_pos = [old_pos[0] + dx, old_pos[1] + dy]
         trial["start_positions"][role] = new_pos
 
-        logger.info(f"[{self.room_code}] Player {player_id} ({role}) moved {dx},{dy} → {new_pos}")
+        logger.info("player moved", extra={"room": self.room_code, "player": player_id, "role": role,
+                                           "dx": dx, "dy": dy, "x": new_pos[0], "y": new_pos[1]})
 
         # Toggle turn
         trial["turn"] = "B" if trial.get("turn") == "R" else "R"
+        trial["turns_taken"] = int(trial.get("turns_taken", 0)) + 1
 
         return True
+
+    def current_trial(self) -> Optional[dict]:
+        """Return the active trial dict, or None if there is none"""
+        if 0 <= self.current_trial_index < len(self.trials):
+            return self.trials[self.current_trial_index]
+        return None
+
+    def trial_outcome(self) -> Optional[str]:
+        """Check whether the active trial has ended
+
+        Returns:
+            str: 'target_reached' or 'max_turns' if the trial is over, else None
+        """
+        trial = self.current_trial()
+        if not trial or self.finished:
+            return None
+        capturer = trial.get("capturer")
+        pos = trial.get("start_positions", {}).get(capturer)
+        if pos is not None and list(pos) == list(trial.get("target") or []):
+            return "target_reached"
+        max_turns = trial.get("max_turns")
+        if max_turns and int(trial.get("turns_taken", 0)) >= int(max_turns):
+            return "max_turns"
+        return None
+
     def add_player(self, player_id: str, username: str, is_moderator: bool = False) -> bool:
         """Add a player to the room
 
@@ -106,10 +177,6 @@ class GameRoom:
         Returns:
             bool: True if player was added successfully, False otherwise
         """
-        logger.info(
-            f"Adding {'moderator' if is_moderator else 'player'} {username} ({player_id}) to room {self.room_code}"
-        )
-
         if is_moderator:
             self.players[player_id] = {
                 "username": username,
@@ -118,13 +185,13 @@ class GameRoom:
                 "role": None,  # moderators don’t get a role
             }
             self.moderator_id = player_id
-            logger.info(f"Set moderator ID to {player_id}")
+            logger.info("moderator added", extra={"room": self.room_code, "player": player_id, "username": username})
             return True
 
         # Get only non-moderator players
         real_players = [pid for pid, pdata in self.players.items() if not pdata.get("moderator", False)]
         if len(real_players) >= self.max_players:
-            logger.warning(f"Room {self.room_code} is full. Cannot add player {player_id}")
+            logger.warning("room full", extra={"room": self.room_code, "player": player_id})
             return False
 
         player_number = len(real_players)
@@ -140,7 +207,8 @@ class GameRoom:
             "role": role,
         }
 
-        logger.info(f"Added player {username} as player number {player_number} with role {role}")
+        logger.info("player added", extra={"room": self.room_code, "player": player_id, "username": username,
+                                           "number": player_number, "role": role})
         return True
 
 
@@ -158,7 +226,7 @@ class GameRoom:
         if player_id in self.players:
             is_moderator = self.players[player_id].get('moderator', False)
 
-            logger.info(f"Removing player {player_id} from room {self.room_code}")
+            logger.info("Removing player %s from room %s", player_id, self.room_code)
             del self.players[player_id]
 
             if is_moderator and self.moderator_id == player_id:
@@ -167,7 +235,7 @@ class GameRoom:
                 for pid in self.players:
                     self.players[pid]['moderator'] = True
                     self.moderator_id = pid
-                    logger.info(f"Promoted player {pid} to moderator")
+                    logger.info("Promoted player %s to moderator", pid)
                     break
 
             if not is_moderator:
@@ -176,7 +244,7 @@ class GameRoom:
                 for idx, pid in enumerate(real_players):
                     self.players[pid]['player_number'] = idx
 
-                logger.info(f"Reassigned player numbers after player {player_id} left")
+                logger.info("Reassigned player numbers after player %s left", player_id)
 
             return True
         return False
@@ -189,23 +257,19 @@ class GameRoom:
 
         # 1. Check if the expected number of players is present
         if len(real_players) < self.max_players:
-            logger.warning(
-                f"Cannot start game in room {self.room_code}. Not enough players: "
-                f"{len(real_players)}/{self.max_players}"
-            )
+            logger.warning("Cannot start game in room %s. Not enough players: %s/%s",
+                           self.room_code, len(real_players), self.max_players)
             return False
 
         # 2. Check readiness of all non-moderator players
         not_ready = [pdata["username"] for pdata in real_players if not pdata.get("ready", False)]
         if not_ready:
-            logger.warning(
-                f"Cannot start game in room {self.room_code}. Players not ready: {not_ready}"
-            )
+            logger.warning("Cannot start game in room %s. Players not ready: %s", self.room_code, not_ready)
             return False
 
         # 3. All conditions met → start the game
         self.started = True
-        logger.info(f"Game successfully started in room {self.room_code}")
+        logger.info("Game successfully started in room %s", self.room_code)
         return True
 
 
@@ -219,6 +283,26 @@ class GameRoom:
             # --- NEW (optional to expose in debug/UI): ---
             'trials_count': len(self.trials),
             'current_trial_index': self.current_trial_index,
+            'current_block_index': self.current_block_index,
+            'scores': self.scores,
+            'finished': self.finished,
+        }
+
+    def status(self) -> str:
+        """Lifecycle status used for listing: 'waiting', 'playing' or 'finished'"""
+        if self.finished:
+            return "finished"
+        return "playing" if self.started else "waiting"
+
+    def to_summary(self) -> dict:
+        """Small listing record (kept in Redis next to the full room)"""
+        return {
+            'room_code': self.room_code,
+            'player_count': len([p for p in self.players.values() if not p.get('moderator', False)]),
+            'max_players': self.max_players,
+            'started': self.started,
+            'status': self.status(),
+            'created_at': self.created_at,
         }
 
     def to_meta(self) -> dict:
@@ -230,22 +314,32 @@ class GameRoom:
             "started": self.started,
             "active": self.active,
             "moderator_id": self.moderator_id,
+            "created_at": self.created_at,
             # --- NEW: persist config snapshot & pointer ---
             "trials": self.trials,
             "current_trial_index": self.current_trial_index,
+            "current_block_index": self.current_block_index,
+            "next_trial": self.next_trial,
+            "scores": self.scores,
+            "finished": self.finished,
         }
 
     @staticmethod
     def from_meta(meta: dict) -> "GameRoom":
         """Rebuild a GameRoom (engine/ui will be None; attach later if present)."""
-        room = GameRoom(meta["room_code"], meta.get("max_players", 2))
+        room = GameRoom(meta["room_code"], meta.get("max_players", 2), load_sequence=False)
         room.players = meta.get("players", {})
         room.started = meta.get("started", False)
         room.active = meta.get("active", True)
         room.moderator_id = meta.get("moderator_id")
+        room.created_at = meta.get("created_at", 0)
 
         # --- NEW: restore config snapshot & pointer ---
         room.trials = meta.get("trials", [])
         room.current_trial_index = int(meta.get("current_trial_index", 0))
+        room.current_block_index = int(meta.get("current_block_index", 0))
+        room.next_trial = meta.get("next_trial")
+        room.scores = meta.get("scores", {"R": 0, "B": 0})
+        room.finished = meta.get("finished", False)
 
         return room
@@ -4,6 +4,8 @@ Networking package
 import logging
 from flask_socketio import SocketIO
 
+import config
+
 logger = logging.getLogger(__name__)
 
 def init_networking(socketio: SocketIO, room_service=None, game_service=None):
@@ -18,8 +20,25 @@ def init_networking(socketio: SocketIO, room_service=None, game_service=None):
 
     # Import here to avoid circular import
     from .socket_events import init_socket_events
+    from .dashboard import init_dashboard_events
+
+    # Time every handler registered below
+    if config.METRICS_ENABLED:
+        from services import metrics
+        metrics.instrument_socketio(socketio)
+
+    # Charge Redis traffic to the event that issued it
+    if config.REDIS_PROFILE:
+        from services import redis_profile
+        redis_profile.instrument_socketio(socketio)
+
+    # Let /debug/profile runs see (and scope to) individual handlers
+    if config.PROFILE_TOKEN:
+        from services import profiling_service
+        profiling_service.instrument_socketio(socketio)
 
     # Initialize Socket.IO event handlers
     init_socket_events(socketio, room_service, game_service)
+    init_dashboard_events(socketio, room_service)
 
     logger.info("Networking initialization complete")
\ No newline at end of file
@@ -0,0 +1,144 @@
+"""
+Moderator dashboard stream
+
+A dashboard socket subscribes to many rooms at once by proving it moderates
+each of them (``{room_code, player_id}`` pairs checked against
+``GameRoom.moderator_id``). It does not join the rooms' Socket.IO rooms, so
+it never receives per-move traffic. Instead one background loop per worker
+wakes every DASHBOARD_INTERVAL seconds, finds the subscribed rooms whose
+event seq moved since the last push (one MGET), rebuilds only those
+summaries (batched reads) and sends each subscriber a single
+``dashboard_update`` with the rooms it watches. However many moves happen in
+an interval, a room costs one summary per push. Presence and latency, which
+do not advance the seq, are refreshed every DASHBOARD_REFRESH seconds.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Set
+
+from flask import request
+
+import config
+from services import dashboard_service, room_events
+
+logger = logging.getLogger(__name__)
+
+socketio = None
+room_service = None
+
+_lock = threading.Lock()
+_subs: Dict[str, Set[str]] = {}   # sid -> room codes
+_sent_seq: Dict[str, int] = {}    # room code -> seq of the last summary pushed
+
+
+def _watched() -> Set[str]:
+    with _lock:
+        return set().union(*_subs.values()) if _subs else set()
+
+
+def forget(sid: str) -> None:
+    """Drop a socket's subscriptions (on disconnect)"""
+    with _lock:
+        _subs.pop(sid, None)
+        watched = set().union(*_subs.values()) if _subs else set()
+        for code in list(_sent_seq):
+            if code not in watched:
+                del _sent_seq[code]
+
+
+def _push(force: bool = False) -> int:
+    """One aggregation pass; returns the number of summaries rebuilt"""
+    watched = _watched()
+    if not watched:
+        return 0
+    seqs = room_events.current_seqs(sorted(watched))
+    with _lock:
+        changed = [c for c, seq in seqs.items() if force or _sent_seq.get(c) != seq]
+    if not changed:
+        return 0
+
+    summaries = dashboard_service.room_summaries(changed)
+    with _lock:
+        # a room forgotten while the summaries were read stays forgotten
+        watched = set().union(*_subs.values()) if _subs else set()
+        for code in changed:
+            if code in watched:
+                _sent_seq[code] = seqs[code]
+        targets = [(sid, rooms & set(changed)) for sid, rooms in _subs.items()]
+    now = time.time()
+    for sid, rooms in targets:
+        if rooms:
+            socketio.emit('dashboard_update', {
+                'ts': now,
+                'rooms': {code: summaries[code] for code in sorted(rooms)},
+            }, to=sid)
+    return len(changed)
+
+
+def _run() -> None:
+    last_refresh = time.monotonic()
+    while True:
+        socketio.sleep(config.DASHBOARD_INTERVAL)
+        refresh = time.monotonic() - last_refresh >= config.DASHBOARD_REFRESH
+        if refresh:
+            last_refresh = time.monotonic()
+        try:
+            _push(force=refresh)
+        except Exception as e:
+            logger.warning("Dashboard push failed: %s", e)
+
+
+def init_dashboard_events(socket_io, room_svc):
+    """Register the dashboard handlers and start the aggregation loop"""
+    global socketio, room_service
+    socketio, room_service = socket_io, room_svc
+
+    @socketio.on('dashboard_subscribe')
+    def handle_dashboard_subscribe(data):
+        """Watch rooms this client moderates
+
+        Args:
+            data: ``{"rooms": [{"room_code": ..., "player_id": ...}, ...]}``
+
+        Returns:
+            dict: Ack with the accepted rooms' current summaries and the
+            reason each rejected room was refused
+        """
+        wanted = {}
+        for item in (data or {}).get('rooms', [])[:config.DASHBOARD_MAX_ROOMS]:
+            code = str(item.get('room_code', '')).upper()
+            if code:
+                wanted[code] = item.get('player_id')
+
+        rooms = room_service.get_rooms(list(wanted))
+        accepted, rejected = set(), {}
+        for code, player_id in wanted.items():
+            room = rooms.get(code)
+            if not room:
+                rejected[code] = 'room_not_found'
+            elif not player_id or room.moderator_id != player_id:
+                rejected[code] = 'not_moderator'
+            else:
+                accepted.add(code)
+
+        with _lock:
+            _subs.setdefault(request.sid, set()).update(accepted)
+        logger.info("Dashboard %s watching %s rooms (%s refused)", request.sid, len(accepted), len(rejected))
+
+        summaries = dashboard_service.room_summaries(sorted(accepted)) if accepted else {}
+        return {'rooms': summaries, 'rejected': rejected, 'interval': config.DASHBOARD_INTERVAL}
+
+    @socketio.on('dashboard_unsubscribe')
+    def handle_dashboard_unsubscribe(data):
+        """Stop watching some rooms (all of them if none are given)"""
+        codes = {str(c).upper() for c in (data or {}).get('rooms', [])}
+        with _lock:
+            rooms = _subs.get(request.sid, set())
+            if codes:
+                rooms -= codes
+            else:
+                rooms.clear()
+        return {'rooms': sorted(rooms)}
+
+    socketio.start_background_task(_run)
@@ -0,0 +1,193 @@
+"""
+Input rate limiting and move coalescing for Socket.IO handlers
+"""
+import itertools
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+# Rejection/acceptance counters, exported by the metrics endpoint
+_stats_lock = threading.Lock()
+_stats: Counter = Counter()
+
+
+def count(name: str, n: int = 1) -> None:
+    """Increment a rate-limit counter"""
+    with _stats_lock:
+        _stats[name] += n
+
+
+def get_stats() -> Dict[str, int]:
+    """Return a snapshot of the rate-limit counters"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, at most ``burst`` stored"""
+
+    __slots__ = ("rate", "burst", "tokens", "stamp")
+
+    def __init__(self, rate: float, burst: float, now: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = time.monotonic() if now is None else now
+
+    def take(self, now: Optional[float] = None) -> bool:
+        """Consume one token if available
+
+        Returns:
+            bool: True if the caller may proceed
+        """
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class RateLimiter:
+    """Token buckets keyed by an arbitrary id (socket id, room code)"""
+
+    def __init__(self, rate: float, burst: float, idle_ttl: float = 300.0):
+        """Initialize the limiter
+
+        Args:
+            rate: Sustained events per second per key
+            burst: Bucket size (events allowed back to back)
+            idle_ttl: Seconds after which an unused bucket is dropped
+        """
+        self.rate = rate
+        self.burst = burst
+        self.idle_ttl = idle_ttl
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._next_prune = time.monotonic() + idle_ttl
+
+    def allow(self, key: str) -> bool:
+        """Return True if ``key`` still has budget for one event"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, now)
+            allowed = bucket.take(now)
+            if now >= self._next_prune:
+                self._prune(now)
+        return allowed
+
+    def forget(self, key: str) -> None:
+        """Drop the bucket for ``key`` (e.g. on disconnect)"""
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def _prune(self, now: float) -> None:
+        stale = [k for k, b in self._buckets.items() if now - b.stamp > self.idle_ttl]
+        for k in stale:
+            del self._buckets[k]
+        self._next_prune = now + self.idle_ttl
+
+
+class _RoomMoves:
+    __slots__ = ("lock", "tickets", "last_mover", "epoch", "holder_epoch")
+
+    def __init__(self):
+        self.lock = threading.Lock()      # serializes load/mutate/save per room
+        self.tickets: Dict[str, int] = {}  # player_id -> newest queued ticket
+        self.last_mover: Optional[str] = None
+        self.epoch = 0                    # bumped at every trial boundary
+        self.holder_epoch = 0
+
+
+class MoveCoalescer:
+    """Serializes moves per room and drops the ones that cannot matter.
+
+    Turns alternate, so once a player's move is accepted, any further move from
+    the same player before someone else moves is a same-turn duplicate. While a
+    room is busy, only the newest queued move per player is kept; older ones
+    are superseded and never reach Redis.
+
+    Usage::
+
+        reason = coalescer.acquire(room_code, player_id)
+        if reason is None:
+            try:
+                ...  # update_position
+            finally:
+                coalescer.release(room_code, player_id, accepted)
+
+    ``reset`` must be called at every trial boundary, since a new trial may
+    start with either player's turn.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rooms: Dict[str, _RoomMoves] = {}
+        self._tickets = itertools.count(1)
+
+    def _room(self, room_code: str) -> _RoomMoves:
+        st = self._rooms.get(room_code)
+        if st is None:
+            st = self._rooms[room_code] = _RoomMoves()
+        return st
+
+    def acquire(self, room_code: str, player_id: str) -> Optional[str]:
+        """Wait for the room and decide whether this move should run
+
+        Returns:
+            str: rejection reason ('duplicate' or 'coalesced'), or None if the
+            caller now holds the room and must call ``release``
+        """
+        with self._lock:
+            st = self._room(room_code)
+            if st.last_mover == player_id:
+                return "duplicate"
+            ticket = next(self._tickets)
+            st.tickets[player_id] = ticket
+
+        st.lock.acquire()
+        with self._lock:
+            if st.tickets.get(player_id) != ticket:
+                reason = "coalesced"      # a newer move from this player is queued
+            elif st.last_mover == player_id:
+                reason = "duplicate"      # our previous move landed while we waited
+            else:
+                st.holder_epoch = st.epoch
+                return None
+        st.lock.release()
+        return reason
+
+    def release(self, room_code: str, player_id: str, accepted: bool) -> None:
+        """Record the outcome of a move started with ``acquire`` and free the room"""
+        with self._lock:
+            st = self._room(room_code)
+            if accepted and st.epoch == st.holder_epoch:
+                st.last_mover = player_id
+        st.lock.release()
+
+    @contextmanager
+    def hold(self, room_code: str):
+        """Hold a room's move lock for a change that is not a move (a trial
+        timeout), so it cannot interleave with a move's load/mutate/save"""
+        with self._lock:
+            st = self._room(room_code)
+        with st.lock:
+            yield
+
+    def reset(self, room_code: str) -> None:
+        """Forget the last mover of a room whose trial just changed"""
+        with self._lock:
+            st = self._rooms.get(room_code)
+            if st is not None:
+                st.last_mover = None
+                st.epoch += 1
+
+    def forget(self, room_code: str) -> None:
+        """Drop the state for a room that no longer exists"""
+        with self._lock:
+            self._rooms.pop(room_code, None)
@@ -5,6 +5,11 @@ import logging
 from flask import request
 from flask_socketio import emit, join_room, leave_room
 
+from services import sequence_service, room_events, presence_service, metrics, trace_service
+import config
+from .rate_limit import RateLimiter, MoveCoalescer, count
+from . import wire, dashboard
+
 # Remove direct imports to avoid circular dependency
 # from services import room_service, game_service
 
@@ -16,54 +21,99 @@ socketio = None
 room_service = None
 game_service = None
 
+# Per-socket and per-room move budgets, plus per-room move serialization
+sid_limiter = RateLimiter(config.MOVE_RATE_PER_SID, config.MOVE_BURST_PER_SID)
+room_limiter = RateLimiter(config.MOVE_RATE_PER_ROOM, config.MOVE_BURST_PER_ROOM)
+coalescer = MoveCoalescer()
+
 
 def init_socket_events(socket_io, room_svc=None, game_svc=None):
     """Register Socket.IO event handlers"""
     global socketio, room_service, game_service
     socketio, room_service, game_service = socket_io, room_svc, game_svc
+    game_service.add_trial_listener(coalescer.reset)
+    game_service.set_room_lock(coalescer.hold)
     
     @socketio.on('connect')
     def handle_connect():
         """Handle client connection"""
-        logger.info(f'Client connected: {request.sid}')
+        logger.info("Client connected: %s", request.sid)
+        metrics.SOCKETS_CONNECTED.inc()
 
     @socketio.on('disconnect')
     def handle_disconnect():
         """Handle client disconnection"""
-        logger.info(f'Client disconnected: {request.sid}')
-
-        # Find and remove player from any rooms they were in
-        for room_code in room_service.get_active_rooms():
+        logger.info("Client disconnected: %s", request.sid)
+        metrics.SOCKETS_CONNECTED.dec()
+        sid_limiter.forget(request.sid)
+        dashboard.forget(request.sid)
+
+        # Presence lives outside the room blob: no room read or write here
+        gone = presence_service.disconnect(request.sid)
+        if gone:
+            room_code, player_id, still_online = gone
+            if not still_online:
+                logger.info("Player %s has no active connections in room %s", player_id, room_code)
+                _player_offline(room_code, player_id)
+
+    @socketio.on('heartbeat')
+    def handle_heartbeat(data=None):
+        """Refresh this socket's presence; the client reports its last measured RTT
+
+        Returns:
+            dict: Ack with ``ok`` (False means the session expired: rejoin) and
+            the heartbeat ``interval`` in seconds
+        """
+        rtt = (data or {}).get('rtt_ms')
+        ok = presence_service.heartbeat(request.sid, rtt if isinstance(rtt, (int, float)) else None)
+        return {'ok': ok, 'interval': config.PRESENCE_HEARTBEAT_INTERVAL}
+
+    def _player_offline(room_code, player_id, reason='disconnect'):
+        """Announce a player with no live socket; drop per-room state once nobody is left"""
+        room_events.publish('player_left', {'player_id': player_id, 'reason': reason}, room_code, socketio)
+        if not presence_service.online_players(room_code):
+            room_limiter.forget(room_code)
+            coalescer.forget(room_code)
+
+    def _on_presence_timeout(room_code, player_id):
+        logger.info("Player %s timed out in room %s", player_id, room_code)
+        _player_offline(room_code, player_id, reason='timeout')
+
+    def _on_abandoned(room_code, player_id):
+        """Free the seat of a player still offline after PRESENCE_GRACE; the
+        room is removed with its last player"""
+        with coalescer.hold(room_code):
+            if not room_service.remove_player(room_code, player_id):
+                return
             room = room_service.get_room(room_code)
-            if not room:
-                continue
-
-            for player_id in list(room.players.keys()):
-                if 'sids' in room.players[player_id] and request.sid in room.players[player_id]['sids']:
-                    logger.info(f"Player {player_id} disconnected from room {room_code}")
-
-                    # Remove this connection ID
-                    room.players[player_id]['sids'].remove(request.sid)
-
-                    # Only remove the player completely if they have no active connections
-                    if not room.players[player_id]['sids']:
-                        logger.info(f"Player {player_id} has no active connections, removing from room")
-                        room.remove_player(player_id)
-                        socketio.emit('player_left', {'player_id': player_id}, to=room_code)
+        if room is None:
+            logger.info("Room %s is empty, removed", room_code)
+            room_limiter.forget(room_code)
+            coalescer.forget(room_code)
+            return
+        logger.info("Player %s removed from room %s", player_id, room_code)
+        room_events.publish('room_state', _room_state_payload(room), room_code, socketio)
 
-                        # If room is empty, remove it
-                        if room.is_empty():
-                            logger.info(f"Room {room_code} is now empty, removing")
-                            room.active = False  # Stop the game loop
-                            room_service.remove_room(room_code)
+    socketio.start_background_task(presence_service.run_sweeper, socketio, _on_presence_timeout, _on_abandoned)
 
-                    # Even if the player has other connections, notify everyone about the disconnect
-                    socketio.emit('room_state', {
-                        'room': room.to_dict(),
-                        'game_started': room.started
-                    }, to=room_code)
+    def _room_state_payload(room):
+        """Full room snapshot, including the trial list and current block"""
+        try:
+            current_trial_index = int(getattr(room, "current_trial_index", 0) or 0)
+        except Exception:
+            current_trial_index = 0
 
-                    break
+        trials = list(getattr(room, "trials", []) or [])
+        return {
+            'room': room.to_dict(),
+            'game_started': room.started,
+            # ---- NEW fields ----
+            'current_trial_index': current_trial_index,
+            'trials': trials,
+            'trials_total': len(trials),
+            'block': sequence_service.current_block_payload(room),
+            'online': presence_service.online_players(room.room_code),
+        }
 
     @socketio.on('join_game')
     def handle_join_game(data):
@@ -71,56 +121,52 @@ def init_socket_events(socket_io, room_svc=None, game_svc=None):
         room_code = data.get('room_code')
         player_id = data.get('player_id')
 
-        logger.info(f"Player {player_id} attempting to join room {room_code}")
+        logger.info("Player %s attempting to join room %s", player_id, room_code)
 
         if not room_code or not player_id:
-            logger.warning(f"Missing room_code or player_id: {data}")
+            logger.warning("Missing room_code or player_id: %s", data)
             emit('error', {'message': 'Invalid room or player'})
             return
+        room_code = room_code.upper()
 
         if not room_service.get_room(room_code):
-            logger.warning(f"Room {room_code} not found. Available rooms: {room_service.get_active_rooms()}")
+            logger.warning("Room %s not found. Available rooms: %s", room_code, room_service.get_active_rooms())
             emit('error', {'message': 'Room not found'})
             return
 
         room = room_service.get_room(room_code)
 
         if player_id not in room.players:
-            logger.warning(f"Error: Player {player_id} not found in room {room_code}.")
-            logger.warning(f"Players in room: {list(room.players.keys())}")
+            logger.warning("Error: Player %s not found in room %s.", player_id, room_code)
+            logger.warning("Players in room: %s", list(room.players.keys()))
             emit('error', {'message': 'Player not in this room'})
             return
 
-        # Track this socket id for the player
-        room.players.setdefault(player_id, {}).setdefault('sids', [])
-        if request.sid not in room.players[player_id]['sids']:
-            room.players[player_id]['sids'].append(request.sid)
+        # Track this socket in the presence registry (not in the room JSON)
+        presence_service.connect(request.sid, room_code, player_id)
 
-        # Join the Socket.IO room
+        # Join the Socket.IO room, plus the audience for the negotiated wire format
         join_room(room_code)
-        logger.info(f"Player {player_id} joined Socket.IO room {room_code}")
-
-        # Notify others in the room (not the joiner)
-        try:
-            current_trial_index = int(getattr(room, "current_trial_index", 0) or 0)
-        except Exception:
-            current_trial_index = 0
+        fmt = wire.negotiate(data.get('wire'))
+        join_room(room_events.wire_room(room_code, fmt))
+        logger.info("Player %s joined Socket.IO room %s (wire=%s)", player_id, room_code, fmt)
+
+        # Reconnect: replay only what this socket missed, if the buffer still has it
+        last_seq = data.get('last_seq')
+        if isinstance(last_seq, int) and last_seq >= 0:
+            missed = room_events.replay(room_code, last_seq)
+            if missed is not None:
+                for event, payload in missed:
+                    emit(event, payload)
+                logger.info("Resumed player %s in %s: %s missed events", player_id, room_code, len(missed))
+                return
+            # Buffer overflowed: full snapshot to this socket only
+            emit('room_state', dict(_room_state_payload(room), seq=room_events.current_seq(room_code)))
+            return
 
-        trials = list(getattr(room, "trials", []) or [])
-        # Send room metadata to the joiner, with trial info included
-        emit('room_state', {
-            'room': room.to_dict(),
-            'game_started': room.started,
-            # ---- NEW fields ----
-            'current_trial_index': current_trial_index,
-            'trials': trials,
-            'trials_total': len(trials),
-        }, to=room_code, include_self=True)
+        # Send room metadata to the room, with trial info included
+        room_events.publish('room_state', _room_state_payload(room), room_code, socketio)
 
-        logger.info(
-            f"has_trial={trials is not None}) to player {player_id}"
-        )
-        
     @socketio.on('start_game')
     def handle_start_game(data):
         """Handle game start request
@@ -131,7 +177,7 @@ def init_socket_events(socket_io, room_svc=None, game_svc=None):
         room_code = data.get('room_code')
         player_id = data.get('player_id')
 
-        logger.info(f"Start game request received: room={room_code}, player={player_id}")
+        logger.info("Start game request received: room=%s, player=%s", room_code, player_id)
 
         result = game_service.start_game(room_code, player_id)
         if not result['success']:
@@ -141,8 +187,8 @@ def init_socket_events(socket_io, room_svc=None, game_svc=None):
         # Start the game loop in the background
         room = room_service.get_room(room_code)
         if room:
-            logger.info(f"Start game started")
-            socketio.emit('game_start',to=room_code)
+            logger.info("Start game started")
+            room_events.publish('game_start', {}, room_code, socketio)
         return
     
     @socketio.on('player_ready')
@@ -155,7 +201,7 @@ def init_socket_events(socket_io, room_svc=None, game_svc=None):
         room_code = data.get('room_code')
         player_id = data.get('player_id')
 
-        logger.info(f"Player ready: room={room_code}, player={player_id}")
+        logger.info("Player ready: room=%s, player=%s", room_code, player_id)
 
         if not game_service.mark_player_ready(room_code, player_id):
             emit('error', {'message': 'Failed to mark player as ready'})
@@ -164,29 +210,89 @@ def init_socket_events(socket_io, room_svc=None, game_svc=None):
         # Notify all clients about the updated state
         room = room_service.get_room(room_code)
         if room:
-            socketio.emit('room_state', {
+            room_events.publish('room_state', {
                 'room': room.to_dict(),
                 'game_started': room.started
-            }, to=room_code)
+            }, room_code, socketio)
             
         return
             
+    def _move_ack(move_id, reason=None, room=None):
+        """Ack for a board_update: accept/reject plus the authoritative board"""
+        ack = {'move_id': move_id, 'accepted': reason is None, 'reason': reason}
+        trace_id = trace_service.finish(result=reason or 'accepted')
+        if trace_id:
+            ack['trace_id'] = trace_id
+        trial = room.current_trial() if room else None
+        if trial:
+            ack.update({
+                'positions': trial.get('start_positions', {}),
+                'turn': trial.get('turn'),
+                'block_index': room.current_block_index,
+                'trial_index': room.current_trial_index,
+            })
+        return ack
+
     @socketio.on('board_update')
     def handle_board_update(data):
+        """Apply a move and acknowledge it
+
+        Returns:
+            dict: Ack sent to the client's callback: move_id, accepted, reason
+            and the authoritative positions/turn after the move
+        """
         room_code = data.get("room_code")
         player_id = data.get("player_id")
         move = data.get("move", {})
-        
-        logger.info(f"Board_Update: room={room_code}, player={player_id}, move={move}")
+        move_id = data.get("move_id")
+        trace_service.begin(data.get("trace_id"), data.get("client_ts"),
+                            room=str(room_code or '').upper(), player=trace_service.player_tag(player_id))
+
         dx, dy = move.get("dx"), move.get("dy")
+        logger.info("board_update", extra={"room": room_code, "player": player_id, "dx": dx, "dy": dy})
         if not room_code or not player_id or dx is None or dy is None:
             emit("error", {"message": "Invalid board update payload"})
-            return
-
-        trial = game_service.update_position(room_code, player_id, dx, dy)
-        if not trial:
-            emit("error", {"message": "Failed to update position"})
-            return
-
-        handle_join_game(data)
-        return
+            return _move_ack(move_id, "invalid_payload")
+
+        room_code = room_code.upper()
+        if not sid_limiter.allow(request.sid):
+            count("moves_rejected_sid")
+            logger.debug("Move rate limited (sid): %s", request.sid)
+            return _move_ack(move_id, "rate_limited")
+        if not room_limiter.allow(room_code):
+            count("moves_rejected_room")
+            logger.debug("Move rate limited (room): %s", room_code)
+            return _move_ack(move_id, "rate_limited")
+
+        reason = coalescer.acquire(room_code, player_id)
+        if reason:
+            count(f"moves_{reason}")
+            logger.debug("Move dropped (%s): room=%s, player=%s", reason, room_code, player_id)
+            return _move_ack(move_id, reason)
+        trace_service.mark("receive")
+        room, reason = None, "rejected"
+        try:
+            room, reason = game_service.apply_move(room_code, player_id, dx, dy)
+        finally:
+            coalescer.release(room_code, player_id, reason is None)
+
+        if reason:
+            count("moves_rejected_rules")
+            return _move_ack(move_id, reason, room)
+
+        count("moves_accepted")
+        trial = room.current_trial()
+        if room.finished or not trial or not trial.get('turns_taken'):
+            # the move ended the trial: clients need the next layout
+            room_events.publish('room_state', _room_state_payload(room), room_code, socketio)
+        else:
+            room_events.publish(wire.BOARD_STATE, wire.board_state_payload(room), room_code, socketio,
+                                binary=wire.encode_board_state)
+        trace_service.mark("emit")
+        return _move_ack(move_id, None, room)
+
+    @socketio.on('trace_render')
+    def handle_trace_render(data=None):
+        """Client timings of a traced move: send -> ack and send -> frame drawn (ms)"""
+        data = data or {}
+        trace_service.report_client(data.get('trace_id'), data.get('ack_ms'), data.get('render_ms'))
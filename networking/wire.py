@@ -0,0 +1,121 @@
+"""
+Compact binary frames for hot room events
+
+A client opts in per connection by sending ``wire: "bin"`` with
+``join_game``; everyone else keeps receiving JSON. Only ``board_state`` (sent
+after every accepted move) has a binary form, everything else stays JSON.
+
+``board_state`` frame (version 1)::
+
+    u8      frame type (1 = board_state)
+    varint  seq
+    varint  block_index
+    varint  trial_index
+    varint  turns_taken
+    u8      flags: bit0 turn is B, bit1 R placed, bit2 B placed
+    u8 u8   R x, y   (if placed)
+    u8 u8   B x, y   (if placed)
+
+Varints are unsigned LEB128. The same layout is decoded by
+``static/js/shared/wire.js``.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+JSON = "json"
+BINARY = "bin"
+FORMATS = (JSON, BINARY)
+
+BOARD_STATE = "board_state"
+FRAME_BOARD_STATE = 1
+
+_TURN_B = 0x01
+_HAS_R = 0x02
+_HAS_B = 0x04
+
+
+def negotiate(requested: Optional[str]) -> str:
+    """Return the wire format to use for a client that asked for ``requested``"""
+    return requested if requested in FORMATS else JSON
+
+
+# ----------------------- Varints -----------------------
+def write_varint(out: bytearray, value: int) -> None:
+    if value < 0:
+        raise ValueError(f"varint must be non-negative, got {value}")
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(buf: bytes, pos: int) -> Tuple[int, int]:
+    """Decode a varint at ``pos``; return (value, next position)"""
+    value = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+# ----------------------- board_state -----------------------
+def board_state_payload(room) -> Dict[str, Any]:
+    """JSON form of ``board_state`` for the room's current trial"""
+    trial = room.current_trial() or {}
+    return {
+        'block_index': room.current_block_index,
+        'trial_index': room.current_trial_index,
+        'turns_taken': int(trial.get('turns_taken', 0)),
+        'turn': trial.get('turn', 'R'),
+        'positions': trial.get('start_positions', {}),
+    }
+
+
+def encode_board_state(payload: Dict[str, Any]) -> bytes:
+    """Pack a sequenced ``board_state`` payload into a binary frame"""
+    out = bytearray([FRAME_BOARD_STATE])
+    write_varint(out, payload.get('seq', 0))
+    write_varint(out, payload['block_index'])
+    write_varint(out, payload['trial_index'])
+    write_varint(out, payload.get('turns_taken', 0))
+
+    positions = payload.get('positions') or {}
+    flags = _TURN_B if payload.get('turn') == 'B' else 0
+    coords: List[int] = []
+    for role, bit in (('R', _HAS_R), ('B', _HAS_B)):
+        pos = positions.get(role)
+        if pos:
+            flags |= bit
+            coords.extend(pos)
+    out.append(flags)
+    out.extend(coords)              # ValueError if a coordinate is outside 0..255
+    return bytes(out)
+
+
+def decode_board_state(buf: bytes) -> Dict[str, Any]:
+    """Inverse of ``encode_board_state``"""
+    if not buf or buf[0] != FRAME_BOARD_STATE:
+        raise ValueError("not a board_state frame")
+    pos = 1
+    seq, pos = read_varint(buf, pos)
+    block_index, pos = read_varint(buf, pos)
+    trial_index, pos = read_varint(buf, pos)
+    turns_taken, pos = read_varint(buf, pos)
+    flags = buf[pos]
+    pos += 1
+
+    positions = {}
+    for role, bit in (('R', _HAS_R), ('B', _HAS_B)):
+        if flags & bit:
+            positions[role] = [buf[pos], buf[pos + 1]]
+            pos += 2
+    return {
+        'seq': seq,
+        'block_index': block_index,
+        'trial_index': trial_index,
+        'turns_taken': turns_taken,
+        'turn': 'B' if flags & _TURN_B else 'R',
+        'positions': positions,
+    }
@@ -5,8 +5,12 @@ import logging
 from flask import Flask
 from flask_socketio import SocketIO
 
+import config
+
 from .game_routes import init_routes as init_game_routes
 from .api_routes import init_routes as init_api_routes
+from .asset_routes import init_routes as init_asset_routes
+from .metrics_routes import init_routes as init_metrics_routes
 
 logger = logging.getLogger(__name__)
 
@@ -22,7 +26,9 @@ def init_routes(app: Flask, socketio: SocketIO):
 
     # Make socketio available to services (like game_service)
     import services.game_service as game_service
+    import services.room_events as room_events
     game_service.set_socketio(socketio)
+    room_events.set_socketio(socketio)
 
     # Initialize game routes
     init_game_routes(app)
@@ -30,5 +36,28 @@ def init_routes(app: Flask, socketio: SocketIO):
     # Initialize API routes
     init_api_routes(app, socketio)
 
+    # Built static bundles (asset_url in templates)
+    init_asset_routes(app)
+
+    # /metrics and request timing
+    init_metrics_routes(app)
+
+    # /debug/traces; player ids never appear in traces, but sample rates and
+    # timings are still operator-only
+    if config.TRACE_TOKEN:
+        from .trace_routes import init_routes as init_trace_routes
+        init_trace_routes(app)
+
+    # /debug/profile and /debug/memory; imported only when enabled (the
+    # profilers are not needed otherwise)
+    if config.PROFILE_TOKEN:
+        from .debug_routes import init_routes as init_debug_routes
+        init_debug_routes(app)
+
+    # Charge Redis traffic to the route that issued it
+    if config.REDIS_PROFILE:
+        from services import redis_profile
+        redis_profile.instrument_app(app)
+
     logger.info("Routes initialization complete")
     
@@ -1,10 +1,14 @@
 """
 API routes for the application
 """
+import json
 import logging
-from flask import Blueprint, request, jsonify
+import threading
+from collections import OrderedDict
+from flask import Blueprint, Response, request, jsonify
 
-from services import room_service, game_service
+import config
+from services import room_service, game_service, room_events
 
 logger = logging.getLogger(__name__)
 
@@ -41,12 +45,12 @@ def join_room():
     room_code = request.json.get('room_code', '').upper()
     username = request.json.get('username', 'Player')
 
-    logger.info(f"Join room request: {room_code}, username: {username}")
+    logger.info("Join room request: %s, username: %s", room_code, username)
 
     success, player_id, error_message = room_service.join_room(room_code, username)
 
     if not success:
-        logger.warning(f"Failed to join room: {error_message}")
+        logger.warning("Failed to join room: %s", error_message)
         return jsonify({
             'success': False,
             'message': error_message
@@ -60,18 +64,18 @@ def join_room():
         room = room_service.get_room(room_code)
         if room:
             player_info = room.players[player_id]
-            socketio.emit('player_joined', {
+            room_events.publish('player_joined', {
                 'player_id': player_id,
                 'username': username,
                 'player_number': player_info.get('player_number'),
                 'moderator': False
-            }, to=room_code)
+            }, room_code, socketio)
 
             # Also emit updated room state to all clients
-            socketio.emit('room_state', {
+            room_events.publish('room_state', {
                 'room': room.to_dict(),
                 'game_started': room.started
-            }, to=room_code)
+            }, room_code, socketio)
 
     return jsonify({
         'success': True,
@@ -82,25 +86,33 @@ def join_room():
 
 @api_blueprint.route('/rooms', methods=['GET'])
 def list_rooms():
-    """List all active rooms (for debugging)
+    """List active rooms, newest first
+
+    Query args:
+        status: 'waiting', 'playing' or 'finished' (default: all)
+        offset: Rooms to skip (default 0)
+        limit: Page size (default 50, at most ROOM_LIST_MAX_LIMIT)
 
     Returns:
-        JSON: List of active rooms
+        JSON: One page of room summaries and the total matching count
     """
-    rooms = []
+    status = request.args.get('status') or None
+    if status and status not in room_service.STATUSES:
+        return jsonify({
+            'success': False,
+            'message': f"Unknown status '{status}'"
+        }), 400
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = min(max(1, request.args.get('limit', 50, type=int)), config.ROOM_LIST_MAX_LIMIT)
 
-    for room_code in room_service.get_active_rooms():
-        room = room_service.get_room(room_code)
-        if room:
-            rooms.append({
-                'room_code': room_code,
-                'player_count': len([p for p in room.players.values() if not p.get('moderator', False)]),
-                'started': room.started
-            })
+    total, rooms = room_service.list_rooms(status, offset, limit)
 
     return jsonify({
         'success': True,
-        'rooms': rooms
+        'rooms': rooms,
+        'total': total,
+        'offset': offset,
+        'limit': limit
     })
 
 
@@ -108,24 +120,50 @@ def list_rooms():
 def get_room_info(room_code):
     """Get information about a specific room
 
+    Answers conditional requests: the ETag is the room's version, so a poll
+    of an unchanged room costs one GET of the version counter and returns 304.
+    Serialized bodies are cached per room, keyed by version.
+
     Args:
         room_code: Room code
 
     Returns:
-        JSON: Room information
+        JSON: Room information (or 304 Not Modified)
     """
-    room = room_service.get_room(room_code)
-
-    if not room:
-        return jsonify({
-            'success': False,
-            'message': 'Room not found'
-        }), 404
-
+    room_code = room_code.upper()
+    version = room_service.get_version(room_code)
+    body = None
+    if version:
+        etag = f"v{version}"
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+        body = _room_info_cache.get(room_code, version)
+
+    if body is None:
+        room, version = room_service.get_room_versioned(room_code)
+        if not room:
+            return jsonify({
+                'success': False,
+                'message': 'Room not found'
+            }), 404
+        body = json.dumps(_room_info(room))
+        if version:
+            _room_info_cache.put(room_code, version, body)
+
+    response = Response(body, mimetype='application/json')
+    if version:
+        response.set_etag(f"v{version}")
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _room_info(room):
     # Get game state if available
-    game_state = game_service.get_game_state(room_code)
+    game_state = game_service.get_game_state(room.room_code, room=room)
 
-    return jsonify({
+    return {
         'success': True,
         'room': {
             'room_code': room.room_code,
@@ -144,7 +182,37 @@ def get_room_info(room_code):
             ],
             'game_state': game_state
         }
-    })
+    }
+
+
+class _VersionedCache:
+    """Latest serialized body per room, valid only for the version it was built at"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, version: int):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] != version:
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def put(self, key: str, version: int, body: str) -> None:
+        with self._lock:
+            current = self._items.get(key)
+            if current is not None and current[0] > version:
+                return                   # a newer body is already cached
+            self._items[key] = (version, body)
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+
+_room_info_cache = _VersionedCache(config.ROOM_INFO_CACHE_SIZE)
 
 
 def init_routes(app, socketio_instance):
@@ -0,0 +1,96 @@
+"""
+Fingerprinted static bundles built by ``python -m tools.build_assets``
+"""
+import json
+import logging
+import mimetypes
+import os
+
+from flask import Blueprint, current_app, request, send_from_directory, url_for
+
+logger = logging.getLogger(__name__)
+
+# Create blueprint for built assets
+asset_blueprint = Blueprint('assets', __name__)
+
+# Built files never change under the same name
+IMMUTABLE = 'public, max-age=31536000, immutable'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+_manifest = {}
+_manifest_mtime = None
+
+
+def _dist_dir():
+    return os.path.join(current_app.static_folder, 'dist')
+
+
+def _load_manifest():
+    """Read the build manifest; reloaded when the file changes (rebuilds in development)"""
+    global _manifest, _manifest_mtime
+    path = os.path.join(_dist_dir(), 'manifest.json')
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        _manifest, _manifest_mtime = {}, None
+        return _manifest
+    if mtime != _manifest_mtime:
+        with open(path, encoding='utf-8') as f:
+            _manifest = json.load(f).get('files', {})
+        _manifest_mtime = mtime
+        logger.info("Loaded asset manifest (%s files)", len(_manifest))
+    return _manifest
+
+
+def asset_url(name):
+    """URL of a static asset: the built bundle if the manifest has it, else the raw file
+
+    Args:
+        name: Logical name, e.g. 'js/pages/gamePage.js' or 'css/style.css'
+
+    Returns:
+        str: URL for templates
+    """
+    built = _load_manifest().get(name)
+    if built:
+        return url_for('assets.dist', filename=built)
+    return url_for('static', filename=name)
+
+
+@asset_blueprint.route('/dist/<path:filename>')
+def dist(filename):
+    """Serve a built file, precompressed when the client accepts it
+
+    Args:
+        filename: Path inside static/dist
+
+    Returns:
+        File response with immutable cache headers
+    """
+    directory = _dist_dir()
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    response = None
+    for encoding, ext in ENCODINGS:
+        if encoding in request.accept_encodings and os.path.isfile(os.path.join(directory, filename + ext)):
+            response = send_from_directory(directory, filename + ext, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+    if response is None:
+        response = send_from_directory(directory, filename, mimetype=mimetype)
+
+    response.headers['Cache-Control'] = IMMUTABLE
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def init_routes(app):
+    """Initialize asset routes and the ``asset_url`` template helper
+
+    Args:
+        app: Flask application
+    """
+    app.register_blueprint(asset_blueprint)
+    app.jinja_env.globals['asset_url'] = asset_url
+
+    logger.info("Asset routes initialized")
@@ -0,0 +1,120 @@
+"""
+Profiling endpoints for a live worker (``/debug/profile``, ``/debug/memory``)
+
+Registered only when PROFILE_TOKEN is set; every call must present it.
+Each request reaches one worker process: with several workers, call each
+one through its own port.
+"""
+import hmac
+import logging
+
+from flask import Blueprint, Response, jsonify, request
+
+import config
+from services import profiling_service
+
+logger = logging.getLogger(__name__)
+
+# Create blueprint for the debug endpoints
+debug_blueprint = Blueprint('debug', __name__)
+
+TEXT = 'text/plain; charset=utf-8'
+
+
+def _list(name):
+    value = request.args.get(name, '')
+    return [v.strip() for v in value.split(',') if v.strip()] or None
+
+
+@debug_blueprint.before_request
+def _require_token():
+    presented = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(presented, f'Bearer {config.PROFILE_TOKEN}'):
+        return Response('unauthorized\n', status=401, content_type=TEXT)
+
+
+@debug_blueprint.route('/debug/profile', methods=['POST'])
+def profile_endpoint():
+    """Profile this worker for a while and return the result
+
+    Query args: ``mode`` (sample | deterministic), ``seconds``, ``events``
+    and ``rooms`` (comma-separated scope), ``interval_ms`` (sampling), and
+    ``format``: collapsed (sample default), pstats (deterministic default,
+    raw marshal data) or text (printed pstats, ``sort`` and ``limit``).
+
+    Returns:
+        The artefact; run details in ``X-Profile-*`` headers (400 on bad
+        arguments, 409 while another run is in progress)
+    """
+    mode = request.args.get('mode', 'sample')
+    try:
+        seconds = min(float(request.args.get('seconds', 10)), config.PROFILE_MAX_SECONDS)
+        interval = max(float(request.args.get('interval_ms', 5)), 1.0) / 1000.0
+        limit = int(request.args.get('limit', 60))
+    except ValueError:
+        return jsonify({'error': 'bad parameter'}), 400
+    fmt = request.args.get('format') or ('collapsed' if mode == 'sample' else 'pstats')
+    if mode not in profiling_service.MODES or fmt not in ('collapsed', 'pstats', 'text') \
+            or (fmt == 'collapsed') != (mode == 'sample'):
+        return jsonify({'error': 'mode/format must be sample+collapsed or deterministic+pstats|text'}), 400
+
+    logger.warning("profiling started", extra={"mode": mode, "seconds": seconds,
+                                               "events": request.args.get('events'),
+                                               "rooms": request.args.get('rooms')})
+    try:
+        run = profiling_service.profile(mode, max(seconds, 0.0), _list('events'), _list('rooms'), interval)
+    except profiling_service.ProfilerBusy as e:
+        return jsonify({'error': str(e)}), 409
+
+    if fmt == 'collapsed':
+        response = Response(run.collapsed(), content_type=TEXT)
+    elif fmt == 'pstats':
+        response = Response(run.pstats_bytes(), content_type='application/octet-stream',
+                            headers={'Content-Disposition': 'attachment; filename=profile.pstats'})
+    else:
+        response = Response(run.pstats_text(request.args.get('sort', 'cumulative'), limit), content_type=TEXT)
+    for key, value in run.summary().items():
+        if value is not None:
+            response.headers[f'X-Profile-{key.replace("_", "-").title()}'] = \
+                ','.join(value) if isinstance(value, list) else str(value)
+    return response
+
+
+@debug_blueprint.route('/debug/memory', methods=['GET', 'POST', 'DELETE'])
+def memory_endpoint():
+    """tracemalloc snapshots of this worker
+
+    POST starts tracing (``frames``, and ``interval`` seconds for periodic
+    snapshots); GET returns growth between the two latest snapshots plus the
+    largest allocation sites (``top``, ``key``: lineno | filename |
+    traceback); DELETE stops tracing.
+
+    Returns:
+        JSON (400 on bad arguments, 409 on GET while tracing is off)
+    """
+    try:
+        if request.method == 'POST':
+            interval = request.args.get('interval')
+            return jsonify(profiling_service.memory_start(int(request.args.get('frames', 10)),
+                                                          float(interval) if interval else None))
+        if request.method == 'DELETE':
+            profiling_service.memory_stop()
+            return Response(status=204)
+        key = request.args.get('key', 'lineno')
+        if key not in ('lineno', 'filename', 'traceback'):
+            raise ValueError(key)
+        return jsonify(profiling_service.memory_diff(int(request.args.get('top', 25)), key))
+    except ValueError:
+        return jsonify({'error': 'bad parameter'}), 400
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+
+
+def init_routes(app):
+    """Register the debug endpoints (only imported when PROFILE_TOKEN is set)
+
+    Args:
+        app: Flask application
+    """
+    app.register_blueprint(debug_blueprint)
+    logger.info("Profiling endpoints enabled")
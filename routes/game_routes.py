@@ -3,7 +3,7 @@ Game-related routes for the application
 """
 import logging
 from flask import Blueprint, render_template, redirect, url_for
-from services import room_service
+from services import room_service, presence_service
 
 logger = logging.getLogger(__name__)
 
@@ -34,14 +34,14 @@ def game(room_code):
     Returns:
         HTML: Game page or error page
     """
-    logger.info(f"Game page requested for room {room_code}")
+    logger.info("Game page requested for room %s", room_code)
 
     # Make sure the room code is uppercase
     room_code = room_code.upper()
 
     room = room_service.get_room(room_code)
     if not room:
-        logger.warning(f"Room {room_code} not found. Available rooms: {room_service.get_active_rooms()}")
+        logger.warning("Room %s not found. Available rooms: %s", room_code, room_service.get_active_rooms())
         return render_template('error.html',
                                error_title="Room Not Found",
                                error_message=f"The room '{room_code}' does not exist or has expired.",
@@ -49,7 +49,7 @@ def game(room_code):
 
     # Check if the room has started
     if not room.start_game():
-        logger.info(f"Room {room_code} exists but game has not started. Redirecting to waiting page.")
+        logger.info("Room %s exists but game has not started. Redirecting to waiting page.", room_code)
         return redirect(url_for('game.waiting', room_code=room_code))
 
     return render_template('game.html', room_code=room_code)
@@ -65,13 +65,13 @@ def waiting(room_code):
     Returns:
         HTML: Waiting room page or error page
     """
-    logger.info(f"Waiting page requested for room {room_code}")
+    logger.info("Waiting page requested for room %s", room_code)
 
     # Make sure the room code is uppercase
     room_code = room_code.upper()
 
     if not room_service.get_room(room_code):
-        logger.warning(f"Room {room_code} not found. Available rooms: {room_service.get_active_rooms()}")
+        logger.warning("Room %s not found. Available rooms: %s", room_code, room_service.get_active_rooms())
         return render_template('error.html',
                                error_title="Room Not Found",
                                error_message=f"The room '{room_code}' does not exist or has expired.",
@@ -80,6 +80,16 @@ def waiting(room_code):
     return render_template('waiting.html', room_code=room_code)
 
 
+@game_blueprint.route('/dashboard')
+def dashboard():
+    """Moderator dashboard for many rooms at once
+
+    Returns:
+        HTML: Dashboard page (rooms are subscribed to over Socket.IO)
+    """
+    return render_template('dashboard.html')
+
+
 @game_blueprint.route('/debug/<room_code>')
 def debug_room(room_code):
     """Debug page for examining room state
@@ -90,14 +100,14 @@ def debug_room(room_code):
     Returns:
         HTML: Debug page or error page
     """
-    logger.info(f"Debug page requested for room {room_code}")
+    logger.info("Debug page requested for room %s", room_code)
 
     # Make sure the room code is uppercase
     room_code = room_code.upper()
 
     room = room_service.get_room(room_code)
     if not room:
-        logger.warning(f"Room {room_code} not found. Available rooms: {room_service.get_active_rooms()}")
+        logger.warning("Room %s not found. Available rooms: %s", room_code, room_service.get_active_rooms())
         return render_template('error.html',
                                error_title="Room Not Found",
                                error_message=f"The room '{room_code}' does not exist or has expired.",
@@ -113,6 +123,7 @@ def debug_room(room_code):
         'players': []
     }
 
+    online = presence_service.online_players(room_code)
     for player_id, player_data in room_info['players'].items():
         formatted_player = {
             'id': player_id,
@@ -120,7 +131,7 @@ def debug_room(room_code):
             'player_number': player_data.get('player_number', 'N/A'),
             'moderator': player_data.get('moderator', False),
             'ready': player_data.get('ready', False),
-            'sids': player_data.get('sids', [])
+            'connections': online.get(player_id, 0)
         }
         formatted_info['players'].append(formatted_player)
 
@@ -135,7 +146,7 @@ def debug_room(room_code):
                     room.engine._gameState, 'playerTurn') else None
             }
         except Exception as e:
-            logger.exception(f"Error getting engine state: {e}")
+            logger.exception("Error getting engine state: %s", e)
             engine_state = {'error': str(e)}
 
     return render_template('debug.html', room=formatted_info, engine_state=engine_state)
@@ -152,7 +163,7 @@ def page_not_found(e):
 
 @game_blueprint.errorhandler(500)
 def server_error(e):
-    logger.exception(f"Server error: {e}")
+    logger.exception("Server error: %s", e)
     return render_template('error.html',
                            error_title="Server Error",
                            error_message="An internal server error occurred.",
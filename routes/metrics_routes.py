@@ -0,0 +1,114 @@
+"""
+Prometheus text exposition of the in-process metrics (``/metrics``)
+"""
+import hmac
+import logging
+
+from flask import Blueprint, Response, jsonify, request
+
+import config
+import log_pipeline
+from services import metrics, recording_service, room_service
+
+logger = logging.getLogger(__name__)
+
+# Create blueprint for the metrics endpoint
+metrics_blueprint = Blueprint('metrics', __name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _collect_rooms():
+    counts = room_service.room_counts()
+    return metrics.family('rooms', 'gauge', 'Rooms by status (all workers)',
+                          {(('status', s),): n for s, n in counts.items()})
+
+
+def _collect_rate_limits():
+    from networking import rate_limit
+    return metrics.family('moves_total', 'counter', 'Moves by rate-limit/coalescing outcome',
+                          {(('outcome', k),): v for k, v in sorted(rate_limit.get_stats().items())})
+
+
+def _collect_recording():
+    s = recording_service.get_stats()
+    lines = metrics.family('recording_events_total', 'counter', 'Recorded game events by fate',
+                           {(('state', k),): s[k] for k in ('enqueued', 'dropped', 'written')})
+    lines += metrics.family('recording_queue_depth', 'gauge', 'Events waiting for the recording writer',
+                            {(): s['depth']})
+    lines += metrics.family('recording_flush_ms', 'gauge', 'Duration of the last recording batch write',
+                            {(): s['last_flush_ms']})
+    return lines
+
+
+def _authorized():
+    if not config.METRICS_TOKEN:
+        return True
+    presented = request.headers.get('Authorization', '')
+    return hmac.compare_digest(presented, f'Bearer {config.METRICS_TOKEN}')
+
+
+def _collect_logging():
+    s = log_pipeline.get_stats()
+    lines = metrics.family('log_records_total', 'counter', 'Log records by fate (sampled: over the logger rate)',
+                           {(('state', k),): s[k] for k in ('queued', 'written', 'dropped', 'sampled')})
+    lines += metrics.family('log_queue_depth', 'gauge', 'Log records waiting for the writer thread',
+                            {(): s['depth']})
+    return lines
+
+
+@metrics_blueprint.route('/metrics')
+def metrics_endpoint():
+    """Current metrics in Prometheus text format
+
+    Returns:
+        text/plain: Exposition (401 if METRICS_TOKEN is set and not presented)
+    """
+    if not _authorized():
+        return Response('unauthorized\n', status=401, content_type=CONTENT_TYPE)
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+
+@metrics_blueprint.route('/metrics/redis', methods=['GET', 'DELETE'])
+def redis_profile_endpoint():
+    """Redis profile per socket event / route (REDIS_PROFILE must be on)
+
+    GET returns one summary line per scope, or the raw totals with
+    ``?format=json``; DELETE resets the counters.
+
+    Returns:
+        text/plain or JSON (401 without the token, 404 when profiling is off)
+    """
+    if not _authorized():
+        return Response('unauthorized\n', status=401, content_type=CONTENT_TYPE)
+    if not config.REDIS_PROFILE:
+        return Response('redis profiling is off (REDIS_PROFILE=true)\n', status=404, content_type=CONTENT_TYPE)
+    from services import redis_profile
+    if request.method == 'DELETE':
+        redis_profile.reset()
+        return Response(status=204)
+    if request.args.get('format') == 'json':
+        return jsonify(redis_profile.snapshot())
+    return Response(''.join(line + '\n' for line in redis_profile.summary_lines()), content_type=CONTENT_TYPE)
+
+
+def init_routes(app):
+    """Register /metrics, the scrape-time collectors and request timing
+
+    Args:
+        app: Flask application
+    """
+    if not config.METRICS_ENABLED:
+        logger.info("Metrics disabled")
+        return
+    metrics.instrument_app(app)
+    metrics.add_collector(_collect_rooms)
+    metrics.add_collector(_collect_rate_limits)
+    metrics.add_collector(_collect_recording)
+    metrics.add_collector(_collect_logging)
+    if config.REDIS_PROFILE:
+        from services import redis_profile
+        metrics.add_collector(redis_profile.collect)
+    app.register_blueprint(metrics_blueprint)
+
+    logger.info("Metrics routes initialized")
@@ -0,0 +1,67 @@
+"""
+Sampled move traces of a live worker (``/debug/traces``)
+
+Registered only when TRACE_TOKEN is set; every call must present it. Each
+request reaches one worker process: with several workers, call each one
+through its own port.
+"""
+import hmac
+import logging
+
+from flask import Blueprint, Response, jsonify, request
+
+import config
+from services import trace_service
+
+logger = logging.getLogger(__name__)
+
+# Create blueprint for the trace endpoint
+trace_blueprint = Blueprint('traces', __name__)
+
+
+@trace_blueprint.before_request
+def _require_token():
+    presented = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(presented, f'Bearer {config.TRACE_TOKEN}'):
+        return Response('unauthorized\n', status=401, content_type='text/plain; charset=utf-8')
+
+
+@trace_blueprint.route('/debug/traces', methods=['GET', 'PUT', 'DELETE'])
+def traces_endpoint():
+    """Sampled move traces of this worker (trace_service)
+
+    GET lists traces, newest first, filtered by ``room``, ``player`` (a
+    player id or its tag), ``min_ms`` (end-to-end) and ``limit``, or a single
+    one with ``id``; ``?summary=1`` gives per-span percentiles instead. PUT
+    ``?rate=0.05`` changes the sample rate; DELETE empties the buffer.
+
+    Returns:
+        JSON (400 on a bad parameter)
+    """
+    if request.method == 'DELETE':
+        trace_service.clear()
+        return Response(status=204)
+    try:
+        if request.method == 'PUT':
+            trace_service.set_sample_rate(float(request.args['rate']))
+            logger.warning("trace sample rate changed", extra={"rate": trace_service.sample_rate()})
+            return jsonify({'sample_rate': trace_service.sample_rate()})
+        if request.args.get('summary'):
+            return jsonify(trace_service.summary())
+        traces = trace_service.query(room=request.args.get('room'), player=request.args.get('player'),
+                                     min_ms=float(request.args.get('min_ms', 0)),
+                                     limit=int(request.args.get('limit', 100)),
+                                     trace_id=request.args.get('id'))
+    except (KeyError, ValueError):
+        return jsonify({'error': 'bad parameter'}), 400
+    return jsonify({'sample_rate': trace_service.sample_rate(), 'traces': traces})
+
+
+def init_routes(app):
+    """Register the trace endpoint (only imported when TRACE_TOKEN is set)
+
+    Args:
+        app: Flask application
+    """
+    app.register_blueprint(trace_blueprint)
+    logger.info("Trace endpoint enabled")
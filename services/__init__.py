@@ -1,6 +1,7 @@
 """
 Services package
+
+Submodules are imported by name (``from services import room_service``);
+nothing is imported here, so a tool that needs one service does not load
+them all.
 """
-# Import services to make them available via the package
-from . import room_service
-from . import game_service
\ No newline at end of file
@@ -0,0 +1,56 @@
+# services/dashboard_service.py
+"""
+Per-room summaries for the moderator dashboard.
+
+All reads are batched across rooms: one MGET for the room blobs, one pipeline
+for presence and one for the players' last heartbeat RTT, whatever the number
+of rooms.
+"""
+from typing import Any, Dict, List, Optional
+
+from services import room_service, presence_service
+
+
+def _summary(room, sessions: Dict[str, List[str]], rtts: Dict[str, Optional[int]]) -> Dict[str, Any]:
+    trial = room.current_trial() or {}
+    players = []
+    for pid, pdata in room.players.items():
+        if pdata.get('moderator'):
+            continue
+        known = [rtts[sid] for sid in sessions.get(pid, []) if rtts.get(sid) is not None]
+        players.append({
+            'player_id': pid,
+            'username': pdata.get('username'),
+            'role': room.player_role(pid),
+            'ready': pdata.get('ready', False),
+            'online': len(sessions.get(pid, [])),
+            'rtt_ms': min(known) if known else None,
+        })
+    return {
+        'room_code': room.room_code,
+        'started': room.started,
+        'finished': room.finished,
+        'block_index': room.current_block_index,
+        'trial_index': room.current_trial_index,
+        'trials_total': len(room.trials),
+        'turn': trial.get('turn'),
+        'turns_taken': int(trial.get('turns_taken', 0)),
+        'scores': dict(room.scores),
+        'players': players,
+    }
+
+
+def room_summaries(room_codes: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """Summaries for several rooms
+
+    Returns:
+        dict: room_code -> summary, or None for rooms that no longer exist
+    """
+    codes = [c.upper() for c in room_codes]
+    rooms = room_service.get_rooms(codes)
+    sessions = presence_service.sessions_by_room(list(rooms))
+    rtts = presence_service.rtt_ms(sid for s in sessions.values() for sids in s.values() for sid in sids)
+    return {
+        code: _summary(rooms[code], sessions.get(code, {}), rtts) if code in rooms else None
+        for code in codes
+    }
@@ -1,9 +1,11 @@
 # services/game_service.py
-import json, time, logging
+import copy, json, logging
+from contextlib import nullcontext
 from typing import Optional, Dict, Any, List, Tuple
 
 from services.redis_client import get_redis          # client instance (NOT a function)
 from services.room_service import get_room, save_room
+from services import sequence_service, room_events, recording_service, trace_service
 
 
 logger = logging.getLogger(__name__)
@@ -23,29 +25,12 @@ def _emit(event, payload, room_code):
 
 
 # ----------------------- Redis Keys -----------------------
-def _k_trials(code: str)    -> str: return f"room:{code}:trials"
-def _k_trial_idx(code: str) -> str: return f"room:{code}:trial_index"
 def _k_positions(code: str) -> str: return f"room:{code}:positions"      # positions-only JSON
-def _k_deadline(code: str)  -> str: return f"room:{code}:trial_deadline"
 
 def _r(r=None):
     return r or get_redis   # get_redis is already a StrictRedis client in your project
 
 # ----------------------- R/W helpers -----------------------
-def _store_trials(room_code: str, trials: List[dict], r=None):
-    r = _r(r); r.set(_k_trials(room_code), json.dumps(trials))
-
-def _load_trials(room_code: str, r=None) -> Optional[List[dict]]:
-    r = _r(r); raw = r.get(_k_trials(room_code))
-    return json.loads(raw) if raw else None
-
-def _set_trial_idx(room_code: str, idx: int, r=None):
-    r = _r(r); r.set(_k_trial_idx(room_code), str(idx))
-
-def _get_trial_idx(room_code: str, r=None) -> int:
-    r = _r(r); raw = r.get(_k_trial_idx(room_code))
-    return int(raw) if raw is not None else 0
-
 def _save_positions(room_code: str, positions: dict, r=None):
     r = _r(r); r.set(_k_positions(room_code), json.dumps(positions))
 
@@ -53,17 +38,9 @@ def _load_positions(room_code: str, r=None) -> Optional[dict]:
     r = _r(r); raw = r.get(_k_positions(room_code))
     return json.loads(raw) if raw else None
 
-def _set_deadline(room_code: str, ts: float, r=None):
-    r = _r(r); r.set(_k_deadline(room_code), str(int(ts)))
-
-def _get_deadline(room_code: str, r=None) -> Optional[int]:
-    r = _r(r); raw = r.get(_k_deadline(room_code))
-    return int(raw) if raw else None
-
 # ----------------------- Utils -----------------------
 def _emit(sio, event: str, payload: dict, room_code: str):
-    if sio:
-        sio.emit(event, payload, to=room_code)
+    room_events.publish(event, payload, room_code, sio)
 
 def _player_map_RB(room) -> Dict[str, Optional[str]]:
     """
@@ -95,71 +72,85 @@ def _player_map_RB(room) -> Dict[str, Optional[str]]:
 
 
 # ----------------------- Trial control -----------------------
-def _start_trial(room_code: str, idx: int, sio=None):
-    r = _r()
-    trials = _load_trials(room_code, r) or []
-    if idx >= len(trials):
-        _emit(sio, "game_over", {"message": "All trials finished"}, room_code)
-        return None
-
-    room = get_room(room_code)
-    trial = trials[idx]
-    positions, ids = None,None
-
-    # deadline
-    deadline = int(time.time()) + int(trial.get("time_limit_sec", 20))
-    _set_deadline(room_code, deadline, r)
-    _set_trial_idx(room_code, idx, r)
-
-    # Broadcast start (positions-only). Include ids mapping so clients know their role.
-    payload = {
-        "trial_index": idx,
-        "trial_total": len(trials),
-        "positions": positions,
-        "turn": positions["turn"],
-        "ids": ids,                    # clients can map player_id -> 'R'/'B'
-        "deadline": deadline,
-    }
-    # _emit(sio, "game_start", payload, room_code)
-
-    # # Optional: background timer
-    # bg = globals().get("socketio", None)
-    # if bg:
-    #     bg.start_background_task(_trial_timer_task, room_code)
-
-    return payload
-
-def _trial_timer_task(room_code: str):
-    sio = globals().get("socketio", None)
-    r = _r()
-    while True:
-        deadline = _get_deadline(room_code, r)
-        if deadline is None:
-            return
-        now = int(time.time())
-        if now >= deadline:
-            _advance_trial(room_code, reason="timeout", sio=sio)
-            return
-        if sio:
-            sio.sleep(1)
-        else:
-            time.sleep(1)
-
-def _advance_trial(room_code: str, reason: str, sio=None):
-    r = _r()
-    idx = _get_trial_idx(room_code, r)
-    trials = _load_trials(room_code, r) or []
-    if idx >= len(trials):
+_trial_listeners = []
+def add_trial_listener(fn):
+    """Register fn(room_code), called whenever a room's trial changes."""
+    _trial_listeners.append(fn)
+
+_room_lock = lambda room_code: nullcontext()
+def set_room_lock(fn):
+    """Register fn(room_code) -> context manager that serializes a room's
+    changes with its moves (the move coalescer's per-room lock)."""
+    global _room_lock
+    _room_lock = fn
+
+def _emit_events(events: List[Tuple[str, dict]], room_code: str, sio=None):
+    sio = sio or _socketio
+    for event, payload in events:
+        _emit(sio, event, payload, room_code)
+
+def _schedule_trial_timer(room, sio=None):
+    """Start a background task that ends the room's current trial at its time limit."""
+    sio = sio or _socketio
+    trial = room.current_trial()
+    if not sio or not trial or room.finished:
+        return
+    limit = trial.get("time_limit_sec")
+    if not limit:
         return
+    marker = (room.current_block_index, room.current_trial_index)
+    sio.start_background_task(_trial_timer_task, room.room_code, marker, float(limit), sio)
 
-    _emit(sio, "trial_complete", {"trial_index": idx, "reason": reason}, room_code)
+def _trial_timer_task(room_code: str, marker: Tuple[int, int], delay: float, sio):
+    sio.sleep(delay)
+    end_trial(room_code, reason="timeout", marker=marker, sio=sio)
 
-    next_idx = idx + 1
-    if next_idx >= len(trials):
-        _emit(sio, "game_over", {"message": "All trials finished"}, room_code)
-        return
+def end_trial(room_code: str, reason: str = "timeout", marker: Optional[Tuple[int, int]] = None,
+              sio=None) -> List[Tuple[str, dict]]:
+    """End the room's current trial without a move (its time limit ran out)
 
-    _start_trial(room_code, next_idx, sio)
+    Args:
+        marker: (block_index, trial_index) the caller means to end; nothing
+            happens if the room has moved past it in the meantime
+
+    Returns:
+        list: the boundary events broadcast ([] if nothing was ended)
+    """
+    # a move landing at the same moment must not be overwritten (or overwrite us)
+    with _room_lock(room_code.upper()):
+        room = get_room(room_code)
+        if not room or room.finished:
+            return []
+        if marker is not None and (room.current_block_index, room.current_trial_index) != marker:
+            return []  # trial already ended some other way
+        return _advance_trial(room, reason=reason, sio=sio)
+
+def _record_trial_start(room):
+    """Record the layout the room's current trial starts from (replays start here)"""
+    trial = room.current_trial()
+    if trial:
+        recording_service.record(room.room_code, "trial_start", block_index=room.current_block_index,
+                                 trial_index=room.current_trial_index, layout=copy.deepcopy(trial))
+
+def _advance_trial(room, reason: str, sio=None, move: Optional[dict] = None) -> List[Tuple[str, dict]]:
+    """End the room's current trial, persist, then broadcast the boundary events.
+
+    The caller passes the room it already holds, so a trial boundary costs one
+    save and no extra reads. ``move`` is the move that ended the trial, if
+    any (kept in the room log).
+    """
+    events = sequence_service.advance(room, reason)
+    save_room(room, "advance", reason=reason, move=move)
+    for event, payload in events:
+        recording_service.record(room.room_code, event, **payload)
+    if not room.finished:
+        _record_trial_start(room)
+    trace_service.mark("persist")
+    for fn in _trial_listeners:
+        fn(room.room_code)
+    _emit_events(events, room.room_code, sio)
+    _schedule_trial_timer(room, sio)
+    return events
 
 # ----------------------- Public API -----------------------
 def start_game(room_code: str, player_id: str) -> Dict[str, Any]:
@@ -176,10 +167,38 @@ def start_game(room_code: str, player_id: str) -> Dict[str, Any]:
         return {"success": False, "message": f"Need {room.max_players} players to start (currently {len(real_players)})"}
 
     if room.start_game():
+        save_room(room, "start")
+        recording_service.record(room_code, "game_start", players=_player_map_RB(room),
+                                 block_index=room.current_block_index, trial_index=room.current_trial_index)
+        _record_trial_start(room)
+        _schedule_trial_timer(room)
         return {"success": True, "message": "Game started successfully"}
 
     return {"success": False, "message": "Failed to start game"}
 
+def get_game_state(room_code: str, room=None) -> Optional[Dict[str, Any]]:
+    """
+    Current board and progress of a started room.
+    Pass ``room`` when the caller already loaded it, to skip the Redis read.
+    Returns None if the room does not exist or has not started.
+    """
+    room = room or get_room(room_code)
+    if not room or not room.started:
+        return None
+    trial = room.current_trial() or {}
+    return {
+        "block_index": room.current_block_index,
+        "trial_index": room.current_trial_index,
+        "trials_total": len(room.trials),
+        "positions": trial.get("start_positions", {}),
+        "target": trial.get("target"),
+        "capturer": trial.get("capturer"),
+        "turn": trial.get("turn"),
+        "turns_taken": int(trial.get("turns_taken", 0)),
+        "scores": dict(room.scores),
+        "finished": room.finished,
+    }
+
 # ----------------------- Movement & Persistence -----------------------
 
 # services/game_service.py
@@ -191,17 +210,17 @@ def mark_player_ready(room_code: str, player_id: str) -> bool:
     room_code = room_code.upper()
     room = get_room(room_code)
     if not room:
-        logger.warning(f"[ready] room not found: {room_code}")
+        logger.warning("[ready] room not found: %s", room_code)
         return False
     if player_id not in room.players:
-        logger.warning(f"[ready] player not in room: {player_id} / {room_code}")
+        logger.warning("[ready] player not in room: %s / %s", player_id, room_code)
         return False
 
     # flag ready
     pdata = room.players[player_id] or {}
     pdata["ready"] = True
     room.players[player_id] = pdata
-    save_room(room)
+    save_room(room, "ready", player_id=player_id)
 
     return True
 
@@ -262,25 +281,52 @@ def _get_ids_map(room_code: str, r=None) -> Optional[Dict[str, str]]:
 
 from services import room_service
 
-def update_position(room_code: str, player_id: str, dx: int, dy: int):
+def apply_move(room_code: str, player_id: str, dx: int, dy: int) -> Tuple[Optional[Any], Optional[str]]:
     """
-    Update a player's position in the given room.
-    Returns the updated trial dict if successful, else None.
+    Validate and apply a move, ending the trial (and walking the sequence
+    forward) when the move finishes it.
+
+    Returns:
+        tuple: (room, reason) - the room as it is after the call (None if it
+        does not exist) and the rejection reason, or None if the move was applied
     """
     room = room_service.get_room(room_code)
+    trace_service.mark("load")
     if not room:
-        return None
-
-    ok = room.update_player_position(player_id, dx, dy)
-    if not ok:
-        return None
-    save_room(room)
-    return True
-
-
-
-
-
-
+        return None, "room_not_found"
+
+    role = room.player_role(player_id)
+    block_index, trial_index = room.current_block_index, room.current_trial_index
+    reason = room.check_move(player_id, dx, dy)
+    applied = not reason and room.update_player_position(player_id, dx, dy)
+    trace_service.mark("validate")
+    if not applied:
+        recording_service.record(room_code, "move_rejected", player_id=player_id, role=role,
+                                 dx=dx, dy=dy, reason=reason or "rejected",
+                                 block_index=block_index, trial_index=trial_index)
+        return room, reason or "rejected"
+
+    trial = room.current_trial()
+    recording_service.record(room_code, "move", player_id=player_id, role=role, dx=dx, dy=dy,
+                             positions=dict(trial["start_positions"]), turn=trial.get("turn"),
+                             turns_taken=int(trial.get("turns_taken", 0)),
+                             block_index=block_index, trial_index=trial_index)
+
+    outcome = room.trial_outcome()
+    if outcome:
+        _advance_trial(room, reason=outcome, move={"player_id": player_id, "dx": dx, "dy": dy})
+    else:
+        save_room(room, "move", player_id=player_id, dx=dx, dy=dy)
+        trace_service.mark("persist")
+    return room, None
 
 
+def update_position(room_code: str, player_id: str, dx: int, dy: int):
+    """
+    Update a player's position in the given room.
+    Returns the current trial dict if successful, else None.
+    """
+    room, reason = apply_move(room_code, player_id, dx, dy)
+    if reason:
+        return None
+    return room.current_trial()
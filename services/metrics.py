@@ -0,0 +1,262 @@
+# services/metrics.py
+"""
+In-process metrics registry exported in Prometheus text format (``/metrics``).
+
+Counters, gauges and fixed-bucket histograms keep one small record per label
+set behind a per-metric lock (``threading.Lock`` is green under eventlet and
+gevent once monkey patching has run). Recording a value is a dict lookup, a
+bisect and a few additions; nothing is allocated per observation once the
+label set exists. Values that live elsewhere (room counts, rate-limit and
+recorder stats) are read at scrape time by collectors.
+
+Values are per process: with several workers, scrape each one (or aggregate
+by ``instance``) rather than expecting totals from a single scrape.
+"""
+import functools
+import inspect
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+PREFIX = "game_"
+
+# Seconds; covers sub-millisecond handlers up to pathological 10 s requests
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _fmt(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = PREFIX + name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [f"{self.name}{_labels(self.labelnames, k)} {_fmt(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            rec = self._values.get(labels)
+            if rec is None:
+                rec = self._values[labels] = [0] * (len(self.buckets) + 2)
+            rec[i] += 1
+            rec[-1] += value
+
+    def time(self, *labels: str):
+        """Context manager observing the elapsed time of its block"""
+        return _Timer(self, labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        out = self._header()
+        for key, rec in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), rec[:-1]):
+                cumulative += n
+                le = 'le="%s"' % _fmt(bound)
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(rec[-1])}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return out
+
+
+class _Timer:
+    __slots__ = ("hist", "labels", "t0")
+
+    def __init__(self, hist: Histogram, labels: Tuple[str, ...]):
+        self.hist, self.labels = hist, labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.t0, *self.labels)
+
+
+# ----------------------- Registry -----------------------
+_registry: List[_Metric] = []
+_collectors: List[Callable[[], Iterable[str]]] = []
+
+
+def _register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def counter(name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+    return _register(Counter(name, help_text, labelnames))
+
+
+def gauge(name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return _register(Gauge(name, help_text, labelnames))
+
+
+def histogram(name: str, help_text: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+    return _register(Histogram(name, help_text, labelnames, buckets))
+
+
+def add_collector(fn: Callable[[], Iterable[str]]) -> None:
+    """Register a function returning exposition lines, called at every scrape"""
+    _collectors.append(fn)
+
+
+def family(name: str, kind: str, help_text: str, samples: Dict[Tuple[Tuple[str, str], ...], float]) -> List[str]:
+    """Exposition lines for a metric computed by a collector
+
+    Args:
+        samples: ((label, value), ...) -> sample value
+    """
+    full = PREFIX + name
+    out = [f"# HELP {full} {help_text}", f"# TYPE {full} {kind}"]
+    for labels, value in samples.items():
+        names = [n for n, _ in labels]
+        values = [v for _, v in labels]
+        out.append(f"{full}{_labels(names, values)} {_fmt(value)}")
+    return out
+
+
+def render() -> str:
+    """Everything in Prometheus text exposition format"""
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for collect in _collectors:
+        try:
+            lines.extend(collect())
+        except Exception as e:  # one broken source must not hide the rest
+            lines.append(f"# collector {getattr(collect, '__name__', collect)} failed: {_escape(e)}")
+    return "\n".join(lines) + "\n"
+
+
+# ----------------------- Instrumentation -----------------------
+SOCKET_HANDLER_SECONDS = histogram(
+    "socket_handler_seconds", "Socket.IO handler latency", ("event",))
+SOCKET_HANDLER_ERRORS = counter(
+    "socket_handler_errors_total", "Socket.IO handlers that raised", ("event",))
+SOCKETS_CONNECTED = gauge(
+    "sockets_connected", "Socket.IO connections open on this process")
+HTTP_REQUEST_SECONDS = histogram(
+    "http_request_seconds", "HTTP request latency by route", ("route", "method", "status"))
+
+
+def positional_arity(fn: Callable) -> Optional[int]:
+    """Positional arguments ``fn`` accepts (None if it takes ``*args``)"""
+    params = inspect.signature(fn).parameters.values()
+    if any(p.kind == p.VAR_POSITIONAL for p in params):
+        return None
+    return sum(p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD) for p in params)
+
+
+def timed_handler(event: str, fn: Callable) -> Callable:
+    """Wrap a Socket.IO handler to record its latency and failures
+
+    The wrapper accepts any number of arguments and passes the handler only
+    as many as it declares, so Flask-SocketIO's ``connect(auth)`` probing
+    never sees a TypeError from the wrapper itself.
+    """
+    max_args = positional_arity(fn)
+
+    @functools.wraps(fn)
+    def wrapper(*args):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args[:max_args])
+        except Exception:
+            SOCKET_HANDLER_ERRORS.inc(event)
+            raise
+        finally:
+            SOCKET_HANDLER_SECONDS.observe(time.perf_counter() - t0, event)
+    return wrapper
+
+
+def instrument_socketio(socketio) -> None:
+    """Time every handler registered with ``@socketio.on`` from now on"""
+    register = socketio.on
+
+    def on(message, namespace=None):
+        decorator = register(message, namespace)
+
+        def wrap(handler):
+            decorator(timed_handler(message, handler))
+            return handler
+        return wrap
+    socketio.on = on
+
+
+def instrument_app(app) -> None:
+    """Time every Flask request, labelled by URL rule (bounded cardinality)"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_t0 = time.perf_counter()
+
+    @app.after_request
+    def _observe(response):
+        t0 = g.pop("_metrics_t0", None)
+        if t0 is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - t0, route, request.method, str(response.status_code))
+        return response
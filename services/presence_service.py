@@ -0,0 +1,260 @@
+# services/presence_service.py
+"""
+Socket presence, kept outside the room blob.
+
+Every Socket.IO connection that joined a room has its own short-lived key,
+refreshed by client heartbeats, and an entry in its room's presence ZSET
+scored by expiry time. Connects, heartbeats and disconnects therefore never
+rewrite the room JSON, and a worker that dies simply stops refreshing its
+sessions: they expire and the periodic ``sweep`` reports the players that
+went offline, so ``player_left`` still goes out.
+
+A player who stays offline for PRESENCE_GRACE seconds (long enough to reload
+the page or resume after a network drop) is reported by ``abandoned`` so the
+caller can free the seat; the room goes with its last player.
+
+Keys:
+    presence:sid:{sid}     HASH room, player, rtt_ms (TTL = PRESENCE_TTL)
+    presence:room:{code}   ZSET "{player_id}|{sid}" -> expiry (unix seconds)
+    presence:rooms         SET of room codes with presence entries
+    presence:offline       ZSET "{code}|{player_id}" -> end of grace (unix seconds)
+"""
+import logging
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import config
+from services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+# ----------------------- Redis Keys -----------------------
+def _k_sid(sid: str) -> str: return f"presence:sid:{sid}"
+def _k_room(code: str) -> str: return f"presence:room:{code}"
+_K_ROOMS = "presence:rooms"
+_K_OFFLINE = "presence:offline"
+
+def _member(player_id: str, sid: str) -> str: return f"{player_id}|{sid}"
+def _player_of(member: str) -> str: return member.split("|", 1)[0]
+def _seat(room_code: str, player_id: str) -> str: return f"{room_code}|{player_id}"
+
+# KEYS[1]=presence:room:{code}, KEYS[2]=presence:rooms; ARGV[1]=code
+_FORGET_EMPTY_LUA = """
+if redis.call('ZCARD', KEYS[1]) == 0 then
+    return redis.call('SREM', KEYS[2], ARGV[1])
+end
+return 0
+"""
+_forget_empty = get_redis.register_script(_FORGET_EMPTY_LUA)
+
+
+# ----------------------- Sessions -----------------------
+def connect(sid: str, room_code: str, player_id: str, now: Optional[float] = None) -> None:
+    """Register a socket as present in a room
+
+    Args:
+        sid: Socket.IO session id
+        room_code: Room the socket joined
+        player_id: Player the socket belongs to
+    """
+    room_code = room_code.upper()
+    now = time.time() if now is None else now
+    pipe = get_redis.pipeline()
+    pipe.hset(_k_sid(sid), mapping={"room": room_code, "player": player_id})
+    pipe.expire(_k_sid(sid), config.PRESENCE_TTL)
+    pipe.zadd(_k_room(room_code), {_member(player_id, sid): now + config.PRESENCE_TTL})
+    pipe.sadd(_K_ROOMS, room_code)
+    pipe.zrem(_K_OFFLINE, _seat(room_code, player_id))   # back within the grace period
+    pipe.execute()
+
+
+def heartbeat(sid: str, rtt_ms: Optional[float] = None, now: Optional[float] = None) -> bool:
+    """Keep a socket's session alive
+
+    Returns:
+        bool: False if the session already expired (the client must rejoin)
+    """
+    room_code, player_id = get_redis.hmget(_k_sid(sid), "room", "player")
+    if not room_code or not player_id:
+        return False
+    now = time.time() if now is None else now
+    pipe = get_redis.pipeline()
+    if rtt_ms is not None:
+        pipe.hset(_k_sid(sid), "rtt_ms", int(rtt_ms))
+    pipe.expire(_k_sid(sid), config.PRESENCE_TTL)
+    pipe.zadd(_k_room(room_code), {_member(player_id, sid): now + config.PRESENCE_TTL})
+    pipe.execute()
+    return True
+
+
+def disconnect(sid: str, now: Optional[float] = None) -> Optional[Tuple[str, str, bool]]:
+    """Drop a socket's session
+
+    Returns:
+        tuple: (room_code, player_id, still_online) - ``still_online`` is True
+        if the player has other live sockets - or None if the socket had no
+        session (never joined, or already swept)
+    """
+    room_code, player_id = get_redis.hmget(_k_sid(sid), "room", "player")
+    if not room_code or not player_id:
+        return None
+    pipe = get_redis.pipeline()
+    pipe.delete(_k_sid(sid))
+    pipe.zrem(_k_room(room_code), _member(player_id, sid))
+    _, removed = pipe.execute()
+    if not removed:
+        return None                      # the sweep got there first and reported it
+    now = time.time() if now is None else now
+    still_online = player_id in online_players(room_code, now)
+    if not still_online:
+        _forget_empty(keys=[_k_room(room_code), _K_ROOMS], args=[room_code])
+        _start_grace([(room_code, player_id)], now)
+    return room_code, player_id, still_online
+
+
+# ----------------------- Queries -----------------------
+def sessions_by_room(room_codes: Iterable[str], now: Optional[float] = None) -> Dict[str, Dict[str, List[str]]]:
+    """Live socket ids per player for several rooms, in one round trip
+
+    Returns:
+        dict: room_code -> {player_id: [sid, ...]}
+    """
+    codes = [c.upper() for c in room_codes]
+    now = time.time() if now is None else now
+    pipe = get_redis.pipeline()
+    for code in codes:
+        pipe.zrangebyscore(_k_room(code), now, "+inf")
+    result = {}
+    for code, members in zip(codes, pipe.execute()):
+        sessions: Dict[str, List[str]] = {}
+        for m in members:
+            pid, sid = m.split("|", 1)
+            sessions.setdefault(pid, []).append(sid)
+        result[code] = sessions
+    return result
+
+
+def online_by_room(room_codes: Iterable[str], now: Optional[float] = None) -> Dict[str, Dict[str, int]]:
+    """Live sessions per player for several rooms, in one round trip
+
+    Returns:
+        dict: room_code -> {player_id: number of live sockets}
+    """
+    return {
+        code: {pid: len(sids) for pid, sids in sessions.items()}
+        for code, sessions in sessions_by_room(room_codes, now).items()
+    }
+
+
+def online_players(room_code: str, now: Optional[float] = None) -> Dict[str, int]:
+    """Live sessions per player in one room"""
+    return online_by_room([room_code], now)[room_code.upper()]
+
+
+def rtt_ms(sids: Iterable[str]) -> Dict[str, Optional[int]]:
+    """Last round-trip time reported by each socket (None if unknown)"""
+    sids = list(sids)
+    pipe = get_redis.pipeline()
+    for sid in sids:
+        pipe.hget(_k_sid(sid), "rtt_ms")
+    return {sid: int(v) if v else None for sid, v in zip(sids, pipe.execute())}
+
+
+# ----------------------- Sweep -----------------------
+def sweep(now: Optional[float] = None) -> List[Tuple[str, str]]:
+    """Remove expired sessions and report players that went offline
+
+    Safe to run from every worker at once: each expired entry is claimed by
+    exactly one ZREM, so a player is reported once.
+
+    Returns:
+        list: (room_code, player_id) pairs with no live socket left
+    """
+    now = time.time() if now is None else now
+    codes = sorted(get_redis.smembers(_K_ROOMS))
+    if not codes:
+        return []
+
+    pipe = get_redis.pipeline()
+    for code in codes:
+        pipe.zrangebyscore(_k_room(code), "-inf", now)
+    expired = [(code, m) for code, members in zip(codes, pipe.execute()) for m in members]
+    if not expired:
+        return []
+
+    pipe = get_redis.pipeline()
+    for code, m in expired:
+        pipe.zrem(_k_room(code), m)
+    claimed = [(code, _player_of(m)) for (code, m), n in zip(expired, pipe.execute()) if n]
+
+    touched = sorted({code for code, _ in claimed})
+    online = online_by_room(touched, now)
+    for code in touched:
+        _forget_empty(keys=[_k_room(code), _K_ROOMS], args=[code])
+
+    offline = []
+    for code, pid in claimed:
+        if pid not in online[code] and (code, pid) not in offline:
+            offline.append((code, pid))
+    if offline:
+        _start_grace(offline, now)
+        logger.info("Presence sweep: %s players timed out", len(offline))
+    return offline
+
+
+# ----------------------- Grace period -----------------------
+def _start_grace(players: List[Tuple[str, str]], now: float) -> None:
+    """Schedule removal of offline players unless they come back in time"""
+    deadline = now + config.PRESENCE_GRACE
+    get_redis.zadd(_K_OFFLINE, {_seat(code, pid): deadline for code, pid in players})
+
+
+def abandoned(now: Optional[float] = None) -> List[Tuple[str, str]]:
+    """Players whose grace period ran out with no live socket
+
+    Safe to run from every worker at once: each entry is claimed by exactly
+    one ZREM.
+
+    Returns:
+        list: (room_code, player_id) pairs whose seat should be freed
+    """
+    now = time.time() if now is None else now
+    due = get_redis.zrangebyscore(_K_OFFLINE, "-inf", now)
+    if not due:
+        return []
+    pipe = get_redis.pipeline()
+    for seat in due:
+        pipe.zrem(_K_OFFLINE, seat)
+    claimed = [tuple(seat.split("|", 1)) for seat, n in zip(due, pipe.execute()) if n]
+    online = online_by_room({code for code, _ in claimed}, now)
+    return [(code, pid) for code, pid in claimed if pid not in online[code]]
+
+
+def run_sweeper(sio, on_offline, on_abandoned) -> None:
+    """Background loop: sweep every PRESENCE_SWEEP_INTERVAL seconds
+
+    Args:
+        sio: Socket.IO instance (for a cooperative ``sleep``)
+        on_offline: Called with (room_code, player_id) for every player that timed out
+        on_abandoned: Called with (room_code, player_id) for every player still
+            offline at the end of the grace period
+    """
+    while True:
+        sio.sleep(config.PRESENCE_SWEEP_INTERVAL)
+        try:
+            for room_code, player_id in sweep():
+                on_offline(room_code, player_id)
+            for room_code, player_id in abandoned():
+                on_abandoned(room_code, player_id)
+        except Exception as e:
+            logger.warning("Presence sweep failed: %s", e)
+
+
+def clear(room_code: str) -> None:
+    """Drop presence entries of a removed room"""
+    room_code = room_code.upper()
+    pipe = get_redis.pipeline()
+    pipe.delete(_k_room(room_code))
+    pipe.srem(_K_ROOMS, room_code)
+    pipe.execute()
@@ -0,0 +1,344 @@
+# services/profiling_service.py
+"""
+On-demand CPU and memory profiling of a live worker (``/debug/profile``,
+``/debug/memory``; only with ``PROFILE_TOKEN`` set).
+
+``profile`` runs for a bounded number of seconds, one run at a time, in
+one of two modes:
+
+    sample         a real OS thread reads every thread's stack each
+                   ``interval`` seconds; the result is collapsed stacks
+                   (``frame;frame;frame count``) for flamegraph.pl or
+                   speedscope. Wall clock, so idle waits show up too.
+    deterministic  each matching Socket.IO handler call runs under cProfile;
+                   the calls are merged into one pstats table (raw, for
+                   ``pstats``/snakeviz, or printed).
+
+Both can be scoped to socket events and/or rooms (``room_code`` of the
+handler's payload). A scoped sample only keeps stacks that are inside a
+matching handler, and cuts them at the handler. Handlers pass through
+``instrument_socketio``'s wrapper, which does nothing but check a global
+while no run is active. With eventlet/gevent one OS thread hosts every
+handler, so a deterministic run profiles one handler at a time on it
+(others that overlap run unprofiled and are counted as ``skipped``), and
+time a handler spends waiting includes whatever ran meanwhile.
+
+``memory_start`` turns on ``tracemalloc``. ``memory_diff`` returns the
+biggest allocation sites and their growth between the last two snapshots.
+The snapshots are taken on demand, or every ``interval`` seconds by a
+background thread, so the diff covers a steady period. Tracing slows
+allocations and snapshots take the GIL for a moment; stop it when done.
+"""
+import cProfile
+import functools
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, Iterable, List, Optional
+
+import log_pipeline
+from services.metrics import positional_arity
+
+MODES = ("sample", "deterministic")
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _room_of(args) -> Optional[str]:
+    data = args[0] if args else None
+    code = data.get("room_code") if isinstance(data, dict) else None
+    return str(code).upper() if code else None
+
+
+class ProfileRun:
+    """One time-bounded profile and what it collected"""
+
+    def __init__(self, mode: str, events: Optional[Iterable[str]] = None, rooms: Optional[Iterable[str]] = None):
+        self.mode = mode
+        self.events = set(events) if events else None
+        self.rooms = {r.upper() for r in rooms} if rooms else None
+        self.started_at = time.time()
+        self.seconds = 0.0
+        self.calls = 0            # handler calls profiled (deterministic) or sampled stacks
+        self.skipped = 0          # deterministic: overlapping calls on a busy thread
+        self.stacks: Dict[str, int] = {}
+        self.stats = pstats.Stats()
+        self._busy = set()        # OS threads inside a profiled call
+        self.frames: Dict[int, str] = {}    # id(handler wrapper frame) -> event, for scoped sampling
+        self._lock = threading.Lock()
+
+    @property
+    def scoped(self) -> bool:
+        return self.events is not None or self.rooms is not None
+
+    def wants(self, event: str, args) -> bool:
+        if self.events is not None and event not in self.events:
+            return False
+        return self.rooms is None or _room_of(args) in self.rooms
+
+    # ---- deterministic ----
+    def run_profiled(self, fn, args):
+        # keyed on the OS thread: cProfile hooks the thread, and under
+        # eventlet/gevent every greenlet shares it
+        thread = log_pipeline.os_thread_ident()
+        with self._lock:
+            busy = thread in self._busy
+            if busy:
+                self.skipped += 1
+            else:
+                self._busy.add(thread)
+        if busy:
+            return fn(*args)
+        prof = cProfile.Profile()
+        try:
+            return prof.runcall(fn, *args)
+        finally:
+            with self._lock:
+                self._busy.discard(thread)
+                self.calls += 1
+                self.stats.add(prof)
+
+    # ---- sampling ----
+    def sample_once(self, skip_thread: int) -> None:
+        for thread, frame in sys._current_frames().items():
+            if thread == skip_thread:
+                continue
+            labels, event = [], None
+            while frame is not None:
+                if frame.f_code is _WRAPPER_CODE:
+                    event = self.frames.get(id(frame))
+                    if event is not None:
+                        break
+                labels.append(_label(frame.f_code))
+                frame = frame.f_back
+            if self.scoped:
+                if event is None:
+                    continue
+                labels.append(event)
+            key = ";".join(reversed(labels))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.calls += 1
+
+    # ---- artefacts ----
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in sorted(self.stacks.items()))
+
+    def pstats_bytes(self) -> bytes:
+        """Same bytes as ``Stats.dump_stats``; load with ``pstats.Stats(path)``"""
+        return marshal.dumps(self.stats.stats)
+
+    def pstats_text(self, sort: str = "cumulative", limit: int = 60) -> str:
+        out = io.StringIO()
+        self.stats.stream = out
+        self.stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def summary(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "events": sorted(self.events) if self.events else None,
+                "rooms": sorted(self.rooms) if self.rooms else None, "started_at": self.started_at,
+                "seconds": round(self.seconds, 3), "calls": self.calls, "skipped": self.skipped}
+
+
+def _label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+_run: Optional[ProfileRun] = None
+_run_lock = threading.Lock()
+
+
+def profiled_handler(event: str, fn):
+    """Wrap a Socket.IO handler so that an active, matching run sees it"""
+    max_args = positional_arity(fn)
+
+    @functools.wraps(fn)
+    def _profiled(*args):
+        args = args[:max_args]
+        run = _run
+        if run is None or not run.wants(event, args):
+            return fn(*args)
+        if run.mode == "deterministic":
+            return run.run_profiled(fn, args)
+        if not run.scoped:
+            return fn(*args)
+        key = id(sys._getframe())       # this frame, found again by the sampler
+        run.frames[key] = event
+        try:
+            return fn(*args)
+        finally:
+            run.frames.pop(key, None)
+    return _profiled
+
+
+_WRAPPER_CODE = profiled_handler("", lambda: None).__code__
+
+
+def instrument_socketio(socketio) -> None:
+    """Pass every handler registered with ``@socketio.on`` from now on
+    through ``profiled_handler``"""
+    register = socketio.on
+
+    def on(message, namespace=None):
+        decorator = register(message, namespace)
+
+        def wrap(handler):
+            decorator(profiled_handler(message, handler))
+            return handler
+        return wrap
+    socketio.on = on
+
+
+def profile(mode: str = "sample", seconds: float = 10.0, events: Optional[Iterable[str]] = None,
+            rooms: Optional[Iterable[str]] = None, interval: float = 0.005) -> ProfileRun:
+    """Profile this worker for ``seconds`` and return what was collected
+
+    Blocks the caller (a green sleep under eventlet/gevent) for the duration.
+
+    Args:
+        mode: 'sample' or 'deterministic'
+        seconds: Duration
+        events: Only these socket events (default: all)
+        rooms: Only handlers whose payload names one of these rooms
+        interval: Seconds between samples ('sample' mode)
+
+    Raises:
+        ProfilerBusy: Another run is in progress
+    """
+    global _run
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}")
+    run = ProfileRun(mode, events, rooms)
+    if not _run_lock.acquire(blocking=False):
+        raise ProfilerBusy("a profile is already running")
+    try:
+        t0 = time.perf_counter()
+        _run = run
+        if mode == "sample":
+            start_new_thread, allocate_lock = log_pipeline.os_thread_api()
+            stop, done = allocate_lock(), allocate_lock()
+            stop.acquire()
+            done.acquire()
+            start_new_thread(_sampler, (run, stop, done, interval))
+            try:
+                time.sleep(seconds)
+            finally:
+                stop.release()
+                done.acquire(timeout=5)
+        else:
+            time.sleep(seconds)
+        _run = None
+        run.seconds = time.perf_counter() - t0
+    finally:
+        _run = None
+        _run_lock.release()
+    return run
+
+
+def _sampler(run: ProfileRun, stop, done, interval: float) -> None:
+    me = log_pipeline.os_thread_ident()     # sys._current_frames is keyed by OS thread
+    try:
+        while not stop.acquire(timeout=interval):
+            run.sample_once(me)
+    finally:
+        done.release()
+
+
+# ----------------------- tracemalloc -----------------------
+_FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>")]
+
+_mem: Dict[str, Any] = {"previous": None, "latest": None, "stop": None, "interval": None}
+_mem_lock = threading.Lock()
+
+
+def _snapshot():
+    return time.time(), tracemalloc.take_snapshot().filter_traces(_FILTERS)
+
+
+def _roll() -> None:
+    snap = _snapshot()
+    with _mem_lock:
+        _mem["previous"], _mem["latest"] = _mem["latest"], snap
+
+
+def memory_start(frames: int = 10, interval: Optional[float] = None) -> Dict[str, Any]:
+    """Start tracemalloc (if needed) and take the first snapshot
+
+    Args:
+        frames: Frames kept per allocation traceback
+        interval: Also snapshot every ``interval`` seconds in the background
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    _roll()
+    if interval and _mem["stop"] is None:
+        start_new_thread, allocate_lock = log_pipeline.os_thread_api()
+        stop = allocate_lock()
+        stop.acquire()
+        _mem["stop"], _mem["interval"] = stop, float(interval)
+        start_new_thread(_periodic, (stop, float(interval)))
+    return memory_status()
+
+
+def _periodic(stop, interval: float) -> None:
+    while not stop.acquire(timeout=interval):
+        if not tracemalloc.is_tracing():
+            return
+        _roll()
+
+
+def memory_stop() -> None:
+    stop, _mem["stop"], _mem["interval"] = _mem["stop"], None, None
+    if stop is not None:
+        stop.release()
+    tracemalloc.stop()
+    with _mem_lock:
+        _mem["previous"] = _mem["latest"] = None
+
+
+def memory_status() -> Dict[str, Any]:
+    current, peak = tracemalloc.get_traced_memory()
+    return {"tracing": tracemalloc.is_tracing(), "frames": tracemalloc.get_traceback_limit(),
+            "interval": _mem["interval"], "traced_bytes": current, "peak_bytes": peak,
+            "snapshot_at": _mem["latest"][0] if _mem["latest"] else None}
+
+
+def memory_diff(top: int = 25, key: str = "lineno") -> Dict[str, Any]:
+    """Growth per allocation site between the two latest snapshots, and the
+    biggest sites in the latest one
+
+    Without periodic snapshots a new one is taken now (and diffed against the
+    previous call's).
+
+    Args:
+        top: Sites listed
+        key: 'lineno', 'filename' or 'traceback'
+    """
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is not running")
+    if _mem["stop"] is None or _mem["previous"] is None:
+        _roll()
+    with _mem_lock:
+        (t_prev, prev), (t_last, last) = _mem["previous"], _mem["latest"]
+
+    def where(stat) -> List[str]:
+        return [f"{f.filename}:{f.lineno}" for f in stat.traceback]
+
+    diff = last.compare_to(prev, key)
+    return dict(memory_status(), **{
+        "from": t_prev, "to": t_last,
+        "growth_bytes": sum(d.size_diff for d in diff),
+        "growth": [{"where": where(d), "size_diff": d.size_diff, "count_diff": d.count_diff, "size": d.size}
+                   for d in diff[:top]],
+        "largest": [{"where": where(s), "size": s.size, "count": s.count}
+                    for s in last.statistics(key)[:top]],
+    })
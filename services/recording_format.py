@@ -0,0 +1,357 @@
+# services/recording_format.py
+"""
+Columnar binary format for recorded moves (``.hhc``).
+
+Moves are stored as fixed-width typed columns, one contiguous run per column
+per row group, so a reader memory-maps the file and hands out zero-copy
+``memoryview`` columns instead of parsing text. Each trial's moves sit in a
+single row group; the index maps every (room, block, trial) to its row range.
+
+File layout (little-endian)::
+
+    b"HHCOL\\0" u16 version                      header, 8 bytes
+    row group:  column 0 | column 1 | ...        each padded to 8 bytes
+    ...
+    index JSON (utf-8) | u64 index length | b"HHCOLEND"
+
+Index::
+
+    {"version": 1, "columns": [[name, typecode], ...],
+     "groups": [{"offset": int, "rows": int}, ...],
+     "segments": [{"room", "block", "trial", "group", "start", "rows",
+                   "outcome": {...} | null, "layout": {...} | null}, ...],
+     "rooms": {code: {"players": {"R": pid, "B": pid}, ...}}}
+
+Typecodes are ``array``/``memoryview`` codes. Positions are -1 when a player
+has not been placed.
+
+Recordings are packed from the ``events.jsonl`` files written by
+``recording_service`` (``pack_jsonl``) and exported back to text by the
+streaming ``export_csv`` / ``export_ndjson``.
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+MAGIC = b"HHCOL\0"
+FOOTER_MAGIC = b"HHCOLEND"
+VERSION = 1
+ROW_GROUP_SIZE = 65536
+
+COLUMNS: List[Tuple[str, str]] = [
+    ("ts", "d"),            # unix time of the move
+    ("role", "b"),          # 0 = R, 1 = B
+    ("dx", "b"),
+    ("dy", "b"),
+    ("turns_taken", "H"),   # after the move
+    ("r_x", "h"), ("r_y", "h"),
+    ("b_x", "h"), ("b_y", "h"),
+]
+ROLES = ("R", "B")
+CSV_HEADER = ["room", "block_index", "trial_index"] + [name for name, _ in COLUMNS]
+_CSV_ROW = ",".join("%r" if code == "d" else "%d" for _, code in COLUMNS) + "\n"
+
+_SWAP = sys.byteorder != "little"
+_FOOTER = struct.Struct("<Q8s")
+
+
+class FormatError(Exception):
+    pass
+
+
+def _pad(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def move_row(event: Dict[str, Any]) -> tuple:
+    """Column values for a recorded ``move`` event"""
+    pos = event.get("positions") or {}
+    r = pos.get("R") or (-1, -1)
+    b = pos.get("B") or (-1, -1)
+    return (
+        float(event["ts"]), ROLES.index(event["role"]), int(event["dx"]), int(event["dy"]),
+        int(event.get("turns_taken", 0)), int(r[0]), int(r[1]), int(b[0]), int(b[1]),
+    )
+
+
+# ----------------------- Writing -----------------------
+class ColumnarWriter:
+    """Append trials to a new ``.hhc`` file; call ``close`` to write the index
+
+    Memory is bounded by one row group: rows are buffered per column and
+    written out whenever the next trial would overflow ROW_GROUP_SIZE.
+    """
+
+    def __init__(self, path: str, row_group_size: int = ROW_GROUP_SIZE):
+        self.path = path
+        self.row_group_size = row_group_size
+        self._f = open(path, "wb")
+        self._f.write(MAGIC + struct.pack("<H", VERSION))
+        self._cols = [array(code) for _, code in COLUMNS]
+        self._groups: List[Dict[str, int]] = []
+        self._segments: List[Dict[str, Any]] = []
+        self._pending: List[Dict[str, Any]] = []   # segments of the unflushed group
+        self.rooms: Dict[str, Dict[str, Any]] = {}
+        self.rows = 0
+
+    def add_trial(self, room: str, block: int, trial: int, rows: List[tuple],
+                  outcome: Optional[Dict[str, Any]] = None, layout: Optional[Dict[str, Any]] = None) -> None:
+        """Add one trial's moves (tuples in COLUMNS order), its result and starting layout"""
+        buffered = len(self._cols[0])
+        if buffered and buffered + len(rows) > self.row_group_size:
+            self._flush_group()
+            buffered = 0
+        for row in rows:
+            for col, value in zip(self._cols, row):
+                col.append(value)
+        self._pending.append({"room": room, "block": block, "trial": trial, "start": buffered,
+                              "rows": len(rows), "outcome": outcome, "layout": layout})
+        self.rows += len(rows)
+
+    def _flush_group(self) -> None:
+        rows = len(self._cols[0])
+        group = len(self._groups)
+        self._groups.append({"offset": self._f.tell(), "rows": rows})
+        for col in self._cols:
+            if _SWAP:
+                col.byteswap()
+            data = col.tobytes()
+            self._f.write(data + bytes(_pad(len(data)) - len(data)))
+        self._cols = [array(code) for _, code in COLUMNS]
+        for seg in self._pending:
+            seg["group"] = group
+        self._segments.extend(self._pending)
+        self._pending = []
+
+    def close(self) -> None:
+        if self._f.closed:
+            return
+        if self._pending:
+            self._flush_group()
+        index = json.dumps({
+            "version": VERSION, "columns": COLUMNS, "groups": self._groups,
+            "segments": self._segments, "rooms": self.rooms,
+        }, separators=(",", ":")).encode("utf-8")
+        self._f.write(index + _FOOTER.pack(len(index), FOOTER_MAGIC))
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def pack_events(events: Iterable[Dict[str, Any]], writer: ColumnarWriter) -> int:
+    """Stream recorded events into ``writer``; return the number of moves packed
+
+    Events must be in recording order per room (as in ``events.jsonl``). A
+    trial is written when its ``trial_complete`` arrives or the room moves on.
+    """
+    open_trials: Dict[str, Tuple[Tuple[int, int], List[tuple]]] = {}
+    layouts: Dict[Tuple[str, int, int], Dict[str, Any]] = {}
+    moves = 0
+
+    def close_trial(room: str, outcome=None) -> None:
+        key_rows = open_trials.pop(room, None)
+        if key_rows:
+            (block, trial), rows = key_rows
+            writer.add_trial(room, block, trial, rows, outcome, layouts.pop((room, block, trial), None))
+
+    for ev in events:
+        room, kind = ev.get("room"), ev.get("kind")
+        if kind == "move":
+            key = (int(ev["block_index"]), int(ev["trial_index"]))
+            current = open_trials.get(room)
+            if current and current[0] != key:
+                close_trial(room)
+                current = None
+            if current is None:
+                current = open_trials[room] = (key, [])
+            current[1].append(move_row(ev))
+            moves += 1
+        elif kind == "trial_complete":
+            key = (int(ev["block_index"]), int(ev["trial_index"]))
+            current = open_trials.get(room)
+            if current and current[0] != key:
+                close_trial(room)
+            open_trials.setdefault(room, (key, []))    # trials that ended without a move
+            close_trial(room, {k: ev.get(k) for k in ("ts", "reason", "winner", "scores")})
+        elif kind == "trial_start":
+            layouts[(room, int(ev["block_index"]), int(ev["trial_index"]))] = ev.get("layout")
+        elif kind == "game_start":
+            writer.rooms.setdefault(room, {}).update(players=ev.get("players"), started=ev.get("ts"))
+        elif kind == "game_over":
+            writer.rooms.setdefault(room, {}).update(finished=ev.get("ts"), scores=ev.get("scores"))
+    for room in list(open_trials):
+        close_trial(room)
+    return moves
+
+
+def read_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """Events from a recording's ``events.jsonl``, skipping a torn last line"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def pack_jsonl(paths: List[str], out_path: str) -> int:
+    """Pack one or more ``events.jsonl`` files into ``out_path``; return moves packed"""
+    tmp = out_path + ".tmp"
+    with ColumnarWriter(tmp) as writer:
+        moves = sum(pack_events(read_jsonl(p), writer) for p in paths)
+    os.replace(tmp, out_path)
+    return moves
+
+
+# ----------------------- Reading -----------------------
+class Segment:
+    """One trial's moves: zero-copy column views into the mapped file"""
+
+    def __init__(self, reader: "ColumnarReader", meta: Dict[str, Any]):
+        self._reader = reader
+        self.room: str = meta["room"]
+        self.block: int = meta["block"]
+        self.trial: int = meta["trial"]
+        self.rows: int = meta["rows"]
+        self.outcome: Optional[Dict[str, Any]] = meta.get("outcome")
+        self.layout: Optional[Dict[str, Any]] = meta.get("layout")
+        self._group = meta["group"]
+        self._start = meta["start"]
+
+    def column(self, name: str) -> memoryview:
+        col = self._reader.group_column(self._group, name)
+        return col[self._start:self._start + self.rows]
+
+    def iter_rows(self) -> Iterator[tuple]:
+        """Rows as tuples in COLUMNS order"""
+        return zip(*(self.column(name) for name, _ in COLUMNS))
+
+
+class ColumnarReader:
+    """Memory-mapped ``.hhc`` reader
+
+    Column views borrow the mapping; release them (or drop the references)
+    before ``close``.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._f.close()
+            raise FormatError(f"{path}: empty file")
+        self._buf = memoryview(self._mm)
+        if bytes(self._buf[:6]) != MAGIC:
+            raise FormatError(f"{path}: not a columnar recording")
+        length, magic = _FOOTER.unpack_from(self._buf, len(self._buf) - _FOOTER.size)
+        if magic != FOOTER_MAGIC:
+            raise FormatError(f"{path}: truncated (no index)")
+        end = len(self._buf) - _FOOTER.size
+        index = json.loads(bytes(self._buf[end - length:end]))
+        if index.get("version") != VERSION:
+            raise FormatError(f"{path}: unsupported version {index.get('version')}")
+
+        self.columns: List[Tuple[str, str]] = [tuple(c) for c in index["columns"]]
+        self.rooms: Dict[str, Dict[str, Any]] = index.get("rooms", {})
+        self._groups = index["groups"]
+        self._segments = [Segment(self, s) for s in index["segments"]]
+        self.rows = sum(g["rows"] for g in self._groups)
+        self._layout = [self._group_layout(g) for g in self._groups]
+
+    def _group_layout(self, group: Dict[str, int]) -> Dict[str, Tuple[int, int, str]]:
+        layout, offset = {}, group["offset"]
+        for name, code in self.columns:
+            size = group["rows"] * array(code).itemsize
+            layout[name] = (offset, size, code)
+            offset += _pad(size)
+        return layout
+
+    def group_column(self, group: int, name: str) -> memoryview:
+        offset, size, code = self._layout[group][name]
+        raw = self._buf[offset:offset + size]
+        if _SWAP:
+            values = array(code, raw.tobytes())
+            values.byteswap()
+            return memoryview(values)
+        return raw.cast(code)
+
+    def segments(self, room: Optional[str] = None, block: Optional[int] = None,
+                 trial: Optional[int] = None) -> List[Segment]:
+        """Trials in file order, optionally filtered"""
+        return [s for s in self._segments
+                if (room is None or s.room == room)
+                and (block is None or s.block == block)
+                and (trial is None or s.trial == trial)]
+
+    def column(self, name: str) -> memoryview:
+        """One column across the whole file (zero-copy when there is one row group)"""
+        if len(self._groups) == 1:
+            return self.group_column(0, name)
+        code = dict(self.columns)[name]
+        joined = array(code)
+        for group in range(len(self._groups)):
+            joined.frombytes(self.group_column(group, name).tobytes())
+        return memoryview(joined)
+
+    def close(self) -> None:
+        self._segments = []
+        self._buf.release()
+        self._mm.close()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ----------------------- Text exporters -----------------------
+def export_csv(reader: ColumnarReader, out: TextIO, room: Optional[str] = None) -> int:
+    """Write one CSV row per move, trial by trial; return rows written"""
+    out.write(",".join(CSV_HEADER) + "\n")
+    n = 0
+    for seg in reader.segments(room=room):
+        fmt = f"{seg.room},{seg.block},{seg.trial}," + _CSV_ROW
+        out.writelines(fmt % row for row in seg.iter_rows())
+        n += seg.rows
+    return n
+
+
+def export_ndjson(reader: ColumnarReader, out: TextIO, room: Optional[str] = None) -> int:
+    """Write the moves back as ``recording_service`` events (one JSON per line)
+
+    Each trial is followed by its ``trial_complete`` when the outcome was
+    recorded. Returns the number of lines written.
+    """
+    n = 0
+    for seg in reader.segments(room=room):
+        players = (reader.rooms.get(seg.room) or {}).get("players") or {}
+        last_ts = None
+        for ts, role, dx, dy, turns, rx, ry, bx, by in seg.iter_rows():
+            r = ROLES[role]
+            positions = {"R": [rx, ry] if rx >= 0 else None, "B": [bx, by] if bx >= 0 else None}
+            out.write(json.dumps({
+                "ts": ts, "room": seg.room, "kind": "move", "player_id": players.get(r), "role": r,
+                "dx": dx, "dy": dy, "positions": positions, "turn": ROLES[1 - role],
+                "turns_taken": turns, "block_index": seg.block, "trial_index": seg.trial,
+            }, separators=(",", ":")) + "\n")
+            last_ts = ts
+            n += 1
+        if seg.outcome is not None:
+            out.write(json.dumps({
+                "ts": last_ts, "room": seg.room, "kind": "trial_complete",
+                "block_index": seg.block, "trial_index": seg.trial, **seg.outcome,
+            }, separators=(",", ":")) + "\n")
+            n += 1
+    return n
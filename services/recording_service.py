@@ -0,0 +1,272 @@
+# services/recording_service.py
+"""
+Buffered recording of game events for analysis.
+
+Socket handlers call ``record``, which only stamps the event and puts it on a
+bounded in-memory queue: it never touches the disk and never blocks. One
+writer thread drains the queue in batches, groups each batch by room (one
+dyad per room) and appends JSON lines to
+``{recordings_dir}/{room_code}/events.jsonl``. When the queue is full the
+event is dropped and counted, so a slow disk shows up in ``get_stats``
+instead of in move latency.
+
+The writer is a real OS thread even under eventlet/gevent
+(``log_pipeline.os_thread_api``), so writes, fsyncs and packing never hold
+up the hub. A batch or a pack that fails is logged and counted; the writer
+keeps going.
+
+When a room's ``game_over`` is written, its file is closed and packed into
+the columnar ``events.hhc`` next to it (``services/recording_format.py``)
+unless RECORDING_PACK_ON_FINISH is off.
+
+Durability (``config.RECORDING_FSYNC``):
+    - ``"always"``: fsync every touched file after each batch
+    - ``"interval"``: fsync at most every RECORDING_FSYNC_INTERVAL seconds per file
+    - ``"never"``: flush to the OS only
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import config
+import log_pipeline
+from conf import conf_data
+
+logger = logging.getLogger(__name__)
+
+# SimpleQueue and the locks below are safe between green threads and the
+# writer's OS thread (a greened queue.Queue or threading.Event is not)
+_queue: "queue.SimpleQueue[Dict[str, Any]]" = queue.SimpleQueue()
+_directory: Optional[str] = None          # set by start(); None means recording is off
+_stop = None        # released to stop the writer
+_done = None        # held while the writer runs
+
+_stats_lock = log_pipeline.os_thread_api()[1]()
+_stats = {
+    "enqueued": 0,
+    "dropped": 0,
+    "written": 0,
+    "batches": 0,
+    "packed": 0,
+    "fsyncs": 0,
+    "write_errors": 0,
+    "max_depth": 0,
+    "last_flush_ms": 0.0,
+    "max_flush_ms": 0.0,
+}
+
+
+def _bump(**deltas) -> None:
+    with _stats_lock:
+        for k, v in deltas.items():
+            _stats[k] += v
+
+
+# ----------------------- Producer side -----------------------
+def record(room_code: str, kind: str, **fields: Any) -> bool:
+    """Queue an event for the room's recording (never blocks)
+
+    Args:
+        room_code: Room (dyad) the event belongs to
+        kind: Event type ('move', 'move_rejected', 'trial_complete', ...)
+        **fields: Event data (must be JSON-serializable)
+
+    Returns:
+        bool: False if recording is off or the event was dropped (queue full)
+    """
+    if _directory is None:
+        return False
+    if _queue.qsize() >= config.RECORDING_QUEUE_SIZE:
+        _bump(dropped=1)
+        return False
+    _queue.put({"ts": time.time(), "room": room_code.upper(), "kind": kind, **fields})
+    depth = _queue.qsize()
+    with _stats_lock:
+        _stats["enqueued"] += 1
+        if depth > _stats["max_depth"]:
+            _stats["max_depth"] = depth
+    return True
+
+
+def get_stats() -> Dict[str, Any]:
+    """Snapshot of the recorder's counters, with the current queue depth"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["depth"] = _queue.qsize()
+    stats["capacity"] = config.RECORDING_QUEUE_SIZE
+    stats["enabled"] = _directory is not None
+    return stats
+
+
+# ----------------------- Writer side -----------------------
+class _Files:
+    """Open append handles per room, least recently used closed first"""
+
+    def __init__(self, directory: str, limit: int):
+        self.directory = directory
+        self.limit = limit
+        self._files: "OrderedDict[str, Any]" = OrderedDict()
+        self._synced: Dict[str, float] = {}
+
+    def get(self, room_code: str):
+        f = self._files.get(room_code)
+        if f is not None:
+            self._files.move_to_end(room_code)
+            return f
+        room_dir = os.path.join(self.directory, room_code)
+        os.makedirs(room_dir, exist_ok=True)
+        f = open(os.path.join(room_dir, conf_data.append_saver_eventFilename), "a", encoding="utf-8")
+        self._files[room_code] = f
+        while len(self._files) > self.limit:
+            code, old = self._files.popitem(last=False)
+            self._sync(old)
+            old.close()
+            self._synced.pop(code, None)
+        return f
+
+    def _sync(self, f) -> None:
+        f.flush()
+        os.fsync(f.fileno())
+        _bump(fsyncs=1)
+
+    def flushed(self, room_codes: List[str]) -> None:
+        """Apply the fsync policy to files just written"""
+        now = time.monotonic()
+        for code in room_codes:
+            f = self._files.get(code)
+            if f is None:
+                continue                 # evicted by a later room of the batch: synced on close
+            if config.RECORDING_FSYNC == "always":
+                self._sync(f)
+            elif config.RECORDING_FSYNC == "interval" and now - self._synced.get(code, 0) >= config.RECORDING_FSYNC_INTERVAL:
+                self._sync(f)
+                self._synced[code] = now
+            else:
+                f.flush()
+
+    def close_room(self, room_code: str) -> None:
+        f = self._files.pop(room_code, None)
+        self._synced.pop(room_code, None)
+        if f is not None:
+            self._sync(f)
+            f.close()
+
+    def close(self) -> None:
+        for f in self._files.values():
+            self._sync(f)
+            f.close()
+        self._files.clear()
+
+
+def _write_batch(files: _Files, batch: List[Dict[str, Any]]) -> None:
+    t0 = time.perf_counter()
+    by_room: Dict[str, List[str]] = {}
+    try:
+        for event in batch:
+            by_room.setdefault(event["room"], []).append(json.dumps(event, separators=(",", ":")))
+        for code, lines in by_room.items():
+            files.get(code).write("\n".join(lines) + "\n")
+        files.flushed(list(by_room))
+    except Exception as e:
+        _bump(write_errors=1)
+        logger.error("Recording write failed (%s events lost): %s", len(batch), e)
+        return
+    ms = (time.perf_counter() - t0) * 1000.0
+    with _stats_lock:
+        _stats["written"] += len(batch)
+        _stats["batches"] += 1
+        _stats["last_flush_ms"] = ms
+        _stats["max_flush_ms"] = max(_stats["max_flush_ms"], ms)
+
+    if config.RECORDING_PACK_ON_FINISH:
+        for code in {e["room"] for e in batch if e["kind"] == "game_over"}:
+            _pack_room(files, code)
+
+
+def _pack_room(files: _Files, room_code: str) -> None:
+    """Close a finished room's log and pack it into events.hhc"""
+    files.close_room(room_code)
+    room_dir = os.path.join(files.directory, room_code)
+    try:
+        from services import recording_format
+        moves = recording_format.pack_jsonl([os.path.join(room_dir, conf_data.append_saver_eventFilename)],
+                                            os.path.join(room_dir, "events.hhc"))
+    except Exception as e:
+        _bump(write_errors=1)
+        logger.error("Packing recording for %s failed: %s", room_code, e)
+        return
+    _bump(packed=1)
+    logger.info("Packed recording for %s (%s moves)", room_code, moves)
+
+
+def _drain(limit: int) -> List[Dict[str, Any]]:
+    batch = []
+    while len(batch) < limit:
+        try:
+            batch.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _writer(directory: str, stop, done) -> None:
+    files = _Files(directory, config.RECORDING_MAX_OPEN_FILES)
+    try:
+        stopping = False
+        while not stopping:
+            stopping = stop.acquire(timeout=config.RECORDING_FLUSH_INTERVAL)
+            # on shutdown this also drains what is left
+            while True:
+                batch = _drain(config.RECORDING_BATCH_SIZE)
+                if not batch:
+                    break
+                _write_batch(files, batch)
+    except Exception:
+        logger.exception("Recording writer stopped")
+    finally:
+        try:
+            files.close()
+        except Exception as e:
+            logger.error("Closing recordings failed: %s", e)
+        done.release()
+
+
+def start() -> bool:
+    """Start the writer thread if recording is enabled
+
+    Returns:
+        bool: True if recording is on
+    """
+    global _directory, _stop, _done
+    if not config.RECORDING_ENABLED or _directory is not None:
+        return _directory is not None
+    try:
+        directory = conf_data.ensure_recordings_dir()
+    except ValueError as e:
+        logger.warning("Recording disabled: %s", e)
+        return False
+    start_new_thread, allocate_lock = log_pipeline.os_thread_api()
+    _stop, _done = allocate_lock(), allocate_lock()
+    _stop.acquire()
+    _done.acquire()
+    _directory = directory
+    start_new_thread(_writer, (directory, _stop, _done))
+    atexit.register(stop)
+    logger.info("Recording game events to %s (fsync=%s)", directory, config.RECORDING_FSYNC)
+    return True
+
+
+def stop(timeout: float = 5.0) -> None:
+    """Flush what is queued and stop the writer"""
+    global _directory
+    if _directory is None:
+        return
+    _directory = None
+    _stop.release()
+    if _done.acquire(timeout=timeout):
+        _done.release()
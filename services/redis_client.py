@@ -1,7 +1,40 @@
 # services/redis_client.py
+import atexit
 import os
 import redis
 
+import config
+
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-# decode_responses=True makes it return str instead of bytes
-get_redis = redis.StrictRedis.from_url(REDIS_URL, decode_responses=True)
+MEMORY_URL = "memory://"
+
+
+def _memory_pool():
+    """In-process store for a single local worker (load tests, demos); needs
+    fakeredis with Lua support from requirements-dev.txt"""
+    try:
+        import fakeredis
+    except ImportError as e:
+        raise RuntimeError(f"REDIS_URL={MEMORY_URL} needs fakeredis (pip install -r requirements-dev.txt)") from e
+    return fakeredis.FakeStrictRedis(decode_responses=True).connection_pool
+
+
+if REDIS_URL.startswith(MEMORY_URL):
+    _pool = _memory_pool()
+else:
+    # A blocking pool caps connections per worker and makes handlers wait for a free
+    # connection instead of opening new ones. With eventlet/gevent the socket module
+    # is patched before this is imported, so waiting here yields to other green threads.
+    _pool = redis.BlockingConnectionPool.from_url(
+        REDIS_URL,
+        max_connections=config.REDIS_MAX_CONNECTIONS,
+        timeout=config.REDIS_POOL_TIMEOUT,
+        decode_responses=True,  # return str instead of bytes
+    )
+if config.REDIS_PROFILE:
+    # Attribute commands, latency and bytes to the socket event / route issuing them
+    from services import redis_profile
+    get_redis = redis_profile.ProfiledRedis(connection_pool=_pool)
+    atexit.register(redis_profile.log_summary)
+else:
+    get_redis = redis.StrictRedis(connection_pool=_pool)
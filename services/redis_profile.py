@@ -0,0 +1,250 @@
+# services/redis_profile.py
+"""
+Opt-in Redis profiler: commands, round trips, latency and payload bytes per
+socket event and HTTP route (``REDIS_PROFILE=true``).
+
+``redis_client`` then builds ``get_redis`` as a ``ProfiledRedis``, which times
+every command and pipeline and charges it to the scope running in the
+current context: the Socket.IO event name, ``"GET /api/..."`` for HTTP
+requests, or ``background`` for timers and background tasks. Scopes are
+context variables, so concurrent handlers (threads or green threads) never
+see each other's scope.
+
+A pipeline is one round trip holding several commands; it is listed as
+``PIPELINE(CMD ...)`` with the distinct commands it carried. The
+``SCRIPT EXISTS`` probe redis-py sends before a pipeline that runs a script
+is a separate round trip and shows up as such.
+
+Bytes are payload bytes (argument and reply values as seen by the client,
+without RESP framing), which is what matters when whole rooms travel as
+JSON. ``summary_lines()`` gives per-call averages, e.g.::
+
+    move: 7.0 cmds, 4.0 round trips, 2.1 ms, 18.0 KB per call (412 calls) | GET 3.0, PIPELINE(EVALSHA) 1.0, ...
+
+The numbers are per process and cumulative until ``reset()``.
+"""
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+import redis
+from redis.client import Pipeline
+
+logger = logging.getLogger(__name__)
+
+BACKGROUND = "background"
+
+_current: ContextVar[Optional[str]] = ContextVar("redis_profile_scope", default=None)
+_lock = threading.Lock()
+_scopes: Dict[str, Dict[str, Any]] = {}
+
+
+def _scope_stats(name: str) -> Dict[str, Any]:
+    stats = _scopes.get(name)
+    if stats is None:
+        stats = _scopes[name] = {"calls": 0, "round_trips": 0, "cmds": 0, "seconds": 0.0,
+                                 "bytes_out": 0, "bytes_in": 0, "commands": {}}
+    return stats
+
+
+def _size(value: Any) -> int:
+    """Payload bytes of a command argument or reply"""
+    if isinstance(value, str):
+        return len(value) if value.isascii() else len(value.encode("utf-8"))
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, (list, tuple, set)):
+        return sum(_size(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_size(k) + _size(v) for k, v in value.items())
+    if value is None:
+        return 0
+    return len(str(value))
+
+
+def _record(command: str, cmds: int, seconds: float, bytes_out: int, bytes_in: int) -> None:
+    name = _current.get() or BACKGROUND
+    with _lock:
+        stats = _scope_stats(name)
+        stats["round_trips"] += 1
+        stats["cmds"] += cmds
+        stats["seconds"] += seconds
+        stats["bytes_out"] += bytes_out
+        stats["bytes_in"] += bytes_in
+        per = stats["commands"].get(command)
+        if per is None:
+            per = stats["commands"][command] = [0, 0.0, 0, 0]   # round trips, seconds, out, in
+        per[0] += 1
+        per[1] += seconds
+        per[2] += bytes_out
+        per[3] += bytes_in
+
+
+# ----------------------- Client -----------------------
+class ProfiledRedis(redis.StrictRedis):
+    """StrictRedis that records every command it sends"""
+
+    def execute_command(self, *args, **options):
+        t0 = time.perf_counter()
+        result = None
+        try:
+            result = super().execute_command(*args, **options)
+            return result
+        finally:
+            _record(str(args[0]).upper(), 1, time.perf_counter() - t0, _size(args), _size(result))
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return ProfiledPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class ProfiledPipeline(Pipeline):
+    """Pipeline recorded as one round trip; immediate commands (WATCH, script
+    probes) are recorded on their own"""
+
+    _nested = 0.0
+
+    def immediate_execute_command(self, *args, **options):
+        t0 = time.perf_counter()
+        result = None
+        try:
+            result = super().immediate_execute_command(*args, **options)
+            return result
+        finally:
+            elapsed = time.perf_counter() - t0
+            self._nested += elapsed
+            _record(str(args[0]).upper(), 1, elapsed, _size(args), _size(result))
+
+    def execute(self, raise_on_error=True):
+        stack = self.command_stack
+        if not stack:
+            return super().execute(raise_on_error)
+        names = " ".join(sorted({str(args[0]).upper() for args, _ in stack}))
+        n, sent = len(stack), sum(_size(args) for args, _ in stack)
+        self._nested = 0.0
+        t0 = time.perf_counter()
+        result = None
+        try:
+            result = super().execute(raise_on_error)
+            return result
+        finally:
+            elapsed = time.perf_counter() - t0 - self._nested
+            _record(f"PIPELINE({names})", n, elapsed, sent, _size(result))
+
+
+# ----------------------- Scopes -----------------------
+@contextmanager
+def scope(name: str):
+    """Charge the Redis traffic of the enclosed block to ``name``"""
+    with _lock:
+        _scope_stats(name)["calls"] += 1
+    token = _current.set(name)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def instrument_socketio(socketio) -> None:
+    """Run every handler registered with ``@socketio.on`` from now on in a
+    scope named after its event"""
+    from services.metrics import positional_arity
+    register = socketio.on
+
+    def on(message, namespace=None):
+        decorator = register(message, namespace)
+
+        def wrap(handler):
+            max_args = positional_arity(handler)
+
+            @functools.wraps(handler)
+            def scoped(*args):
+                with scope(message):
+                    return handler(*args[:max_args])
+            decorator(scoped)
+            return handler
+        return wrap
+    socketio.on = on
+
+
+def instrument_app(app) -> None:
+    """Run every Flask request in a scope named ``"METHOD rule"``"""
+    from flask import g, request
+
+    @app.before_request
+    def _enter_scope():
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        name = f"{request.method} {route}"
+        with _lock:
+            _scope_stats(name)["calls"] += 1
+        g._redis_profile_token = _current.set(name)
+
+    @app.teardown_request
+    def _exit_scope(exc):
+        token = g.pop("_redis_profile_token", None)
+        if token is not None:
+            _current.reset(token)
+
+
+# ----------------------- Reporting -----------------------
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    """Totals per scope, with a per-command breakdown"""
+    with _lock:
+        out = {}
+        for name, s in _scopes.items():
+            out[name] = dict(s, commands={
+                cmd: {"round_trips": p[0], "seconds": p[1], "bytes_out": p[2], "bytes_in": p[3]}
+                for cmd, p in s["commands"].items()})
+    return out
+
+
+def reset() -> None:
+    with _lock:
+        _scopes.clear()
+
+
+def summary_lines(top: int = 5) -> List[str]:
+    """One line per scope, most Redis time first, averaged per call
+
+    Args:
+        top: Commands listed per scope (by round trips)
+    """
+    lines = []
+    for name, s in sorted(snapshot().items(), key=lambda item: -item[1]["seconds"]):
+        if not s["round_trips"]:
+            continue
+        calls = s["calls"]
+        per = calls or 1
+        unit = f"per call ({calls} calls)" if calls else "total"
+        busiest = sorted(s["commands"].items(), key=lambda item: -item[1]["round_trips"])[:top]
+        commands = ", ".join(f"{cmd} {c['round_trips'] / per:.1f}" for cmd, c in busiest)
+        lines.append(f"{name}: {s['cmds'] / per:.1f} cmds, {s['round_trips'] / per:.1f} round trips, "
+                     f"{s['seconds'] * 1000.0 / per:.2f} ms, "
+                     f"{(s['bytes_out'] + s['bytes_in']) / 1024.0 / per:.1f} KB {unit} | {commands}")
+    return lines
+
+
+def collect() -> List[str]:
+    """/metrics collector"""
+    from services import metrics
+    snap = snapshot()
+    lines: List[str] = []
+    for metric, key, help_text in (
+            ("redis_scope_calls_total", "calls", "Handler invocations seen by the Redis profiler"),
+            ("redis_commands_total", "cmds", "Redis commands issued, by scope"),
+            ("redis_round_trips_total", "round_trips", "Redis round trips, by scope"),
+            ("redis_seconds_total", "seconds", "Time spent waiting on Redis, by scope")):
+        lines += metrics.family(metric, "counter", help_text,
+                                {(("scope", name),): s[key] for name, s in sorted(snap.items())})
+    lines += metrics.family("redis_payload_bytes_total", "counter", "Redis payload bytes, by scope and direction",
+                            {(("scope", name), ("direction", d)): s[f"bytes_{d}"]
+                             for name, s in sorted(snap.items()) for d in ("out", "in")})
+    return lines
+
+
+def log_summary() -> None:
+    for line in summary_lines():
+        logger.info("redis profile: %s", line)
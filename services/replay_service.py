@@ -0,0 +1,313 @@
+# services/replay_service.py
+"""
+Replay recorded sessions to audit them and re-score them under current rules.
+
+A session is rebuilt from a recording (``events.jsonl`` or a packed ``.hhc``)
+as its trials' starting layouts plus the moves played. ``Replay`` runs the
+moves through the live rules (``GameRoom.check_move`` / ``trial_outcome``
+and ``sequence_service.score_trial``), so changing a rule and replaying shows
+what the scores would have been.
+
+One full pass stores a snapshot every ``snapshot_every`` moves; ``state_at``
+restores the nearest snapshot at or before the requested turn and replays at
+most ``snapshot_every`` moves from there. ``rescore_all`` replays many
+recordings in parallel worker processes.
+
+Only trials with a recorded ``trial_start`` layout can be replayed; older
+recordings raise ReplayError.
+"""
+import copy
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import config
+from models.game_room import GameRoom
+from services import recording_format, sequence_service
+
+logger = logging.getLogger(__name__)
+
+# Replay players (the recording's player ids are not needed to apply moves)
+_PIDS = {"R": "replay-R", "B": "replay-B"}
+# Trial endings decided by the moves themselves (GameRoom.trial_outcome)
+_MOVE_OUTCOMES = ("target_reached", "max_turns")
+
+
+class ReplayError(Exception):
+    pass
+
+
+class Move:
+    __slots__ = ("ts", "role", "dx", "dy", "positions")
+
+    def __init__(self, ts: float, role: str, dx: int, dy: int, positions: Optional[Dict[str, Any]] = None):
+        self.ts = ts
+        self.role = role
+        self.dx = dx
+        self.dy = dy
+        self.positions = positions   # as recorded after the move, for auditing
+
+
+class Trial:
+    def __init__(self, block_index: int, trial_index: int):
+        self.block_index = block_index
+        self.trial_index = trial_index
+        self.layout: Optional[Dict[str, Any]] = None
+        self.moves: List[Move] = []
+        self.recorded: Optional[Dict[str, Any]] = None   # the trial_complete as recorded
+
+
+class Session:
+    def __init__(self, room_code: str):
+        self.room_code = room_code
+        self.players: Dict[str, str] = {}
+        self.recorded_scores: Optional[Dict[str, float]] = None
+        self.trials: List[Trial] = []
+
+
+# ----------------------- Loading -----------------------
+def sessions_from_events(events: Iterable[Dict[str, Any]]) -> List[Session]:
+    """Group recorded events into sessions, one per room, in recording order"""
+    sessions: Dict[str, Session] = {}
+    trials: Dict[Tuple[str, int, int], Trial] = {}
+
+    def trial_for(room: str, ev: Dict[str, Any]) -> Trial:
+        key = (room, int(ev["block_index"]), int(ev["trial_index"]))
+        t = trials.get(key)
+        if t is None:
+            t = trials[key] = Trial(key[1], key[2])
+            sessions[room].trials.append(t)
+        return t
+
+    for ev in events:
+        room, kind = ev.get("room"), ev.get("kind")
+        if room not in sessions:
+            sessions[room] = Session(room)
+        if kind == "game_start":
+            sessions[room].players = ev.get("players") or {}
+        elif kind == "trial_start":
+            trial_for(room, ev).layout = ev.get("layout")
+        elif kind == "move":
+            trial_for(room, ev).moves.append(
+                Move(ev["ts"], ev["role"], int(ev["dx"]), int(ev["dy"]), ev.get("positions")))
+        elif kind == "trial_complete":
+            trial_for(room, ev).recorded = {k: ev.get(k) for k in ("reason", "winner", "scores")}
+        elif kind == "game_over":
+            sessions[room].recorded_scores = ev.get("scores")
+    return list(sessions.values())
+
+
+def sessions_from_hhc(path: str) -> List[Session]:
+    """Sessions from a packed columnar recording"""
+    sessions: Dict[str, Session] = {}
+    with recording_format.ColumnarReader(path) as reader:
+        for code, meta in reader.rooms.items():
+            s = sessions[code] = Session(code)
+            s.players = meta.get("players") or {}
+            s.recorded_scores = meta.get("scores")
+        for seg in reader.segments():
+            s = sessions.setdefault(seg.room, Session(seg.room))
+            t = Trial(seg.block, seg.trial)
+            t.layout, t.recorded = seg.layout, seg.outcome
+            for ts, role, dx, dy, _, rx, ry, bx, by in seg.iter_rows():
+                t.moves.append(Move(ts, recording_format.ROLES[role], dx, dy, {
+                    "R": [rx, ry] if rx >= 0 else None, "B": [bx, by] if bx >= 0 else None}))
+            s.trials.append(t)
+    return list(sessions.values())
+
+
+def load_sessions(path: str) -> List[Session]:
+    """Sessions from an ``events.jsonl`` or ``.hhc`` file"""
+    if path.endswith(".hhc"):
+        return sessions_from_hhc(path)
+    return sessions_from_events(recording_format.read_jsonl(path))
+
+
+# ----------------------- Replay -----------------------
+class _Cursor:
+    """Mutable replay position: trial ``ti`` is loaded in ``room``; ``ended``
+    and ``winner`` are set (and the score applied) by the move that ends it"""
+    __slots__ = ("k", "ti", "room", "ended", "winner")
+
+    def __init__(self, k, ti, room, ended=None, winner=None):
+        self.k, self.ti, self.room, self.ended, self.winner = k, ti, room, ended, winner
+
+
+class Replay:
+    """Rebuilds a session's board at any turn and re-scores it"""
+
+    def __init__(self, session: Session, snapshot_every: Optional[int] = None):
+        missing = [f"{t.block_index}/{t.trial_index}" for t in session.trials if t.layout is None]
+        if missing:
+            raise ReplayError(f"{session.room_code}: no recorded layout for trials {', '.join(missing[:5])}")
+        self.session = session
+        self.snapshot_every = max(1, snapshot_every or config.REPLAY_SNAPSHOT_EVERY)
+        self._index = [(ti, mi) for ti, t in enumerate(session.trials) for mi in range(len(t.moves))]
+        self.total_moves = len(self._index)
+        self._snapshots: List[tuple] = []
+        self.results: List[Dict[str, Any]] = []   # per-trial results under current rules
+        self.scores: Dict[str, float] = {}
+        self.divergent_moves = 0                  # replayed position differs from the recording
+        self._full_pass()
+
+    # --- state transitions ---
+    def _load(self, cur: _Cursor, ti: int) -> None:
+        trial = self.session.trials[ti]
+        cur.ti, cur.ended, cur.winner = ti, None, None
+        cur.room.trials = [copy.deepcopy(trial.layout)]
+        cur.room.current_block_index = trial.block_index
+        cur.room.current_trial_index = 0
+
+    def _finalize(self, cur: _Cursor, record: bool) -> None:
+        trial = self.session.trials[cur.ti]
+        state = cur.room.current_trial()
+        recorded = trial.recorded or {}
+        reason, winner = cur.ended, cur.winner
+        if reason is None:
+            # a recorded timeout stands; a recorded move outcome the current rules no longer reach does not
+            reason = recorded.get("reason") if recorded.get("reason") not in _MOVE_OUTCOMES else None
+            reason = reason or "incomplete"
+            winner = sequence_service.score_trial(cur.room, state, reason)
+        if record:
+            self.results.append({
+                "block_index": trial.block_index,
+                "trial_index": trial.trial_index,
+                "reason": reason,
+                "winner": winner,
+                "turns_taken": int(state.get("turns_taken", 0)),
+                "recorded_reason": recorded.get("reason"),
+                "recorded_winner": recorded.get("winner"),
+                "changed": bool(trial.recorded) and (reason, winner) != (recorded.get("reason"), recorded.get("winner")),
+            })
+
+    def _step(self, cur: _Cursor, record: bool) -> None:
+        """Apply the cursor's next recorded move"""
+        ti, mi = self._index[cur.k]
+        while cur.ti < ti:
+            self._finalize(cur, record)
+            self._load(cur, cur.ti + 1)
+        move = self.session.trials[ti].moves[mi]
+        room = cur.room
+        if cur.ended is None and room.check_move(_PIDS[move.role], move.dx, move.dy) is None:
+            room.update_player_position(_PIDS[move.role], move.dx, move.dy)
+            cur.ended = room.trial_outcome()
+            if cur.ended:
+                # scored as the move lands, as the players saw it live
+                cur.winner = sequence_service.score_trial(room, room.current_trial(), cur.ended)
+        if record and move.positions is not None:
+            replayed = room.current_trial()["start_positions"].get(move.role)
+            if list(replayed or []) != list(move.positions.get(move.role) or []):
+                self.divergent_moves += 1
+        cur.k += 1
+
+    def _snapshot(self, cur: _Cursor) -> tuple:
+        return (cur.k, cur.ti, copy.deepcopy(cur.room.trials[0]), dict(cur.room.scores), cur.ended, cur.winner)
+
+    def _restore(self, snap: tuple) -> _Cursor:
+        k, ti, trial_state, scores, ended, winner = snap
+        room = self._new_room()
+        room.trials = [copy.deepcopy(trial_state)]
+        room.current_block_index = self.session.trials[ti].block_index
+        room.scores = dict(scores)
+        return _Cursor(k, ti, room, ended, winner)
+
+    def _new_room(self) -> GameRoom:
+        room = GameRoom(self.session.room_code, load_sequence=False)
+        for number, role in enumerate(("R", "B")):
+            room.players[_PIDS[role]] = {"username": role, "player_number": number, "ready": True}
+        room.started = True
+        return room
+
+    def _full_pass(self) -> None:
+        if not self.session.trials:
+            return
+        cur = _Cursor(0, 0, self._new_room())
+        self._load(cur, 0)
+        while True:
+            if cur.k % self.snapshot_every == 0:
+                self._snapshots.append(self._snapshot(cur))
+            if cur.k == self.total_moves:
+                break
+            self._step(cur, record=True)
+        self._finalize(cur, record=True)
+        while cur.ti + 1 < len(self.session.trials):
+            self._load(cur, cur.ti + 1)
+            self._finalize(cur, record=True)
+        self.scores = dict(cur.room.scores)
+
+    # --- queries ---
+    def state_at(self, turn: int) -> Dict[str, Any]:
+        """Board as the dyad saw it after ``turn`` moves of the session (0 = start)
+
+        Trials that end under the current rules freeze; later recorded moves
+        of that trial are ignored. ``scores`` include the trial the last move
+        ended, as the players saw them at that moment.
+        """
+        if not 0 <= turn <= self.total_moves:
+            raise ReplayError(f"turn {turn} out of range 0..{self.total_moves}")
+        if not self.session.trials:
+            raise ReplayError(f"{self.session.room_code}: nothing recorded")
+        cur = self._restore(self._snapshots[turn // self.snapshot_every])
+        while cur.k < turn:
+            self._step(cur, record=False)
+        trial_meta = self.session.trials[cur.ti]
+        state = cur.room.current_trial()
+        last = self.session.trials[self._index[turn - 1][0]].moves[self._index[turn - 1][1]] if turn else None
+        return {
+            "room_code": self.session.room_code,
+            "turn": turn,
+            "ts": last.ts if last else None,
+            "block_index": trial_meta.block_index,
+            "trial_index": trial_meta.trial_index,
+            "positions": copy.deepcopy(state.get("start_positions", {})),
+            "target": state.get("target"),
+            "next_turn": state.get("turn"),
+            "turns_taken": int(state.get("turns_taken", 0)),
+            "trial_ended": cur.ended,
+            "scores": dict(cur.room.scores),
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "room_code": self.session.room_code,
+            "moves": self.total_moves,
+            "trials": len(self.results),
+            "scores": self.scores,
+            "recorded_scores": self.session.recorded_scores,
+            "changed_trials": [r for r in self.results if r["changed"]],
+            "divergent_moves": self.divergent_moves,
+        }
+
+
+# ----------------------- Bulk -----------------------
+def _rescore_file(path: str) -> List[Dict[str, Any]]:
+    logging.getLogger("models.game_room").setLevel(logging.WARNING)
+    try:
+        sessions = load_sessions(path)
+    except (recording_format.FormatError, OSError, KeyError, ValueError) as e:
+        return [{"room_code": None, "source": path, "error": f"unreadable recording ({e!r})"}]
+    out = []
+    for session in sessions:
+        try:
+            out.append(dict(Replay(session).summary(), source=path))
+        except ReplayError as e:
+            out.append({"room_code": session.room_code, "source": path, "error": str(e)})
+    return out
+
+
+def rescore_all(paths: List[str], workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Replay and re-score every session in ``paths`` (one file per task)
+
+    Args:
+        paths: ``events.jsonl`` / ``.hhc`` files
+        workers: worker processes (default: CPU count; 1 runs in-process)
+
+    Returns:
+        list: one ``Replay.summary()`` (plus ``source``) or ``{"error"}`` per session
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) <= 1:
+        return [r for p in paths for r in _rescore_file(p)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return [r for rs in pool.map(_rescore_file, paths) for r in rs]
@@ -0,0 +1,140 @@
+# services/room_events.py
+"""
+Sequenced room broadcasts with a bounded per-room replay buffer.
+
+Every event broadcast to a room gets the next sequence number of that room
+and is appended to a capped Redis list, in one atomic script call. A client
+that reconnects sends the last sequence number it saw; ``replay`` returns the
+events it missed, or None when the buffer no longer reaches back that far and
+a full ``room_state`` snapshot is needed instead.
+
+Hot events may also have a binary form: sockets that negotiated it sit in the
+room's ``wire_room(code, "bin")`` audience, the rest in ``wire_room(code,
+"json")`` (see ``networking.wire``). The buffer always holds the JSON form.
+"""
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import config
+from services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+_socketio = None
+def set_socketio(sio):  # call once at startup
+    global _socketio
+    _socketio = sio
+
+
+# ----------------------- Redis Keys -----------------------
+def _k_seq(code: str) -> str: return f"roomevents:{code}:seq"
+def _k_buf(code: str) -> str: return f"roomevents:{code}:buf"
+
+
+def wire_room(code: str, fmt: str) -> str:
+    """Socket.IO room holding the sockets of ``code`` that use wire format ``fmt``"""
+    return f"{code.upper()}:{fmt}"
+
+# KEYS[1]=seq, KEYS[2]=buffer; ARGV[1]='"event",{payload}', ARGV[2]=capacity, ARGV[3]=ttl
+_APPEND_LUA = """
+local seq = redis.call('INCR', KEYS[1])
+redis.call('RPUSH', KEYS[2], '[' .. seq .. ',' .. ARGV[1] .. ']')
+redis.call('LTRIM', KEYS[2], -tonumber(ARGV[2]), -1)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return seq
+"""
+_append_script = get_redis.register_script(_APPEND_LUA)
+
+
+def _append(room_code: str, event: str, payload: Dict[str, Any]) -> int:
+    body = json.dumps(event) + "," + json.dumps(payload)
+    return int(_append_script(
+        keys=[_k_seq(room_code), _k_buf(room_code)],
+        args=[body, config.ROOM_EVENT_BUFFER, config.ROOM_EVENT_TTL],
+    ))
+
+
+# ----------------------- Public API -----------------------
+def publish(event: str, payload: Optional[Dict[str, Any]], room_code: str, sio=None,
+            binary: Optional[Callable[[Dict[str, Any]], bytes]] = None, **emit_kwargs) -> int:
+    """Sequence, buffer and broadcast an event to a room
+
+    Args:
+        event: Socket.IO event name
+        payload: Event data (a copy carrying ``seq`` is emitted)
+        room_code: Room to broadcast to
+        sio: Socket.IO instance (defaults to the one set at startup)
+        binary: Packs the sequenced payload into bytes; when given, the event
+            goes out as bytes to the binary audience and as JSON to the rest
+        **emit_kwargs: Extra arguments for ``emit`` (e.g. ``skip_sid``)
+
+    Returns:
+        int: The sequence number assigned to the event
+    """
+    room_code = room_code.upper()
+    payload = dict(payload or {})
+    seq = _append(room_code, event, payload)
+    payload["seq"] = seq
+    sio = sio or _socketio
+    if sio and binary:
+        sio.emit(event, payload, to=wire_room(room_code, "json"), **emit_kwargs)
+        sio.emit(event, binary(payload), to=wire_room(room_code, "bin"), **emit_kwargs)
+    elif sio:
+        sio.emit(event, payload, to=room_code, **emit_kwargs)
+    return seq
+
+
+def current_seq(room_code: str) -> int:
+    """Sequence number of the last event broadcast to a room (0 if none)"""
+    raw = get_redis.get(_k_seq(room_code.upper()))
+    return int(raw) if raw else 0
+
+
+def current_seqs(room_codes: List[str]) -> Dict[str, int]:
+    """``current_seq`` for several rooms with one MGET"""
+    codes = [c.upper() for c in room_codes]
+    if not codes:
+        return {}
+    raws = get_redis.mget([_k_seq(c) for c in codes])
+    return {code: int(raw) if raw else 0 for code, raw in zip(codes, raws)}
+
+
+def replay(room_code: str, last_seq: int) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+    """Return the events a client missed since ``last_seq``
+
+    Returns:
+        list: (event, payload) pairs in order, possibly empty, or None if the
+        buffer has overflowed past ``last_seq`` and a snapshot is required
+    """
+    room_code = room_code.upper()
+    pipe = get_redis.pipeline()
+    pipe.get(_k_seq(room_code))
+    pipe.lrange(_k_buf(room_code), 0, -1)
+    raw_seq, entries = pipe.execute()
+    seq = int(raw_seq) if raw_seq else 0
+
+    if last_seq > seq:
+        return None                      # buffer was reset (room recreated)
+    if last_seq == seq:
+        return []
+
+    missed = []
+    first = None
+    for raw in entries:
+        entry_seq, event, payload = json.loads(raw)
+        if first is None:
+            first = entry_seq
+        if entry_seq > last_seq:
+            payload["seq"] = entry_seq
+            missed.append((event, payload))
+    if first is None or first > last_seq + 1:
+        return None
+    return missed
+
+
+def clear(room_code: str) -> None:
+    """Drop the sequence counter and buffer of a removed room"""
+    room_code = room_code.upper()
+    get_redis.delete(_k_seq(room_code), _k_buf(room_code))
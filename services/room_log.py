@@ -0,0 +1,316 @@
+# services/room_log.py
+"""
+Per-room mutation log on Redis Streams, with a disk archiver.
+
+Every ``save_room`` appends one entry to ``roomlog:{code}`` in the same
+script that writes the room and bumps its version, so the log and the state
+cannot disagree. An entry holds::
+
+    v       room version after the mutation
+    op      create | join | ready | start | move | advance | leave | remove | save
+    data    JSON arguments of the op (player_id, dx/dy, reason, ...)
+    state   full room JSON (only on snapshot entries)
+
+Ops the reducer can re-apply (join, ready, start, move, leave) carry only
+their arguments. The others carry a snapshot, and so does every
+ROOM_LOG_SNAPSHOT_EVERY-th version, so ``derive`` rebuilds a room from the
+last snapshot plus at most that many ops. Streams are trimmed
+(``MAXLEN ~ ROOM_LOG_MAXLEN``, never below one snapshot period).
+
+The archiver is a consumer of the ``archiver`` group on every room stream.
+Each pass it reads new entries in bulk, appends them to
+``{recordings_dir}/{code}/roomlog.jsonl``, fsyncs, then XACKs. Under
+eventlet/gevent the Redis calls stay on the archiver's green thread (the
+pool's sockets are green) while the append and fsync run on a real thread
+of the hub's pool, so socket handlers keep running during a pass. Entries left
+pending by a dead consumer are claimed after ROOM_LOG_CLAIM_IDLE seconds.
+Entries trimmed before the archiver reads them are lost, so
+ROOM_LOG_MAXLEN bounds how long the archiver may be down.
+"""
+import json
+import logging
+import os
+import socket
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis
+
+import config
+from conf import conf_data
+from models.game_room import GameRoom
+from services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+GROUP = "archiver"
+REPLAYABLE = ("join", "ready", "start", "move", "leave")
+
+
+# ----------------------- Redis Keys -----------------------
+def _k_log(code: str) -> str: return f"roomlog:{code.upper()}"
+_K_STREAMS = "roomlog:streams"   # codes whose stream may hold unarchived entries
+
+
+def _maxlen() -> int:
+    return max(config.ROOM_LOG_MAXLEN, config.ROOM_LOG_SNAPSHOT_EVERY)
+
+
+# KEYS[1]=room, KEYS[2]=version, KEYS[3]=log, KEYS[4]=streams set
+# ARGV[1]=room JSON, ARGV[2]=op, ARGV[3]=data JSON, ARGV[4]='1' to force a snapshot,
+# ARGV[5]=snapshot period, ARGV[6]=maxlen, ARGV[7]=ttl, ARGV[8]=code
+_SAVE_LUA = """
+redis.call('SET', KEYS[1], ARGV[1])
+local v = redis.call('INCR', KEYS[2])
+local entry = {'v', v, 'op', ARGV[2], 'data', ARGV[3]}
+if ARGV[4] == '1' or v % tonumber(ARGV[5]) == 1 then
+  entry[7] = 'state'
+  entry[8] = ARGV[1]
+end
+redis.call('XADD', KEYS[3], 'MAXLEN', '~', ARGV[6], '*', unpack(entry))
+redis.call('EXPIRE', KEYS[3], ARGV[7])
+redis.call('SADD', KEYS[4], ARGV[8])
+return v
+"""
+_save_script = get_redis.register_script(_SAVE_LUA)
+
+
+# ----------------------- Writing -----------------------
+def save(pipe, room_key: str, version_key: str, room_code: str, meta_json: str,
+         op: str = "save", data: Optional[Dict[str, Any]] = None) -> None:
+    """Queue on ``pipe``: write the room, bump its version and log the mutation
+
+    The script is queued as a bare EVALSHA (a registered script on a pipeline
+    costs a SCRIPT EXISTS round trip per execute); the caller runs
+    ``load_script`` and retries the pipeline on NoScriptError.
+
+    Args:
+        pipe: Pipeline the caller executes (room_service.save_room)
+        room_key, version_key: The room's state and version keys
+        room_code: Room code
+        meta_json: Serialized room
+        op: Mutation name; ops outside REPLAYABLE are logged with a snapshot
+        data: Op arguments
+    """
+    pipe.evalsha(
+        _save_script.sha, 4,
+        room_key, version_key, _k_log(room_code), _K_STREAMS,
+        meta_json, op, json.dumps(data or {}), "0" if op in REPLAYABLE else "1",
+        config.ROOM_LOG_SNAPSHOT_EVERY, _maxlen(), config.ROOM_LOG_TTL, room_code.upper(),
+    )
+
+
+def load_script() -> None:
+    """Load the save script into Redis (first use, or after a restart or
+    SCRIPT FLUSH answered NOSCRIPT)"""
+    get_redis.script_load(_SAVE_LUA)
+
+
+def log_removed(pipe, room_code: str) -> None:
+    """Queue on ``pipe``: mark the room's log as ended (the stream itself is kept
+    until archived and expired)"""
+    pipe.xadd(_k_log(room_code), {"v": 0, "op": "remove", "data": "{}"}, maxlen=_maxlen(), approximate=True)
+
+
+# ----------------------- Reading -----------------------
+def _entry(entry_id: str, fields: Dict[str, str]) -> Dict[str, Any]:
+    out = {"id": entry_id, "v": int(fields.get("v", 0)), "op": fields.get("op"),
+           "data": json.loads(fields.get("data") or "{}")}
+    if "state" in fields:
+        out["state"] = json.loads(fields["state"])
+    return out
+
+
+def entries(room_code: str, count: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Logged entries of a room, oldest first (the last ``count`` if given)"""
+    key = _k_log(room_code)
+    raw = get_redis.xrevrange(key, count=count) if count else get_redis.xrange(key)
+    items = [_entry(i, f) for i, f in raw]
+    return list(reversed(items)) if count else items
+
+
+def _apply(room: GameRoom, op: str, data: Dict[str, Any]) -> None:
+    if op == "join":
+        room.add_player(data["player_id"], data["username"])
+    elif op == "leave":
+        room.remove_player(data["player_id"])
+    elif op == "ready":
+        room.players[data["player_id"]]["ready"] = True
+    elif op == "start":
+        room.started = True
+    elif op == "move":
+        room.update_player_position(data["player_id"], data["dx"], data["dy"])
+
+
+def derive(room_code: str) -> Tuple[Optional[GameRoom], int]:
+    """Rebuild a room from its log: last snapshot plus the ops after it
+
+    Returns:
+        tuple: (room, version), or (None, 0) if the log is empty, was removed
+        or no longer reaches a snapshot
+    """
+    key = _k_log(room_code)
+    tail: List[Dict[str, Any]] = []
+    last_id = "+"
+    while True:
+        page = get_redis.xrevrange(key, max=last_id, count=config.ROOM_LOG_SNAPSHOT_EVERY + 1)
+        if last_id != "+":
+            page = page[1:]              # max is inclusive
+        if not page:
+            return None, 0
+        for entry_id, fields in page:
+            e = _entry(entry_id, fields)
+            if e["op"] == "remove" and not tail:
+                return None, 0
+            tail.append(e)
+            if "state" in e:
+                room = GameRoom.from_meta(e["state"])
+                for later in reversed(tail[:-1]):
+                    _apply(room, later["op"], later["data"])
+                return room, tail[0]["v"]
+        last_id = page[-1][0]
+
+
+# ----------------------- Archiver -----------------------
+def _archive_path(room_code: str) -> str:
+    room_dir = os.path.join(conf_data.recordings_dir, room_code)
+    os.makedirs(room_dir, exist_ok=True)
+    return os.path.join(room_dir, "roomlog.jsonl")
+
+
+def _ensure_groups(codes: List[str], known: set) -> List[str]:
+    """Create the archiver group on new streams; return the codes whose stream exists"""
+    live = []
+    for code in codes:
+        if code in known:
+            live.append(code)
+            continue
+        try:
+            get_redis.xgroup_create(_k_log(code), GROUP, id="0")
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                # stream expired or never written: nothing left to archive
+                get_redis.srem(_K_STREAMS, code)
+                continue
+        known.add(code)
+        live.append(code)
+    return live
+
+
+def _write(by_code: Dict[str, List[Tuple[str, Dict[str, str]]]]) -> int:
+    """Append entries to the archive files and fsync them; return entries written
+
+    Entries without fields were trimmed from the stream before being read;
+    they are only acked.
+    """
+    n = 0
+    for code, items in by_code.items():
+        items = [(i, fields) for i, fields in items if fields]
+        if not items:
+            continue
+        with open(_archive_path(code), "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(_entry(i, fields), separators=(",", ":")) + "\n" for i, fields in items))
+            f.flush()
+            os.fsync(f.fileno())
+        n += len(items)
+    return n
+
+
+def _off_hub(fn, *args):
+    """Run blocking disk I/O on a real thread, yielding to other green
+    threads meanwhile; a plain call in threading mode"""
+    if config.ASYNC_MODE == "eventlet":
+        from eventlet import tpool
+        return tpool.execute(fn, *args)
+    if config.ASYNC_MODE == "gevent":
+        from gevent import get_hub
+        return get_hub().threadpool.apply(fn, args)
+    return fn(*args)
+
+
+def _ack(by_code: Dict[str, List[Tuple[str, Dict[str, str]]]]) -> None:
+    pipe = get_redis.pipeline(transaction=False)
+    for code, items in by_code.items():
+        pipe.xack(_k_log(code), GROUP, *[i for i, _ in items])
+    pipe.execute()
+
+
+def archive_pass(consumer: str, known: Optional[set] = None, claim: bool = False) -> int:
+    """Drain new entries of every room stream to disk once
+
+    Args:
+        consumer: This archiver's consumer name
+        known: Codes whose group already exists (kept by the caller between passes)
+        claim: Also take over entries pending longer than ROOM_LOG_CLAIM_IDLE
+            on other consumers
+
+    Returns:
+        int: Entries archived
+    """
+    known = known if known is not None else set()
+    codes = sorted(get_redis.smembers(_K_STREAMS))
+    total = 0
+    for offset in range(0, len(codes), config.ROOM_LOG_ARCHIVE_STREAMS):
+        chunk = _ensure_groups(codes[offset:offset + config.ROOM_LOG_ARCHIVE_STREAMS], known)
+        if not chunk:
+            continue
+        by_code: Dict[str, list] = {}
+        if claim:
+            for code in chunk:
+                _, claimed, *_ = get_redis.xautoclaim(_k_log(code), GROUP, consumer,
+                                                      int(config.ROOM_LOG_CLAIM_IDLE * 1000), "0-0",
+                                                      count=config.ROOM_LOG_ARCHIVE_BATCH)
+                if claimed:
+                    by_code.setdefault(code, []).extend(claimed)
+        # "0" re-reads entries this consumer read but never acked (crash before fsync)
+        for start in ("0", ">"):
+            try:
+                resp = get_redis.xreadgroup(GROUP, consumer, {_k_log(c): start for c in chunk},
+                                            count=config.ROOM_LOG_ARCHIVE_BATCH)
+            except redis.ResponseError:
+                known.difference_update(chunk)     # a stream expired; recheck them next pass
+                break
+            for key, items in resp or []:
+                if items:
+                    by_code.setdefault(key.split(":", 1)[1], []).extend(items)
+        if by_code:
+            for items in by_code.values():
+                items.sort(key=lambda item: tuple(int(p) for p in item[0].split("-")))
+            total += _off_hub(_write, by_code)
+            _ack(by_code)
+    return total
+
+
+def consumer_name() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def run_archiver(sio) -> None:
+    """Background task: archive every ROOM_LOG_ARCHIVE_INTERVAL seconds"""
+    consumer, known = consumer_name(), set()
+    last_claim = time.monotonic()
+    while True:
+        sio.sleep(config.ROOM_LOG_ARCHIVE_INTERVAL)
+        claim = time.monotonic() - last_claim >= config.ROOM_LOG_CLAIM_IDLE
+        if claim:
+            last_claim = time.monotonic()
+        try:
+            n = archive_pass(consumer, known, claim=claim)
+            if n:
+                logger.debug("Archived %s room log entries", n)
+        except Exception as e:
+            logger.warning("Room log archive pass failed: %s", e)
+
+
+def start_archiver(sio) -> bool:
+    """Start the archiver task if enabled and the archive directory is usable"""
+    if not config.ROOM_LOG_ARCHIVER:
+        return False
+    try:
+        conf_data.ensure_recordings_dir()
+    except ValueError as e:
+        logger.warning("Room log archiver disabled: %s", e)
+        return False
+    sio.start_background_task(run_archiver, sio)
+    logger.info("Archiving room logs to %s as %s", conf_data.recordings_dir, consumer_name())
+    return True
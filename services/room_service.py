@@ -3,12 +3,16 @@ import json
 import random
 import string
 import logging
+import time
 from typing import Dict, Optional, List, Tuple
 
+import redis
+
 from models.game_room import GameRoom
 import config
 
 from services.redis_client import get_redis  # NEW
+from services import room_events, presence_service, room_log
 
 logger = logging.getLogger(__name__)
 
@@ -18,6 +22,16 @@ logger = logging.getLogger(__name__)
 def _redis_key(room_code: str) -> str:
     return f"room:{room_code.upper()}"
 
+# Listing records: a small summary per room plus creation-ordered indexes, so
+# listing never has to scan keys or decode full rooms
+STATUSES = ("waiting", "playing", "finished")
+def _k_summary(room_code: str) -> str: return f"roomsum:{room_code.upper()}"
+def _k_status(status: str) -> str: return f"roomsum:status:{status}"
+_K_INDEX = "roomsum:index"
+
+# Bumped by every save; lets readers tell whether a room changed with one tiny GET
+def _k_version(room_code: str) -> str: return f"roomver:{room_code.upper()}"
+
 def generate_room_code(length: int = config.ROOM_CODE_LENGTH) -> str:
     while True:
         code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
@@ -33,8 +47,8 @@ def create_room(username: str, max_players: int = config.DEFAULT_MAX_PLAYERS) ->
     room.add_player(moderator_id, username, is_moderator=True)
 
     # Save metadata to Redis
-    get_redis.set(_redis_key(room_code), json.dumps(room.to_meta()))
-    logger.info(f"Created room {room_code} with moderator {username} ({moderator_id})")
+    save_room(room, "create")
+    logger.info("Created room %s with moderator %s (%s)", room_code, username, moderator_id)
 
     return room_code, moderator_id, room
 
@@ -47,11 +61,75 @@ def get_room(room_code: str) -> Optional[GameRoom]:
     meta = _get_meta(room_code)
     if not meta:
         return None
-    return GameRoom.from_meta(meta)
+    return _loaded(GameRoom.from_meta(meta))
+
+def _loaded(room: GameRoom) -> GameRoom:
+    # remember the stored summary so save_room only rewrites it when it changes
+    room._stored_summary = room.to_summary()
+    return room
+
+def get_rooms(room_codes: List[str]) -> Dict[str, GameRoom]:
+    """Load several rooms with one MGET; missing rooms are left out."""
+    codes = [c.upper() for c in room_codes]
+    if not codes:
+        return {}
+    raws = get_redis.mget([_redis_key(c) for c in codes])
+    return {code: _loaded(GameRoom.from_meta(json.loads(raw))) for code, raw in zip(codes, raws) if raw}
+
+def _write_summary(pipe, room: GameRoom, summary: dict) -> None:
+    code = room.room_code
+    pipe.set(_k_summary(code), json.dumps(summary))
+    pipe.zadd(_K_INDEX, {code: room.created_at})
+    for status in STATUSES:
+        if status == summary["status"]:
+            pipe.zadd(_k_status(status), {code: room.created_at})
+        else:
+            pipe.zrem(_k_status(status), code)
+
+def save_room(room: GameRoom, op: str = "save", **data) -> None:
+    """Persist metadata changes to Redis, bump the room's version, append the
+    mutation to the room log and rewrite the listing record if it changed.
 
-def save_room(room: GameRoom) -> None:
-    """Persist metadata changes to Redis."""
-    get_redis.set(_redis_key(room.room_code), json.dumps(room.to_meta()))
+    Args:
+        room: Room to save
+        op: Mutation being saved (see ``room_log``); ops the log cannot
+            re-apply are stored with a full snapshot
+        **data: Op arguments for the log
+    """
+    summary = room.to_summary()
+    meta_json = json.dumps(room.to_meta())
+
+    def queue():
+        pipe = get_redis.pipeline()
+        room_log.save(pipe, _redis_key(room.room_code), _k_version(room.room_code), room.room_code,
+                      meta_json, op, data)
+        if summary != getattr(room, "_stored_summary", None):
+            _write_summary(pipe, room, summary)
+        return pipe
+
+    try:
+        queue().execute()
+    except redis.exceptions.NoScriptError:
+        # the summary writes may have run; they are idempotent, so redo it all
+        room_log.load_script()
+        queue().execute()
+    room._stored_summary = summary
+
+def get_version(room_code: str) -> int:
+    """Room's mutation counter (0 if the room was never saved)."""
+    raw = get_redis.get(_k_version(room_code))
+    return int(raw) if raw else 0
+
+def get_room_versioned(room_code: str) -> Tuple[Optional[GameRoom], int]:
+    """Load a room together with the version it was read at (one MULTI)."""
+    room_code = room_code.upper()
+    pipe = get_redis.pipeline()
+    pipe.get(_redis_key(room_code))
+    pipe.get(_k_version(room_code))
+    raw, version = pipe.execute()
+    if not raw:
+        return None, 0
+    return _loaded(GameRoom.from_meta(json.loads(raw))), int(version or 0)
 
 def join_room(room_code: str, username: str) -> Tuple[bool, str, str]:
     from uuid import uuid4
@@ -59,13 +137,13 @@ def join_room(room_code: str, username: str) -> Tuple[bool, str, str]:
 
     meta = _get_meta(room_code)
     if not meta:
-        logger.warning(f"Room not found: {room_code}")
+        logger.warning("Room not found: %s", room_code)
         return False, "", "Room not found"
 
     room = GameRoom.from_meta(meta)
 
     if room.is_full():
-        logger.warning(f"Room is full: {room_code}")
+        logger.warning("Room is full: %s", room_code)
         return False, "", "Room is full"
 
     player_id = str(uuid4())
@@ -73,41 +151,122 @@ def join_room(room_code: str, username: str) -> Tuple[bool, str, str]:
     if not success:
         return False, "", "Failed to join room"
 
-    save_room(room)  # persist back
-    logger.info(f"Player {player_id} ({username}) joined room {room_code}")
+    save_room(room, "join", player_id=player_id, username=username)  # persist back
+    logger.info("Player %s (%s) joined room %s", player_id, username, room_code)
     return True, player_id, ""
 
 def remove_player(room_code: str, player_id: str) -> bool:
     room_code = room_code.upper()
-    
-    if not room:
-        meta = _get_meta(room_code)
-        if not meta:
-            return False
-        room = GameRoom.from_meta(meta)
+
+    meta = _get_meta(room_code)
+    if not meta:
+        return False
+    room = GameRoom.from_meta(meta)
 
     success = room.remove_player(player_id)
     if success:
         if room.is_empty():
             remove_room(room_code)
         else:
-            save_room(room)
+            save_room(room, "leave", player_id=player_id)
     return success
 
 def remove_room(room_code: str) -> bool:
     room_code = room_code.upper()
 
-    return bool(get_redis.delete(_redis_key(room_code)))
+    room_events.clear(room_code)
+    presence_service.clear(room_code)
+    pipe = get_redis.pipeline()
+    pipe.delete(_redis_key(room_code))
+    room_log.log_removed(pipe, room_code)
+    pipe.delete(_k_summary(room_code), _k_version(room_code))
+    pipe.zrem(_K_INDEX, room_code)
+    for status in STATUSES:
+        pipe.zrem(_k_status(status), room_code)
+    return bool(pipe.execute()[0])
+
+def room_counts() -> Dict[str, int]:
+    """Number of rooms per listing status (one pipelined ZCARD each)"""
+    pipe = get_redis.pipeline(transaction=False)
+    for status in STATUSES:
+        pipe.zcard(_k_status(status))
+    return dict(zip(STATUSES, pipe.execute()))
 
 def get_active_rooms() -> List[str]:
-    keys = get_redis.keys("room:*")
-    return [k.split("room:", 1)[1] for k in keys]
+    return get_redis.zrange(_K_INDEX, 0, -1)
+
+_list_cache: Dict[tuple, Tuple[float, Tuple[int, List[dict]]]] = {}
+
+def list_rooms(status: Optional[str] = None, offset: int = 0, limit: int = 50) -> Tuple[int, List[dict]]:
+    """Page through room summaries, newest first.
+
+    Costs one pipeline (ZCARD + ZREVRANGE) and one MGET of ``limit`` small
+    records whatever the number of rooms. Results are cached in-process for
+    ROOM_LIST_CACHE_TTL seconds.
+
+    Args:
+        status: Only rooms in this status (one of STATUSES), or None for all
+        offset: Number of rooms to skip
+        limit: Page size
+
+    Returns:
+        tuple: (total rooms matching, summaries for this page)
+    """
+    key = (status, offset, limit)
+    now = time.monotonic()
+    hit = _list_cache.get(key)
+    if hit and now - hit[0] < config.ROOM_LIST_CACHE_TTL:
+        return hit[1]
+
+    pipe = get_redis.pipeline()
+    index = _k_status(status) if status else _K_INDEX
+    pipe.zcard(index)
+    pipe.zrevrange(index, offset, offset + limit - 1)
+    total, codes = pipe.execute()
+    raws = get_redis.mget([_k_summary(c) for c in codes]) if codes else []
+    result = (total, [json.loads(raw) for raw in raws if raw])
+
+    if len(_list_cache) > 256:
+        _list_cache.clear()
+    _list_cache[key] = (now, result)
+    return result
+
+def rebuild_room_index(batch: int = 500) -> int:
+    """Write listing records for every stored room (rooms saved before the
+    index existed). Uses SCAN, so it is safe to run against a live server.
+
+    Returns:
+        int: Number of rooms indexed
+    """
+    count = 0
+    keys = []
+    for key in get_redis.scan_iter(match="room:*", count=batch):
+        if key.count(":") == 1:          # skip room:{code}:positions and friends
+            keys.append(key)
+        if len(keys) >= batch:
+            count += _index_batch(keys)
+            keys = []
+    if keys:
+        count += _index_batch(keys)
+    return count
+
+def _index_batch(keys: List[str]) -> int:
+    pipe = get_redis.pipeline()
+    n = 0
+    for raw in get_redis.mget(keys):
+        if raw:
+            room = GameRoom.from_meta(json.loads(raw))
+            _write_summary(pipe, room, room.to_summary())
+            n += 1
+    pipe.execute()
+    return n
 
 def cleanup_inactive_rooms() -> int:
     removed = 0
     for code in get_active_rooms():
         meta = _get_meta(code)
         if not meta:
+            remove_room(code)            # drop a dangling index entry
             continue
         room = GameRoom.from_meta(meta)
         if not room.active or room.is_empty():
@@ -0,0 +1,224 @@
+# services/sequence_service.py
+"""
+Block/trial sequencing engine.
+
+A session is an ordered list of blocks; every block carries its instruction
+screens and an ordered list of trial layouts (the same dict shape as the
+trials in ``conf.game_config.GAME_CONFIG``). The engine walks a ``GameRoom``
+through that sequence in memory and returns the events the caller should
+broadcast, so trial boundaries never need extra Redis reads: the caller
+already holds the room it just mutated and saves it once.
+
+The sequence is ``GAME_CONFIG["blocks"]`` if present, otherwise
+``GAME_CONFIG["trials"]`` as a single block. A block's ``count_scores``
+(default True) decides whether its trials award points; a practice block
+sets it to False. A trial's own ``count_scores`` overrides its block's.
+"""
+import copy
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+Event = Tuple[str, Dict[str, Any]]
+
+_lock = threading.Lock()
+_source_blocks: Optional[list] = None   # raw block dicts (not converted yet)
+_blocks: Dict[int, dict] = {}           # block index -> converted block dict (prefetch cache)
+
+
+# ----------------------- Loading -----------------------
+def _load_game_config_blocks() -> list:
+    from conf import game_config
+    cfg = getattr(game_config, "GAME_CONFIG", {}) or {}
+    board_size = cfg.get("board_size", 4)
+    blocks = cfg.get("blocks")
+    if not blocks:
+        blocks = [{
+            "descriptor": "Main",
+            "instructions": [],
+            "trials": cfg.get("trials", []),
+            "count_scores": True,
+        }]
+    return [
+        {**block, "trials": [{"board_size": board_size, **t} for t in block.get("trials", [])]}
+        for block in blocks
+    ]
+
+
+def _source() -> list:
+    """Return the raw block list, loading it once."""
+    global _source_blocks
+    if _source_blocks is not None:
+        return _source_blocks
+    with _lock:
+        if _source_blocks is None:
+            _source_blocks = _load_game_config_blocks()
+            logger.info("Loaded trial sequence: %s blocks", len(_source_blocks))
+    return _source_blocks
+
+
+def _convert_block(raw: dict) -> dict:
+    return {
+        "descriptor": raw.get("descriptor", ""),
+        "instructions": list(raw.get("instructions", [])),
+        "trials": [dict(t) for t in raw.get("trials", [])],
+        "count_scores": raw.get("count_scores", True),
+    }
+
+
+def block_count() -> int:
+    return len(_source())
+
+
+def get_block(block_index: int) -> Optional[dict]:
+    """Return the converted block at ``block_index`` (cached per process)."""
+    block = _blocks.get(block_index)
+    if block is not None:
+        return block
+    raw = _source()
+    if not (0 <= block_index < len(raw)):
+        return None
+    block = _convert_block(raw[block_index])
+    _blocks[block_index] = block
+    return block
+
+
+def block_trials(block_index: int) -> List[dict]:
+    """Fresh copies of a block's trials, safe for a room to mutate."""
+    block = get_block(block_index)
+    return copy.deepcopy(block["trials"]) if block else []
+
+
+def warm() -> None:
+    """Load the trial bank and convert the first block ahead of the first room.
+
+    Nothing is loaded at import; the app runs this in a background task once
+    the worker is up (``PRELOAD_TRIAL_BANK``), otherwise the first room pays.
+    """
+    t0 = time.perf_counter()
+    get_block(0)
+    logger.info("Trial bank ready in %.0f ms", (time.perf_counter() - t0) * 1000)
+
+
+def reset_cache() -> None:
+    """Drop the loaded sequence so the next access reloads it."""
+    global _source_blocks
+    with _lock:
+        _source_blocks = None
+        _blocks.clear()
+
+
+# ----------------------- Sequencing -----------------------
+def _next_position(block_index: int, trial_index: int) -> Optional[Tuple[int, int]]:
+    """Position after (block_index, trial_index), skipping empty blocks."""
+    block = get_block(block_index)
+    if block and trial_index + 1 < len(block["trials"]):
+        return block_index, trial_index + 1
+    b = block_index + 1
+    while b < block_count():
+        nxt = get_block(b)
+        if nxt and nxt["trials"]:
+            return b, 0
+        b += 1
+    return None
+
+
+def _block_payload(block_index: int) -> Dict[str, Any]:
+    block = get_block(block_index) or {}
+    return {
+        "block_index": block_index,
+        "block_total": block_count(),
+        "descriptor": block.get("descriptor", ""),
+        "instructions": block.get("instructions", []),
+    }
+
+
+def prefetch(room) -> None:
+    """Prepare the layout of the trial after the room's current one.
+
+    Converting a block and deep-copying its layout happens here, while
+    the current trial is being played, so ``advance`` only swaps it in.
+    """
+    pos = _next_position(room.current_block_index, room.current_trial_index)
+    if pos is None:
+        room.next_trial = None
+        return
+    block_index, trial_index = pos
+    layout = copy.deepcopy(get_block(block_index)["trials"][trial_index])
+    room.next_trial = {"block_index": block_index, "trial_index": trial_index, "layout": layout}
+
+
+def begin(room) -> List[Event]:
+    """Position a room on the first trial of the sequence.
+
+    Returns:
+        list: (event, payload) pairs to broadcast to the room
+    """
+    room.current_block_index = 0
+    room.current_trial_index = 0
+    room.trials = block_trials(0)
+    room.finished = False
+    prefetch(room)
+    return [("block_instructions", _block_payload(0))]
+
+
+def score_trial(room, trial: dict, reason: str) -> Optional[str]:
+    """Apply the trial result to ``room.scores``; return the winning role.
+
+    Also used by ``replay_service`` to re-score recorded sessions.
+    """
+    if reason != "target_reached":
+        return None
+    winner = trial.get("capturer")
+    block = get_block(room.current_block_index) or {}
+    if winner and trial.get("count_scores", block.get("count_scores", True)):
+        room.scores[winner] = room.scores.get(winner, 0) + trial.get("reward", 1)
+    return winner
+
+
+def advance(room, reason: str) -> List[Event]:
+    """Finish the current trial and move the room to the next one.
+
+    Args:
+        room: GameRoom already loaded by the caller (mutated in place)
+        reason: why the trial ended ('target_reached', 'max_turns', 'timeout')
+
+    Returns:
+        list: (event, payload) pairs to broadcast once the room is saved
+    """
+    if room.finished:
+        return []
+
+    trial = room.current_trial() or {}
+    winner = score_trial(room, trial, reason)
+    events: List[Event] = [("trial_complete", {
+        "block_index": room.current_block_index,
+        "trial_index": room.current_trial_index,
+        "reason": reason,
+        "winner": winner,
+        "scores": dict(room.scores),
+    })]
+
+    nxt = room.next_trial
+    if nxt is None:
+        room.finished = True
+        events.append(("game_over", {"message": "All trials finished", "scores": dict(room.scores)}))
+        return events
+
+    if nxt["block_index"] != room.current_block_index:
+        room.trials = block_trials(nxt["block_index"])
+        events.append(("block_instructions", _block_payload(nxt["block_index"])))
+
+    room.current_block_index = nxt["block_index"]
+    room.current_trial_index = nxt["trial_index"]
+    room.trials[room.current_trial_index] = nxt["layout"]
+    prefetch(room)
+    return events
+
+
+def current_block_payload(room) -> Dict[str, Any]:
+    """Block info for ``room_state`` so late joiners see the instructions too."""
+    return _block_payload(room.current_block_index)
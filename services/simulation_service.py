@@ -0,0 +1,379 @@
+# services/simulation_service.py
+"""
+Headless sessions: whole games played in-process by scripted policies.
+
+A session creates a room, joins two players, readies them, starts the game
+and plays every trial of the sequence until game over. It uses no sockets
+and no browser. Each turn the player to move asks its policy for a step.
+A trial ends the way it would live: target reached, max turns, or a
+timeout. A timeout comes from a simulated clock (``move_seconds`` per move
+against the trial's ``time_limit_sec``), or from ``max_moves`` per trial,
+or from a player with no legal step.
+
+Two backends run the same driver:
+
+    service   room_service / game_service over the configured store, the
+              exact calls the socket handlers make (REDIS_URL=memory:// keeps
+              it in-process)
+    model     GameRoom + sequence_service only: the rules and sequencing
+              without storage or serialization
+
+Every backend call is timed into a phase (create, join, ready, start, move,
+move_advance, timeout, cleanup), and so is the policy's decision (policy).
+Comparing the two backends separates the cost of the game logic from that
+of storage. ``simulate`` spreads sessions over worker processes and returns
+aggregate outcomes and phase timings.
+
+Policies are classes with ``choose(view) -> (dx, dy)``, built with a seeded
+``random.Random``. Pick a built-in by name (POLICIES) or give a
+``module:Class`` path.
+"""
+import importlib
+import logging
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from models.game_room import GameRoom
+from services import game_service, room_service, sequence_service
+
+logger = logging.getLogger(__name__)
+
+STEPS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+PHASES = ("create", "join", "ready", "start", "policy", "move", "move_advance", "timeout", "cleanup")
+
+
+class SimulationError(Exception):
+    pass
+
+
+# ----------------------- Policies -----------------------
+class View:
+    """What the player to move knows when choosing a step"""
+    __slots__ = ("role", "position", "other", "target", "capturer", "board_size", "turns_taken", "legal")
+
+    def __init__(self, role, position, other, target, capturer, board_size, turns_taken, legal):
+        self.role = role
+        self.position = position
+        self.other = other
+        self.target = target
+        self.capturer = capturer
+        self.board_size = board_size
+        self.turns_taken = turns_taken
+        self.legal = legal            # steps the rules accept right now
+
+    @property
+    def is_capturer(self) -> bool:
+        return self.role == self.capturer
+
+
+def _distance(a, b) -> int:
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+
+class RandomPolicy:
+    """Any legal step"""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+
+    def choose(self, view: View) -> Tuple[int, int]:
+        return self.rng.choice(view.legal)
+
+    def _closest(self, view: View, goal, sign: int = 1) -> Tuple[int, int]:
+        """Legal step minimizing (sign=1) or maximizing (sign=-1) the distance to ``goal``"""
+        x, y = view.position
+        best = min(sign * _distance((x + dx, y + dy), goal) for dx, dy in view.legal)
+        return self.rng.choice([s for s in view.legal if sign * _distance((x + s[0], y + s[1]), goal) == best])
+
+
+class GreedyPolicy(RandomPolicy):
+    """The capturer heads straight for the target; the other player wanders"""
+
+    def choose(self, view: View) -> Tuple[int, int]:
+        if view.is_capturer and view.target:
+            return self._closest(view, view.target)
+        return super().choose(view)
+
+
+class HelperPolicy(GreedyPolicy):
+    """Greedy capturer; the other player keeps away from the target"""
+
+    def choose(self, view: View) -> Tuple[int, int]:
+        if not view.is_capturer and view.target:
+            return self._closest(view, view.target, sign=-1)
+        return super().choose(view)
+
+
+class HindererPolicy(GreedyPolicy):
+    """Greedy capturer; the other player crowds the target to block it"""
+
+    def choose(self, view: View) -> Tuple[int, int]:
+        if not view.is_capturer and view.target:
+            return self._closest(view, view.target)
+        return super().choose(view)
+
+
+POLICIES = {"random": RandomPolicy, "greedy": GreedyPolicy, "helper": HelperPolicy, "hinderer": HindererPolicy}
+
+
+def load_policy(spec: str):
+    """A policy class from a built-in name or ``module:Class``"""
+    if spec in POLICIES:
+        return POLICIES[spec]
+    module, _, name = spec.partition(":")
+    if not name:
+        raise SimulationError(f"unknown policy {spec!r} (built-in: {', '.join(POLICIES)}, or module:Class)")
+    return getattr(importlib.import_module(module), name)
+
+
+# ----------------------- Backends -----------------------
+class ModelBackend:
+    """GameRoom and sequence_service only, as game_service.apply_move calls them"""
+
+    def __init__(self, index: int):
+        self.room = GameRoom(f"SIM{index:06d}")
+        self.moderator = f"sim-mod-{index}"
+        self.room.add_player(self.moderator, "sim-mod", is_moderator=True)
+
+    def join(self, username: str) -> str:
+        player_id = f"{self.room.room_code}-{username}"
+        if not self.room.add_player(player_id, username):
+            raise SimulationError(f"{username} could not join")
+        return player_id
+
+    def ready(self, player_id: str) -> None:
+        self.room.players[player_id]["ready"] = True
+
+    def start(self) -> None:
+        if not self.room.start_game():
+            raise SimulationError("game did not start")
+
+    def move(self, player_id: str, dx: int, dy: int) -> Optional[str]:
+        room = self.room
+        if room.check_move(player_id, dx, dy) or not room.update_player_position(player_id, dx, dy):
+            raise SimulationError(f"move {dx},{dy} rejected")
+        outcome = room.trial_outcome()
+        if outcome:
+            sequence_service.advance(room, outcome)
+        return outcome
+
+    def timeout(self) -> None:
+        sequence_service.advance(self.room, "timeout")
+
+    def cleanup(self) -> None:
+        pass
+
+
+class ServiceBackend:
+    """room_service / game_service over the configured store"""
+
+    def __init__(self, index: int):
+        self.code, self.moderator, self.room = room_service.create_room("sim-mod")
+
+    def join(self, username: str) -> str:
+        ok, player_id, message = room_service.join_room(self.code, username)
+        if not ok:
+            raise SimulationError(f"{username} could not join: {message}")
+        return player_id
+
+    def ready(self, player_id: str) -> None:
+        if not game_service.mark_player_ready(self.code, player_id):
+            raise SimulationError(f"{player_id} could not get ready")
+
+    def start(self) -> None:
+        result = game_service.start_game(self.code, self.moderator)
+        if not result["success"]:
+            raise SimulationError(result["message"])
+        self.room = room_service.get_room(self.code)
+
+    def move(self, player_id: str, dx: int, dy: int) -> Optional[str]:
+        # the outcome is read off the room as it was before the move (a
+        # throwaway copy: apply_move returns the new one)
+        self.room.update_player_position(player_id, dx, dy)
+        outcome = self.room.trial_outcome()
+        room, reason = game_service.apply_move(self.code, player_id, dx, dy)
+        if reason:
+            raise SimulationError(f"move {dx},{dy} rejected ({reason})")
+        self.room = room
+        return outcome
+
+    def timeout(self) -> None:
+        marker = (self.room.current_block_index, self.room.current_trial_index)
+        game_service.end_trial(self.code, reason="timeout", marker=marker)
+        self.room = room_service.get_room(self.code)
+
+    def cleanup(self) -> None:
+        room_service.remove_room(self.code)
+
+
+BACKENDS = {"model": ModelBackend, "service": ServiceBackend}
+
+
+# ----------------------- Driver -----------------------
+def _new_stats() -> Dict[str, Any]:
+    return {"sessions": 0, "errors": 0, "first_error": None, "trials": 0, "moves": 0,
+            "reasons": Counter(), "winners": Counter(), "scores": Counter(),
+            "phases": {p: [0, 0.0] for p in PHASES}}
+
+
+def _view(room: GameRoom, player_id: str) -> View:
+    trial = room.current_trial()
+    role = room.player_role(player_id)
+    positions = trial.get("start_positions", {})
+    legal = [s for s in STEPS if room.check_move(player_id, *s) is None]
+    return View(role, positions.get(role), positions.get("B" if role == "R" else "R"), trial.get("target"),
+                trial.get("capturer"), int(trial.get("board_size") or 4), int(trial.get("turns_taken", 0)), legal)
+
+
+def run_session(index: int, backend: str, policies: Dict[str, type], seed: int, stats: Dict[str, Any],
+                max_moves: int = 200, move_seconds: float = 1.0) -> None:
+    """Play one session start to finish, adding its outcome and timings to ``stats``"""
+    phases = stats["phases"]
+
+    def timed(phase, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            rec = phases[phase]
+            rec[0] += 1
+            rec[1] += time.perf_counter() - t0
+
+    rng = random.Random(seed + index)
+    b = timed("create", BACKENDS[backend], index)
+    try:
+        players = [timed("join", b.join, name) for name in ("sim-red", "sim-blue")]
+        for player_id in players:
+            timed("ready", b.ready, player_id)
+        timed("start", b.start)
+        by_role = {b.room.player_role(p): p for p in players}
+        chosen = {role: policies[role](random.Random(rng.random())) for role in by_role}
+
+        moves_in_trial = 0
+        while not b.room.finished:
+            trial = b.room.current_trial()
+            if trial is None:
+                raise SimulationError("no active trial")
+            player_id = by_role[trial.get("turn") or "R"]
+            limit = trial.get("time_limit_sec")
+            t0 = time.perf_counter()
+            view = _view(b.room, player_id)
+            step = chosen[view.role].choose(view) if view.legal else None
+            rec = phases["policy"]
+            rec[0] += 1
+            rec[1] += time.perf_counter() - t0
+
+            if step is None or moves_in_trial >= max_moves or (limit and moves_in_trial * move_seconds >= float(limit)):
+                timed("timeout", b.timeout)
+                reason, winner = "timeout", None
+            else:
+                t0 = time.perf_counter()
+                reason = b.move(player_id, *step)
+                phase = "move_advance" if reason else "move"
+                phases[phase][0] += 1
+                phases[phase][1] += time.perf_counter() - t0
+                stats["moves"] += 1
+                moves_in_trial += 1
+                winner = trial.get("capturer") if reason == "target_reached" else None
+                if not reason:
+                    continue
+            stats["trials"] += 1
+            stats["reasons"][reason] += 1
+            if winner:
+                stats["winners"][winner] += 1
+            moves_in_trial = 0
+        stats["sessions"] += 1
+        stats["scores"].update({k: v for k, v in b.room.scores.items()})
+    except Exception as e:
+        stats["errors"] += 1
+        if stats["first_error"] is None:
+            stats["first_error"] = f"session {index}: {e!r}"
+    finally:
+        timed("cleanup", b.cleanup)
+
+
+def _run_chunk(args) -> Dict[str, Any]:
+    start, count, backend, policy_specs, seed, max_moves, move_seconds = args
+    logging.getLogger("models.game_room").setLevel(logging.WARNING)
+    policies = {role: load_policy(spec) for role, spec in policy_specs.items()}
+    stats = _new_stats()
+    for index in range(start, start + count):
+        run_session(index, backend, policies, seed, stats, max_moves, move_seconds)
+    return stats
+
+
+def _merge(total: Dict[str, Any], part: Dict[str, Any]) -> None:
+    for key in ("sessions", "errors", "trials", "moves"):
+        total[key] += part[key]
+    total["first_error"] = total["first_error"] or part["first_error"]
+    for key in ("reasons", "winners", "scores"):
+        total[key].update(part[key])
+    for phase, (n, s) in part["phases"].items():
+        total["phases"][phase][0] += n
+        total["phases"][phase][1] += s
+
+
+def simulate(sessions: int, policies: Dict[str, str], backend: str = "model", workers: Optional[int] = None,
+             seed: int = 0, max_moves: int = 200, move_seconds: float = 1.0) -> Dict[str, Any]:
+    """Play ``sessions`` headless sessions, over worker processes
+
+    Args:
+        sessions: Number of sessions
+        policies: role ('R'/'B') -> policy name or ``module:Class``
+        backend: 'model' or 'service'
+        workers: Processes (default: CPU count; 1 runs in-process)
+        seed: Base seed; session i uses ``seed + i``, so runs are repeatable
+        max_moves: Moves after which a trial times out
+        move_seconds: Simulated seconds per move, against ``time_limit_sec``
+
+    Returns:
+        dict: sessions, sessions_per_s, outcome counts, mean scores and
+        per-phase totals (calls, total_s, mean_us, share of the timed work)
+    """
+    if backend not in BACKENDS:
+        raise SimulationError(f"unknown backend {backend!r} ({', '.join(BACKENDS)})")
+    for spec in policies.values():
+        load_policy(spec)
+    workers = max(1, min(workers or os.cpu_count() or 1, sessions))
+    size = -(-sessions // workers)
+    chunks = [(i, min(size, sessions - i), backend, policies, seed, max_moves, move_seconds)
+              for i in range(0, sessions, size)]
+
+    total = _new_stats()
+    t0 = time.perf_counter()
+    if workers == 1:
+        for chunk in chunks:
+            _merge(total, _run_chunk(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for part in pool.map(_run_chunk, chunks):
+                _merge(total, part)
+    wall = time.perf_counter() - t0
+
+    timed_total = sum(s for _, s in total["phases"].values()) or 1.0
+    done = total["sessions"] or 1
+    return {
+        "backend": backend,
+        "policies": policies,
+        "workers": workers,
+        "sessions": total["sessions"],
+        "errors": total["errors"],
+        "first_error": total["first_error"],
+        "wall_s": round(wall, 3),
+        "sessions_per_s": round(total["sessions"] / wall, 1) if wall else None,
+        "trials": total["trials"],
+        "moves": total["moves"],
+        "moves_per_trial": round(total["moves"] / total["trials"], 2) if total["trials"] else None,
+        "reasons": dict(total["reasons"]),
+        "winners": dict(total["winners"]),
+        "mean_scores": {role: round(v / done, 3) for role, v in sorted(total["scores"].items())},
+        "phases": {
+            phase: {"calls": n, "total_s": round(s, 4), "mean_us": round(s / n * 1e6, 2) if n else None,
+                    "share": round(s / timed_total, 4)}
+            for phase, (n, s) in total["phases"].items() if n
+        },
+    }
@@ -0,0 +1,221 @@
+# services/trace_service.py
+"""
+Sampled end-to-end traces of client moves.
+
+Every ``board_update`` carries a ``trace_id`` and the client's send time
+``client_ts`` (ms since the epoch). For a sampled move (``TRACE_SAMPLE_RATE``,
+changeable at runtime with ``set_sample_rate``) the server times these spans:
+
+    receive    payload checks, rate limits, per-room move slot
+    load       reading the room
+    validate   rule check and applying the move
+    persist    recording and saving the room (plus the trial boundary)
+    emit       broadcasting the new board
+
+The spans come from ``mark(name)`` calls along the handler: each one closes
+the span that began at the previous mark. A mark outside a sampled move
+costs one context-variable read, so the calls can stay in the hot path.
+
+The ack of a sampled move carries the ``trace_id``. The client then reports
+``trace_render`` with the time from sending to the ack and to the first
+frame drawn after it, both on its own clock. Subtracting the server time
+leaves the time spent in the network and the client, with no clock skew.
+``client_ts`` is kept too, but it is only comparable with the server clock
+when the two are in sync.
+
+Finished traces go to a per-process ring buffer of ``TRACE_BUFFER_SIZE``
+entries, which ``/debug/traces`` queries. A player id is what a socket
+presents to act as that player, so traces only keep its ``player_tag``.
+"""
+import hashlib
+import random
+import threading
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+import config
+from services import metrics
+
+SPANS = ("receive", "load", "validate", "persist", "emit")
+_MAX_ID = 64
+
+SPAN_SECONDS = metrics.histogram(
+    "move_trace_span_seconds", "Server-side spans of sampled moves", ["span"])
+
+_current: ContextVar[Optional[Dict[str, Any]]] = ContextVar("move_trace", default=None)
+_lock = threading.Lock()
+_buffer: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()      # trace_id -> trace, oldest first
+_sample_rate = config.TRACE_SAMPLE_RATE
+
+
+def player_tag(player_id: Any) -> Optional[str]:
+    """Stable, non-reversible stand-in for a player id in stored traces"""
+    if not player_id:
+        return None
+    return hashlib.sha256(str(player_id).encode()).hexdigest()[:16]
+
+
+def sample_rate() -> float:
+    return _sample_rate
+
+
+def set_sample_rate(rate: float) -> None:
+    """Fraction of moves traced from now on (0 turns tracing off)"""
+    global _sample_rate
+    _sample_rate = min(1.0, max(0.0, float(rate)))
+
+
+def begin(trace_id: Any, client_ts: Any = None, **fields) -> Optional[Dict[str, Any]]:
+    """Start tracing the current move if it is sampled
+
+    Args:
+        trace_id: Client-chosen id (one is made up if missing)
+        client_ts: Client send time, ms since the epoch
+        **fields: Attributes kept with the trace (room, player tag, ...);
+            never a raw player id
+
+    Returns:
+        dict: The trace, or None if this move is not sampled
+    """
+    if not _sample_rate or random.random() >= _sample_rate:
+        _current.set(None)      # a handler thread may run several moves in one context
+        return None
+    now = time.perf_counter()
+    trace = {
+        "trace_id": str(trace_id)[:_MAX_ID] if trace_id else f"s{random.getrandbits(64):016x}",
+        "received_at": time.time(),
+        "client_ts": client_ts if isinstance(client_ts, (int, float)) else None,
+        "spans": {},
+        "_t0": now,
+        "_last": now,
+    }
+    trace.update(fields)
+    _current.set(trace)
+    return trace
+
+
+def mark(span: str) -> None:
+    """Close ``span`` of the traced move (no-op when the move is not sampled)"""
+    trace = _current.get()
+    if trace is None:
+        return
+    now = time.perf_counter()
+    spans = trace["spans"]
+    spans[span] = spans.get(span, 0.0) + (now - trace["_last"]) * 1000.0
+    trace["_last"] = now
+
+
+def finish(**fields) -> Optional[str]:
+    """End the traced move and store it
+
+    Args:
+        **fields: Final attributes (result, ...)
+
+    Returns:
+        str: trace_id to hand back to the client, or None if not sampled
+    """
+    trace = _current.get()
+    if trace is None:
+        return None
+    _current.set(None)
+    trace.update(fields)
+    del trace["_last"]
+    trace["server_ms"] = round((time.perf_counter() - trace.pop("_t0")) * 1000.0, 3)
+    for span, ms in trace["spans"].items():
+        SPAN_SECONDS.observe(ms / 1000.0, span)
+        trace["spans"][span] = round(ms, 3)
+    if trace["client_ts"] is not None:
+        trace["client_to_server_ms"] = round(trace["received_at"] * 1000.0 - trace["client_ts"], 1)
+    with _lock:
+        _buffer[trace["trace_id"]] = trace
+        while len(_buffer) > config.TRACE_BUFFER_SIZE:
+            _buffer.popitem(last=False)
+    return trace["trace_id"]
+
+
+def report_client(trace_id: str, ack_ms: Any = None, render_ms: Any = None) -> bool:
+    """Attach the client's timings to a stored trace
+
+    Args:
+        trace_id: Id from the move's ack
+        ack_ms: Send -> ack received, client clock
+        render_ms: Send -> first frame drawn after the ack, client clock
+
+    Returns:
+        bool: False if the trace is unknown (evicted, or never sampled)
+    """
+    with _lock:
+        trace = _buffer.get(str(trace_id))
+        if trace is None or "render_ms" in trace:
+            return False
+        for key, value in (("ack_ms", ack_ms), ("render_ms", render_ms)):
+            if isinstance(value, (int, float)) and 0 <= value < 3600_000:
+                trace[key] = round(float(value), 3)
+        if "ack_ms" in trace:
+            trace["network_ms"] = round(max(0.0, trace["ack_ms"] - trace["server_ms"]), 3)
+        if "ack_ms" in trace and "render_ms" in trace:
+            trace["client_render_ms"] = round(max(0.0, trace["render_ms"] - trace["ack_ms"]), 3)
+    return True
+
+
+def query(room: Optional[str] = None, player: Optional[str] = None, min_ms: float = 0.0,
+          limit: int = 100, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Stored traces, newest first
+
+    Args:
+        room: Only this room
+        player: Only this player (its id or its ``player_tag``)
+        min_ms: Only traces whose end-to-end time (render_ms, else server_ms)
+            is at least this
+        limit: At most this many
+        trace_id: Just this trace
+    """
+    players = {player, player_tag(player)} if player else None
+    with _lock:
+        if trace_id is not None:
+            trace = _buffer.get(trace_id)
+            return [dict(trace, spans=dict(trace["spans"]))] if trace else []
+        out = []
+        for trace in reversed(_buffer.values()):
+            if room and trace.get("room") != room.upper():
+                continue
+            if players and trace.get("player") not in players:
+                continue
+            if min_ms and trace.get("render_ms", trace["server_ms"]) < min_ms:
+                continue
+            out.append(dict(trace, spans=dict(trace["spans"])))
+            if len(out) >= limit:
+                break
+    return out
+
+
+def summary() -> Dict[str, Any]:
+    """Buffer size, sample rate, and per-span / end-to-end percentiles (ms)"""
+    with _lock:
+        traces = list(_buffer.values())
+    columns: Dict[str, List[float]] = {span: [] for span in SPANS}
+    for key in ("server_ms", "network_ms", "client_render_ms", "render_ms"):
+        columns[key] = []
+    for trace in traces:
+        for span, ms in trace["spans"].items():
+            columns.setdefault(span, []).append(ms)
+        for key in ("server_ms", "network_ms", "client_render_ms", "render_ms"):
+            if key in trace:
+                columns[key].append(trace[key])
+
+    def pct(values, q):
+        return values[min(len(values) - 1, int(q / 100.0 * len(values)))] if values else None
+
+    stats = {}
+    for key, values in columns.items():
+        values.sort()
+        stats[key] = {"count": len(values), "p50": pct(values, 50), "p95": pct(values, 95), "p99": pct(values, 99)}
+    return {"traces": len(traces), "capacity": config.TRACE_BUFFER_SIZE, "sample_rate": _sample_rate,
+            "percentiles_ms": stats}
+
+
+def clear() -> None:
+    with _lock:
+        _buffer.clear()
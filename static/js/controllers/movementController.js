@@ -1,6 +1,16 @@
-// Handles per-window keyboard input + local validation + tiny optimistic dot move.
-// Expects a renderer with updatePlayer(role, [x,y]) and a getSnapshot() function
-// returning { size, positions:{R:[x,y],B:[x,y]}, target:[x,y], turn:'R'|'B', capturer:'R'|'B', myRole:'R'|'B' }.
+// Handles per-window keyboard input + local validation + client-side prediction.
+// Expects a getSnapshot() function returning
+// { size, positions:{R:[x,y],B:[x,y]}, target:[x,y], turn:'R'|'B', capturer:'R'|'B', myRole:'R'|'B' }
+// and an applyBoard({ positions, turn }) function that updates state + renderer.
+//
+// Every move carries a move_id and is drawn immediately (predicted). The server
+// acks each move with { move_id, accepted, reason, positions, turn }; the ack's
+// board is authoritative, and predictions still awaiting an ack are replayed on
+// top of it, so a rejected move rolls back.
+//
+// Moves also carry a trace_id and the send time (client_ts). When the server
+// traced the move its ack returns the trace_id, and we report how long the ack
+// and the next painted frame took, measured from the send on our own clock.
 
 import { EVT } from "../shared/events.js";
 import { getSocket } from "../shared/socket.js";
@@ -20,11 +30,23 @@ const DIRS = {
   D: [1, 0],
 };
 
-export function attachMovement({ socket, getSnapshot, roomCode, playerId }) {
+const ACK_TIMEOUT = 3000;
+
+function newTraceId() {
+  const bytes = new Uint8Array(8);
+  crypto.getRandomValues(bytes);
+  return Array.from(bytes, (b) => b.toString(16).padStart(2, "0")).join("");
+}
+
+export function attachMovement({ socket, getSnapshot, applyBoard, roomCode, playerId }) {
   let cooldownAt = 0;
   const COOLDOWN = 70;
   let inputLocked = false;
 
+  let moveSeq = 0;
+  const pending = []; // predicted moves awaiting an ack: { id, dx, dy, timer }
+  let confirmed = null; // last authoritative { positions, turn }
+
   function setLocked(v) {
     inputLocked = v;
   }
@@ -70,14 +92,73 @@ export function attachMovement({ socket, getSnapshot, roomCode, playerId }) {
     const captured = isStar(s, nx, ny) && capturerIsMe(s);
     if (captured) setLocked(true);
 
-    // emit to server so it can persist to Redis and toggle turn
+    if (!pending.length) confirmed = { positions: s.positions, turn: s.turn };
+    const id = `${playerId}:${++moveSeq}`;
+    const timer = setTimeout(
+      () => reconcile({ move_id: id, accepted: false, reason: "ack_timeout" }),
+      ACK_TIMEOUT
+    );
+    pending.push({ id, dx, dy, timer });
+
+    // draw the move right away
+    applyBoard(predict({ positions: s.positions, turn: s.turn }, s.myRole, dx, dy));
+
+    // emit to server so it can persist to Redis and toggle turn (use shared event name)
+    const sentAt = performance.now();
+    socket.emit(
+      EVT.BOARD_UPDATE,
+      {
+        room_code: roomCode,
+        player_id: playerId,
+        move_id: id,
+        move: { dx, dy },
+        trace_id: newTraceId(),
+        client_ts: Date.now(),
+      },
+      (ack) => {
+        reconcile(ack);
+        if (ack && ack.trace_id) reportTrace(ack.trace_id, sentAt);
+      }
+    );
+  }
+
+  function reportTrace(traceId, sentAt) {
+    const ackMs = performance.now() - sentAt;
+    // the second callback runs once the frame holding the reconciled board has been painted
+    requestAnimationFrame(() =>
+      requestAnimationFrame(() =>
+        socket.emit(EVT.TRACE_RENDER, {
+          trace_id: traceId,
+          ack_ms: ackMs,
+          render_ms: performance.now() - sentAt,
+        })
+      )
+    );
+  }
+
+  function predict(board, role, dx, dy) {
+    const pos = board.positions[role];
+    return {
+      positions: { ...board.positions, [role]: [pos[0] + dx, pos[1] + dy] },
+      turn: role === "R" ? "B" : "R",
+    };
+  }
 
-    // use shared event name
-    socket.emit(EVT.BOARD_UPDATE, {
-      room_code: roomCode,
-      player_id: playerId,
-      move: { dx, dy },
-    });
+  function reconcile(ack) {
+    if (!ack) return;
+    const i = pending.findIndex((p) => p.id === ack.move_id);
+    if (i >= 0) {
+      for (const p of pending.splice(0, i + 1)) clearTimeout(p.timer);
+    }
+    if (ack.positions) confirmed = { positions: ack.positions, turn: ack.turn };
+    if (!ack.accepted) console.debug("[movement] move rejected:", ack.reason);
+    if (!confirmed) return;
+
+    // authoritative board + predictions still in flight
+    const myRole = getSnapshot().myRole;
+    let view = confirmed;
+    for (const p of pending) view = predict(view, myRole, p.dx, p.dy);
+    applyBoard(view);
   }
 
   function onKey(e) {
@@ -90,6 +171,14 @@ export function attachMovement({ socket, getSnapshot, roomCode, playerId }) {
   window.addEventListener("keydown", onKey, { passive: false });
 
   return {
+    // authoritative board broadcast (board_state): once the server says it is
+    // no longer our turn, our pending move has landed (or never will)
+    sync: (board) => {
+      if (board.turn !== getSnapshot().myRole) {
+        for (const p of pending.splice(0)) clearTimeout(p.timer);
+      }
+      reconcile({ accepted: true, positions: board.positions, turn: board.turn });
+    },
     lock: () => setLocked(true),
     unlock: () => setLocked(false),
     destroy: () => window.removeEventListener("keydown", onKey),
@@ -0,0 +1,107 @@
+// static/js/pages/dashboardPage.js
+// Watches every room this browser moderates through one dashboard subscription.
+// The server pushes coalesced per-room summaries at a fixed rate
+// (dashboard_update); this page never receives per-move room traffic.
+import {
+  getModeratedRooms,
+  rememberModeratedRoom,
+  forgetModeratedRoom,
+} from "../shared/moderatedRooms.js";
+
+const summaries = {}; // room_code -> summary (null once the room is gone)
+
+function el(tag, text, className) {
+  const e = document.createElement(tag);
+  if (text != null) e.textContent = text;
+  if (className) e.className = className;
+  return e;
+}
+
+function statusText(s) {
+  if (s.finished) return "Finished";
+  if (s.started) return "Playing";
+  return "Waiting";
+}
+
+function playerLine(p) {
+  const rtt = p.rtt_ms == null ? "" : ` · ${p.rtt_ms} ms`;
+  const ready = p.ready ? " ✓" : "";
+  return el("div", `${p.role || "?"} ${p.username || p.player_id}${ready}${rtt}`, p.online ? "" : "offline");
+}
+
+function render() {
+  const body = document.getElementById("rooms");
+  body.innerHTML = "";
+  for (const code of Object.keys(summaries).sort()) {
+    const s = summaries[code];
+    const tr = el("tr", null, s ? "" : "gone");
+    tr.appendChild(el("td", code));
+    if (!s) {
+      tr.appendChild(el("td", "Closed"));
+      for (let i = 0; i < 4; i++) tr.appendChild(el("td", ""));
+    } else {
+      tr.appendChild(el("td", statusText(s)));
+      tr.appendChild(el("td", `${s.block_index + 1} / ${s.trial_index + 1} of ${s.trials_total}`));
+      tr.appendChild(el("td", s.turn ? `${s.turn} (${s.turns_taken} moves)` : "—"));
+      tr.appendChild(el("td", `${s.scores?.R ?? 0} · ${s.scores?.B ?? 0}`));
+      const players = el("td");
+      for (const p of s.players) players.appendChild(playerLine(p));
+      tr.appendChild(players);
+    }
+    const actions = el("td");
+    const remove = el("button", "✕", "btn-small");
+    remove.onclick = () => unwatch(code);
+    actions.appendChild(remove);
+    tr.appendChild(actions);
+    body.appendChild(tr);
+  }
+}
+
+// not pinned to any room: the dashboard may watch rooms on every worker
+const socket = io();
+
+function setStatus(text) {
+  document.getElementById("status").textContent = text;
+}
+
+function subscribe(rooms) {
+  if (!rooms.length) {
+    setStatus("No rooms yet: create one from the home page or add it below.");
+    return;
+  }
+  socket.emit("dashboard_subscribe", { rooms }, (ack) => {
+    Object.assign(summaries, ack.rooms || {});
+    const rejected = Object.entries(ack.rejected || {});
+    for (const [code, reason] of rejected) {
+      if (reason === "room_not_found") forgetModeratedRoom(code);
+    }
+    const watching = Object.keys(summaries).filter((c) => summaries[c]).length;
+    setStatus(
+      `Watching ${watching} rooms, updated every ${ack.interval}s` +
+        (rejected.length ? ` · refused: ${rejected.map(([c, r]) => `${c} (${r})`).join(", ")}` : "")
+    );
+    render();
+  });
+}
+
+function unwatch(code) {
+  socket.emit("dashboard_unsubscribe", { rooms: [code] });
+  forgetModeratedRoom(code);
+  delete summaries[code];
+  render();
+}
+
+socket.on("connect", () => subscribe(getModeratedRooms()));
+socket.on("disconnect", () => setStatus("Disconnected, reconnecting…"));
+socket.on("dashboard_update", (data) => {
+  Object.assign(summaries, data.rooms || {});
+  render();
+});
+
+document.getElementById("addRoom").addEventListener("submit", () => {
+  const code = document.getElementById("addRoomCode").value.trim().toUpperCase();
+  const playerId = document.getElementById("addModeratorId").value.trim();
+  if (!code || !playerId) return;
+  rememberModeratedRoom(code, playerId);
+  subscribe([{ room_code: code, player_id: playerId }]);
+});
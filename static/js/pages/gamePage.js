@@ -1,6 +1,7 @@
 // static/js/pages/gamePage.js
 import { EVT } from "../shared/events.js";
-import { getSocket } from "../shared/socket.js";
+import { getSocket, onRoomEvent, getLastSeq, startHeartbeat } from "../shared/socket.js";
+import { WIRE_FORMAT } from "../shared/wire.js";
 import { BoardRenderer } from "../ui/boardRenderer.js";
 import { attachMovement } from "../controllers/movementController.js";
 
@@ -21,6 +22,8 @@ const state = {
   capturer: "R",
   turn: "R",
   myRole: "R",
+  trialIndex: null,
+  blockIndex: null,
   colors: { R: "#ff4d4f", B: "#4da6ff" },
 };
 
@@ -30,6 +33,8 @@ function getSnapshot() {
 
 let renderer = null;
 let movement = null;
+let shownBlock = null; // block whose instructions were already shown
+let finished = false;
 
 function log(...a) {
   // eslint-disable-next-line no-console
@@ -57,6 +62,81 @@ function drawInitial() {
     renderer.setPlayer("B", state.colors.B, state.positions.B);
 }
 
+function showInstructions(block) {
+  if (!block || block.block_index === shownBlock) return;
+  shownBlock = block.block_index;
+  if (!block.instructions || !block.instructions.length) return;
+
+  const box = document.getElementById("instructions");
+  const title = document.getElementById("instructionsTitle");
+  const list = document.getElementById("instructionsList");
+  if (!box || !list) return;
+
+  if (title) {
+    title.textContent = `${block.descriptor || "Block"} (${block.block_index + 1}/${
+      block.block_total
+    })`;
+  }
+  list.innerHTML = "";
+  for (const line of block.instructions) {
+    const li = document.createElement("li");
+    li.textContent = line;
+    list.appendChild(li);
+  }
+  box.classList.remove("hidden");
+  movement?.lock?.();
+  document.getElementById("instructionsOk").onclick = () => {
+    box.classList.add("hidden");
+    updateTurnStatus();
+  };
+}
+
+// Turn label + input lock, from the current state
+function updateTurnStatus() {
+  const turnStatusEl = document.getElementById("turnStatus");
+  let text;
+  if (finished) {
+    movement?.lock?.();
+    text = "Game over";
+  } else if (state.myRole === "MOD") {
+    // moderator cannot move
+    movement?.lock?.();
+    text = "Moderator";
+  } else if (state.turn === state.myRole) {
+    if (instructionsOpen()) movement?.lock?.();
+    else movement?.unlock?.();
+    text = "✅ Your turn";
+  } else {
+    movement?.lock?.();
+    text = "⏳ Other player's turn";
+  }
+  if (turnStatusEl) turnStatusEl.textContent = text;
+}
+
+// Predicted or acknowledged board from the movement controller
+function applyBoard({ positions, turn }) {
+  for (const role of ["R", "B"]) {
+    const prev = state.positions[role];
+    const next = positions[role];
+    if (next && (!prev || prev[0] !== next[0] || prev[1] !== next[1])) {
+      renderer?.updatePlayer(role, next);
+    }
+  }
+  state.positions = { ...positions };
+  state.turn = turn;
+  updateTurnStatus();
+}
+
+function instructionsOpen() {
+  const box = document.getElementById("instructions");
+  return !!box && !box.classList.contains("hidden");
+}
+
+function showTrialResult(text) {
+  const el = document.getElementById("trialResult");
+  if (el) el.textContent = text;
+}
+
 (function init() {
   // Basic guards
   if (!ROOM_CODE) {
@@ -93,18 +173,50 @@ function drawInitial() {
     room_code: ROOM_CODE,
     player_id: PLAYER_ID,
     username: USERNAME,
+    wire: WIRE_FORMAT, // binary board_state frames; server falls back to JSON
   };
 
   const emitJoin = () => {
-    log("Emitting JOIN_GAME", joinPayload);
-    socket.emit(EVT.JOIN_GAME, joinPayload);
+    // On reconnect, ask only for the room events we missed
+    const lastSeq = getLastSeq();
+    const payload = lastSeq === null ? joinPayload : { ...joinPayload, last_seq: lastSeq };
+    log("Emitting JOIN_GAME", payload);
+    socket.emit(EVT.JOIN_GAME, payload);
   };
 
   if (socket.connected) emitJoin();
   socket.on("connect", emitJoin);
+  startHeartbeat(socket, emitJoin);
+
+  onRoomEvent(EVT.BLOCK_INSTRUCTIONS, (block) => {
+    log("block_instructions:", block);
+    showInstructions(block);
+  });
+
+  onRoomEvent(EVT.TRIAL_COMPLETE, (data) => {
+    log("trial_complete:", data);
+    const who = data.winner ? `${data.winner === "R" ? "Red" : "Blue"} reached the star` : data.reason;
+    const scores = data.scores || {};
+    showTrialResult(`Trial ${data.trial_index + 1} over: ${who} — Red ${scores.R ?? 0} · Blue ${scores.B ?? 0}`);
+  });
+
+  onRoomEvent(EVT.GAME_OVER, (data) => {
+    log("game_over:", data);
+    finished = true;
+    const scores = data.scores || {};
+    showTrialResult(`${data.message} — Red ${scores.R ?? 0} · Blue ${scores.B ?? 0}`);
+    updateTurnStatus();
+  });
+
+  // Board after every accepted move (compact; the full snapshot only comes with room_state)
+  onRoomEvent(EVT.BOARD_STATE, (board) => {
+    if (board.trial_index !== state.trialIndex || board.block_index !== state.blockIndex) return;
+    if (movement) movement.sync(board);
+    else applyBoard(board);
+  });
 
   // GAME_START (authoritative initial snapshot)
-  socket.on("room_state", (data) => {
+  onRoomEvent(EVT.ROOM_STATE, (data) => {
     log("room_state:", data);
 
     const trialIndex = data?.current_trial_index;
@@ -118,6 +230,8 @@ function drawInitial() {
         state.target = trial.target;
         state.capturer = trial.capturer;
         state.turn = trial.turn || "R";
+        state.trialIndex = trialIndex;
+        state.blockIndex = data.room?.current_block_index ?? 0;
 
         // identify my role
         const players = data.room?.players || {};
@@ -135,32 +249,21 @@ function drawInitial() {
         renderer?.clearAndRedrawAll?.();
         drawInitial();
 
-        // attach movement controller
-        if (movement) movement.destroy();
-        movement = attachMovement({socket,
-          getSnapshot,
-          roomCode: ROOM_CODE,
-          playerId: PLAYER_ID,
-        });
-
-        // ---- NEW: handle turn display + lock/unlock ----
-        const turnStatusEl = document.getElementById("turnStatus");
-
-        if (state.myRole === "MOD") {
-          // moderator cannot move
-          movement?.lock?.();
-          if (turnStatusEl) turnStatusEl.textContent = "Moderator";
-        } else {
-          if (state.turn === state.myRole) {
-            movement?.unlock?.();
-            if (turnStatusEl) turnStatusEl.textContent = "✅ Your turn";
-          } else {
-            movement?.lock?.();
-            if (turnStatusEl)
-              turnStatusEl.textContent = "⏳ Other player's turn";
-          }
+        // attach movement controller (once; it keeps its own pending moves)
+        if (!movement) {
+          movement = attachMovement({
+            socket,
+            getSnapshot,
+            applyBoard,
+            roomCode: ROOM_CODE,
+            playerId: PLAYER_ID,
+          });
         }
 
+        finished = !!data.room?.finished;
+        showInstructions(data.block);
+        updateTurnStatus();
+
         // label
         const label = document.getElementById("roomLabel");
         if (label && data.trials_total != null) {
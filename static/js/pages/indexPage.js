@@ -1,6 +1,7 @@
 // static/js/pages/indexPage.js
 import { EVT } from "../shared/events.js";
 import { getSocket } from "../shared/socket.js";
+import { rememberModeratedRoom } from "../shared/moderatedRooms.js";
 
 document.addEventListener("DOMContentLoaded", function () {
   const createTab = document.getElementById("create-tab");
@@ -93,6 +94,7 @@ document.addEventListener("DOMContentLoaded", function () {
           localStorage.setItem("room_code", data.room_code);
           localStorage.setItem("username", createUsername.value.trim());
           localStorage.setItem("is_moderator", "true"); // Mark as moderator
+          rememberModeratedRoom(data.room_code, data.player_id);
 
           // Connect to Socket.IO
           connectToSocketIO(data.room_code, data.player_id, true);
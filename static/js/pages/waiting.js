@@ -44,8 +44,8 @@ document.addEventListener('DOMContentLoaded', function () {
   // Persist current room code
   localStorage.setItem('room_code', roomCode);
 
-  // Connect to Socket.IO
-  const socket = io();
+  // Connect to Socket.IO (?room= lets the proxy pin this room to one worker)
+  const socket = io({ query: { room: roomCode } });
 
   // Prevent duplicate handlers if this script runs twice somehow
   socket.off('connect');
@@ -67,6 +67,25 @@ document.addEventListener('DOMContentLoaded', function () {
     debug(`Sent join_game event for room ${roomCode}`);
   });
 
+  // Presence heartbeat: the server drops sessions that stay silent
+  let rttMs = null;
+  let heartbeatMs = 10000;
+  (function heartbeat() {
+    setTimeout(function () {
+      if (socket.connected) {
+        const sentAt = performance.now();
+        socket.emit('heartbeat', { rtt_ms: rttMs }, function (ack) {
+          rttMs = Math.round(performance.now() - sentAt);
+          if (ack && ack.interval) heartbeatMs = ack.interval * 1000;
+          if (ack && !ack.ok) {
+            socket.emit('join_game', { room_code: roomCode, player_id: playerId });
+          }
+        });
+      }
+      heartbeat();
+    }, heartbeatMs);
+  })();
+
   socket.on('connect_error', function (error) {
     debug(`Connection error: ${error.message}`);
   });
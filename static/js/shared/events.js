@@ -2,7 +2,9 @@
 export const EVT = Object.freeze({
   ROOM_STATE: 'room_state',
   GAME_START: 'game_start',
-  BOARD_UPDATE: 'board_update',
+  BOARD_UPDATE: 'board_update',  // <- { room_code, player_id, move_id, move, trace_id, client_ts }
+  TRACE_RENDER: 'trace_render',  // <- { trace_id, ack_ms, render_ms } for moves whose ack carried a trace_id
+  BOARD_STATE: 'board_state',   // -> { seq, block_index, trial_index, turns_taken, turn, positions } (JSON or binary)
   PLAYER_JOINED: 'player_joined',
   ROOM_FULL: 'room_full',
   PLAYER_READY: 'player_ready',
@@ -11,5 +13,7 @@ export const EVT = Object.freeze({
 
   TRIAL_START: 'trial_start',   // -> { trial_idx, board, deadline_ts }
   TRIAL_END: 'trial_end',       // -> { trial_idx, reason: 'captured'|'timeout', board }
-  GAME_OVER: 'game_over',       // -> { results }
+  GAME_OVER: 'game_over',       // -> { message, scores }
+  TRIAL_COMPLETE: 'trial_complete',         // -> { block_index, trial_index, reason, winner, scores }
+  BLOCK_INSTRUCTIONS: 'block_instructions', // -> { block_index, block_total, descriptor, instructions }
 });
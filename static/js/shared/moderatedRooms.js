@@ -0,0 +1,26 @@
+// static/js/shared/moderatedRooms.js
+// Rooms this browser created (and therefore moderates), for the dashboard.
+// Stored as [{ room_code, player_id }] under localStorage "moderated_rooms".
+
+const KEY = "moderated_rooms";
+
+export function getModeratedRooms() {
+  try {
+    const rooms = JSON.parse(localStorage.getItem(KEY) || "[]");
+    return Array.isArray(rooms) ? rooms : [];
+  } catch {
+    return [];
+  }
+}
+
+export function rememberModeratedRoom(roomCode, playerId) {
+  const code = String(roomCode).toUpperCase();
+  const rooms = getModeratedRooms().filter((r) => r.room_code !== code);
+  rooms.push({ room_code: code, player_id: playerId });
+  localStorage.setItem(KEY, JSON.stringify(rooms));
+}
+
+export function forgetModeratedRoom(roomCode) {
+  const code = String(roomCode).toUpperCase();
+  localStorage.setItem(KEY, JSON.stringify(getModeratedRooms().filter((r) => r.room_code !== code)));
+}
@@ -1,11 +1,76 @@
 // static/js/shared/socket.js
+import { decodeFrame } from "./wire.js";
+
 let socket;
 
+/** Room this page belongs to; sent as ?room= so the proxy can pin it to one worker. */
+function affinityRoom() {
+  const boot = window.GAME_BOOTSTRAP || {};
+  return String(
+    boot.roomCode || document.body?.dataset?.roomCode || localStorage.getItem("room_code") || ""
+  ).toUpperCase();
+}
+
 /** Single shared Socket.IO instance across the app. */
 export function getSocket() {
   if (!socket) {
-    socket = io();              // uses global io() from socket.io script tag
+    const room = affinityRoom();
+    // uses global io() from socket.io script tag
+    socket = room ? io({ query: { room } }) : io();
     window.socket = socket;     // helpful for console debugging
   }
   return socket;
 }
+
+// ---- sequenced room events (reconnect & resume) ----
+let lastSeq = null;
+const seen = new Set(); // recent seqs, so events replayed after a reconnect apply once
+
+/** Subscribe to a room event; tracks its seq and skips ones already applied.
+ *  Binary frames are decoded first, so handlers always get plain objects. */
+export function onRoomEvent(event, handler) {
+  getSocket().on(event, (raw) => {
+    const data = decodeFrame(raw);
+    const seq = data?.seq;
+    if (typeof seq === "number") {
+      if (seen.has(seq)) return;
+      seen.add(seq);
+      if (seen.size > 512) seen.delete(seen.values().next().value);
+      if (lastSeq === null || seq > lastSeq) lastSeq = seq;
+    }
+    handler(data);
+  });
+}
+
+/** Highest room event seq seen so far (null before the first one). */
+export function getLastSeq() {
+  return lastSeq;
+}
+
+// ---- presence heartbeat ----
+/** Heartbeat `sock` so the server keeps this session alive; each beat reports the
+ *  RTT measured on the previous one. `onExpired` runs if the server had already
+ *  dropped the session (e.g. the tab slept), and should re-send join_game. */
+export function startHeartbeat(sock, onExpired) {
+  let rttMs = null;
+  let timer = null;
+  let intervalMs = 10000;
+
+  const beat = () => {
+    if (!sock.connected) return schedule();
+    const sentAt = performance.now();
+    sock.emit("heartbeat", { rtt_ms: rttMs }, (ack) => {
+      rttMs = Math.round(performance.now() - sentAt);
+      if (ack?.interval) intervalMs = ack.interval * 1000;
+      if (ack && !ack.ok && onExpired) onExpired();
+    });
+    schedule();
+  };
+  const schedule = () => {
+    clearTimeout(timer);
+    timer = setTimeout(beat, intervalMs);
+  };
+
+  schedule();
+  return () => clearTimeout(timer);
+}
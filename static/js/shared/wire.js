@@ -0,0 +1,99 @@
+// static/js/shared/wire.js
+// Binary frames for hot room events; mirrors networking/wire.py.
+//
+// A socket asks for them by sending { wire: WIRE_FORMAT } with join_game.
+// Servers (or events) without a binary form keep sending JSON, so every
+// handler goes through decodeFrame(), which passes plain objects through.
+//
+// board_state frame (version 1):
+//   u8 type (1) | varint seq | varint block_index | varint trial_index |
+//   varint turns_taken | u8 flags (bit0 turn B, bit1 R placed, bit2 B placed) |
+//   [u8 x, u8 y] for R | [u8 x, u8 y] for B
+
+export const WIRE_FORMAT = "bin";
+
+const FRAME_BOARD_STATE = 1;
+const TURN_B = 0x01;
+const HAS_R = 0x02;
+const HAS_B = 0x04;
+
+function writeVarint(out, value) {
+  while (value > 0x7f) {
+    out.push((value & 0x7f) | 0x80);
+    value = Math.floor(value / 128);
+  }
+  out.push(value);
+}
+
+function readVarint(bytes, pos) {
+  let value = 0;
+  let scale = 1;
+  for (;;) {
+    const byte = bytes[pos++];
+    value += (byte & 0x7f) * scale;
+    if (!(byte & 0x80)) return [value, pos];
+    scale *= 128;
+  }
+}
+
+/** Pack a board_state payload ({ seq, block_index, trial_index, turns_taken, turn, positions }). */
+export function encodeBoardState(p) {
+  const out = [FRAME_BOARD_STATE];
+  writeVarint(out, p.seq || 0);
+  writeVarint(out, p.block_index);
+  writeVarint(out, p.trial_index);
+  writeVarint(out, p.turns_taken || 0);
+
+  const positions = p.positions || {};
+  let flags = p.turn === "B" ? TURN_B : 0;
+  const coords = [];
+  if (positions.R) {
+    flags |= HAS_R;
+    coords.push(...positions.R);
+  }
+  if (positions.B) {
+    flags |= HAS_B;
+    coords.push(...positions.B);
+  }
+  out.push(flags, ...coords);
+  return new Uint8Array(out).buffer;
+}
+
+/** Inverse of encodeBoardState. */
+export function decodeBoardState(buffer) {
+  const bytes = buffer instanceof Uint8Array ? buffer : new Uint8Array(buffer);
+  if (bytes[0] !== FRAME_BOARD_STATE) throw new Error("not a board_state frame");
+  let pos = 1;
+  let seq, blockIndex, trialIndex, turnsTaken;
+  [seq, pos] = readVarint(bytes, pos);
+  [blockIndex, pos] = readVarint(bytes, pos);
+  [trialIndex, pos] = readVarint(bytes, pos);
+  [turnsTaken, pos] = readVarint(bytes, pos);
+  const flags = bytes[pos++];
+
+  const positions = {};
+  if (flags & HAS_R) {
+    positions.R = [bytes[pos], bytes[pos + 1]];
+    pos += 2;
+  }
+  if (flags & HAS_B) {
+    positions.B = [bytes[pos], bytes[pos + 1]];
+    pos += 2;
+  }
+  return {
+    seq,
+    block_index: blockIndex,
+    trial_index: trialIndex,
+    turns_taken: turnsTaken,
+    turn: flags & TURN_B ? "B" : "R",
+    positions,
+  };
+}
+
+/** Decode a received event argument: binary frames are unpacked, JSON passes through. */
+export function decodeFrame(data) {
+  if (data instanceof ArrayBuffer || data instanceof Uint8Array) {
+    return decodeBoardState(data);
+  }
+  return data;
+}
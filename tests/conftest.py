@@ -0,0 +1,51 @@
+"""
+Shared fixtures. Every test runs against the in-process store
+(``REDIS_URL=memory://``, fakeredis from requirements-dev.txt), set before
+any service module is imported, and starts from an empty store.
+"""
+import os
+import sys
+
+os.environ["REDIS_URL"] = "memory://"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+from conf import game_config  # noqa: E402
+from services import game_service, room_service, sequence_service  # noqa: E402
+from services.redis_client import get_redis  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _empty_store():
+    get_redis.flushall()
+    yield
+    get_redis.flushall()
+
+
+def trial(r, b, target, capturer="R", turn="R", **extra):
+    """A 4x4 trial layout"""
+    return {"board_size": 4, "start_positions": {"R": list(r), "B": list(b)},
+            "target": list(target), "capturer": capturer, "turn": turn, **extra}
+
+
+def started_room():
+    """Create a room, join and ready two players, start it; return (code, red, blue)"""
+    code, moderator, _ = room_service.create_room("mod")
+    red, blue = (room_service.join_room(code, name)[1] for name in ("red", "blue"))
+    for pid in (red, blue):
+        game_service.mark_player_ready(code, pid)
+    assert game_service.start_game(code, moderator)["success"]
+    return code, red, blue
+
+
+@pytest.fixture
+def blocks(monkeypatch):
+    """Play the test's own sequence: ``blocks([block, ...])`` replaces
+    ``GAME_CONFIG`` (same shape as ``GAME_CONFIG["blocks"]``)"""
+    def install(raw):
+        monkeypatch.setattr(game_config, "GAME_CONFIG", {"board_size": 4, "blocks": raw})
+        sequence_service.reset_cache()
+        return raw
+    yield install
+    sequence_service.reset_cache()
@@ -0,0 +1,54 @@
+import pytest
+from flask import Flask
+
+from routes import api_routes
+from services import game_service, room_service
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    api_routes.init_routes(app, None)
+    return app.test_client()
+
+
+def test_every_save_bumps_the_version():
+    code, moderator, _ = room_service.create_room("mod")
+    first = room_service.get_version(code)
+    assert first > 0
+    _, player, _ = room_service.join_room(code, "red")
+    game_service.mark_player_ready(code, player)
+    assert room_service.get_version(code) == first + 2
+    room, version = room_service.get_room_versioned(code)
+    assert version == first + 2 and room.players[player]["ready"]
+
+
+def test_room_info_answers_304_until_the_room_changes(client):
+    code, _, _ = room_service.create_room("mod")
+    first = client.get(f"/api/room/{code.lower()}")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and first.json["room"]["room_code"] == code
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    unchanged = client.get(f"/api/room/{code}", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304 and unchanged.headers["ETag"] == etag and not unchanged.data
+
+    room_service.join_room(code, "red")
+    changed = client.get(f"/api/room/{code}", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert changed.json["room"]["player_count"] == 1
+
+
+def test_unknown_room_is_404(client):
+    response = client.get("/api/room/NOPE", headers={"If-None-Match": '"v1"'})
+    assert response.status_code == 404 and "ETag" not in response.headers
+
+
+def test_cached_body_is_only_served_for_its_version():
+    cache = api_routes._VersionedCache(2)
+    cache.put("A", 2, "a2")
+    cache.put("A", 1, "a1")                  # an older body never replaces a newer one
+    assert cache.get("A", 2) == "a2" and cache.get("A", 1) is None
+    cache.put("B", 1, "b1")
+    cache.put("C", 1, "c1")
+    assert cache.get("A", 2) is None and cache.get("C", 1) == "c1"
@@ -0,0 +1,109 @@
+import pytest
+from flask import Flask, request
+from flask_socketio import SocketIO
+
+from networking import dashboard
+from services import dashboard_service, room_events, room_service
+
+
+@pytest.fixture
+def sio(monkeypatch):
+    app = Flask(__name__)
+    socketio = SocketIO(app, async_mode="threading")
+    monkeypatch.setattr(socketio, "start_background_task", lambda *a, **k: None)   # pushes are driven by hand
+    sent = []   # the test client does not see server-initiated emits, so record them here
+    monkeypatch.setattr(socketio, "emit", lambda event, data, to=None, **kw: sent.append((event, data, to)))
+    dashboard.init_dashboard_events(socketio, room_service)
+
+    @socketio.on("disconnect")
+    def gone():
+        dashboard.forget(request.sid)
+
+    clients = []
+
+    def connect():
+        client = socketio.test_client(app)
+        client.sent = sent
+        clients.append(client)
+        return client
+    yield connect
+    for client in clients:
+        if client.is_connected():
+            client.disconnect()
+
+
+def _subscribe(client, *rooms):
+    return client.emit("dashboard_subscribe", {"rooms": [{"room_code": c, "player_id": m} for c, m in rooms]},
+                       callback=True)
+
+
+def _updates(client):
+    """Rooms of each dashboard_update sent to ``client`` since the last call"""
+    sid = client.socketio.server.manager.sid_from_eio_sid(client.eio_sid, "/")
+    mine = [data["rooms"] for event, data, to in client.sent if event == "dashboard_update" and to == sid]
+    client.sent[:] = [item for item in client.sent if item[2] != sid]
+    return mine
+
+
+def test_subscribe_checks_the_moderator(sio):
+    code, moderator, _ = room_service.create_room("mod")
+    ack = _subscribe(sio(), (code.lower(), moderator), ("NOPE", moderator))
+    assert list(ack["rooms"]) == [code] and ack["rooms"][code]["room_code"] == code
+    assert ack["rejected"] == {"NOPE": "room_not_found"}
+
+    ack = _subscribe(sio(), (code, "someone"))
+    assert ack["rooms"] == {} and ack["rejected"] == {code: "not_moderator"}
+
+
+def test_push_sends_only_rooms_whose_seq_moved(sio):
+    a, mod_a, _ = room_service.create_room("a")
+    b, mod_b, _ = room_service.create_room("b")
+    both, only_b = sio(), sio()
+    _subscribe(both, (a, mod_a), (b, mod_b))
+    _subscribe(only_b, (b, mod_b))
+
+    assert dashboard._push() == 2                       # nothing pushed yet
+    assert [sorted(u) for u in _updates(both)] == [sorted([a, b])]
+    assert [list(u) for u in _updates(only_b)] == [[b]]
+    assert dashboard._push() == 0
+
+    room_events.publish("e", {}, a)
+    room_events.publish("e", {}, a)
+    assert dashboard._push() == 1                       # one summary however many events
+    assert [list(u) for u in _updates(both)] == [[a]]
+    assert _updates(only_b) == []
+
+    assert dashboard._push(force=True) == 2
+    assert [list(u) for u in _updates(only_b)] == [[b]]
+
+
+def test_forgotten_rooms_are_pushed_again_on_resubscribe(sio):
+    code, moderator, _ = room_service.create_room("mod")
+    client = sio()
+    _subscribe(client, (code, moderator))
+    assert dashboard._push() == 1
+    client.disconnect()
+    assert dashboard._push() == 0                       # nobody watching
+
+    again = sio()
+    _subscribe(again, (code, moderator))
+    assert dashboard._push() == 1
+    assert [list(u) for u in _updates(again)] == [[code]]
+
+
+def test_room_forgotten_during_a_push_is_not_marked_sent(sio, monkeypatch):
+    code, moderator, _ = room_service.create_room("mod")
+    client = sio()
+    _subscribe(client, (code, moderator))
+    summaries = dashboard_service.room_summaries
+
+    def disconnect_midway(codes):
+        client.disconnect()
+        return summaries(codes)
+    monkeypatch.setattr(dashboard_service, "room_summaries", disconnect_midway)
+    assert dashboard._push() == 1
+    monkeypatch.setattr(dashboard_service, "room_summaries", summaries)
+
+    again = sio()
+    _subscribe(again, (code, moderator))
+    assert dashboard._push() == 1
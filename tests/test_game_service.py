@@ -0,0 +1,84 @@
+import threading
+from contextlib import nullcontext
+
+from conftest import started_room, trial
+from networking.rate_limit import MoveCoalescer
+from services import game_service, room_service, sequence_service
+
+# R reaches the target in three moves: R right, B left, R right
+QUICK = trial(r=(0, 0), b=(3, 3), target=(2, 0))
+
+
+def _play_to_target(code, red, blue):
+    for pid, dx, dy in ((red, 1, 0), (blue, -1, 0), (red, 1, 0)):
+        room, reason = game_service.apply_move(code, pid, dx, dy)
+        assert reason is None
+    return room
+
+
+def test_practice_block_awards_no_points(blocks):
+    blocks([
+        {"descriptor": "Practice", "trials": [QUICK], "count_scores": False},
+        {"descriptor": "Main", "trials": [QUICK, dict(QUICK, count_scores=False)]},
+    ])
+    code, red, blue = started_room()
+
+    room = _play_to_target(code, red, blue)
+    assert room.scores == {"R": 0, "B": 0}
+    assert (room.current_block_index, room.current_trial_index) == (1, 0)
+
+    room = _play_to_target(code, red, blue)
+    assert room.scores == {"R": 1, "B": 0}
+
+    room = _play_to_target(code, red, blue)        # the trial opts out of its block's scoring
+    assert room.scores == {"R": 1, "B": 0} and room.finished
+
+
+def test_default_sequence_opens_with_an_unscored_practice_block():
+    sequence_service.reset_cache()
+    blocks = [sequence_service.get_block(i) for i in range(sequence_service.block_count())]
+    assert [b["descriptor"] for b in blocks] == ["Practice", "Hinderer", "Helper", "Unknown"]
+    assert [b["count_scores"] for b in blocks] == [False, True, True, True]
+    assert all(b["instructions"] and b["trials"] for b in blocks)
+    assert {t["board_size"] for b in blocks for t in b["trials"]} == {5}
+
+
+def test_reward_is_taken_from_the_trial(blocks):
+    blocks([{"descriptor": "Main", "trials": [dict(QUICK, reward=3)]}])
+    code, red, blue = started_room()
+    assert _play_to_target(code, red, blue).scores == {"R": 3, "B": 0}
+
+
+def test_end_trial_ignores_a_stale_marker(blocks):
+    blocks([{"descriptor": "Main", "trials": [QUICK, QUICK]}])
+    code, red, blue = started_room()
+    _play_to_target(code, red, blue)
+    assert game_service.end_trial(code, marker=(0, 0)) == []
+    events = game_service.end_trial(code, marker=(0, 1))
+    assert [e for e, _ in events] == ["trial_complete", "game_over"]
+    assert events[0][1]["reason"] == "timeout"
+
+
+def test_end_trial_waits_for_a_move_in_flight(blocks, monkeypatch):
+    blocks([{"descriptor": "Main", "trials": [QUICK, QUICK]}])
+    coalescer = MoveCoalescer()
+    monkeypatch.setattr(game_service, "_room_lock", lambda room_code: nullcontext())
+    game_service.set_room_lock(coalescer.hold)
+    code, red, blue = started_room()
+
+    # a move holds the room; the timer fires meanwhile and must not save over it
+    assert coalescer.acquire(code, red) is None
+    result = {}
+    timer = threading.Thread(target=lambda: result.setdefault(
+        "events", game_service.end_trial(code.lower(), marker=(0, 0))))
+    timer.start()
+    timer.join(0.2)
+    assert timer.is_alive()
+    game_service.apply_move(code, red, 1, 0)
+    coalescer.release(code, red, accepted=True)
+    timer.join(2)
+
+    assert [e for e, _ in result["events"]] == ["trial_complete"]
+    room = room_service.get_room(code)
+    assert room.current_trial_index == 1
+    assert room.trials[0]["start_positions"]["R"] == [1, 0]   # the move was not lost
@@ -0,0 +1,85 @@
+import logging
+import queue
+import threading
+
+import pytest
+
+import log_pipeline
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(log_pipeline.time, "monotonic", clock)
+    return clock
+
+
+def _record(name="game.moves", msg="moved %s", level=logging.INFO, **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, ("x",), None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_rate_filter_samples_per_template_and_reports_skips(clock):
+    f = log_pipeline.RateFilter()
+    f.set_rate("game", 2, burst=2)
+    passed = [f.filter(_record()) for _ in range(5)]
+    assert passed == [True, True, False, False, False]
+    assert f.filter(_record(msg="other %s"))            # own budget per template
+
+    clock.now += 0.5                                    # one token back
+    record = _record()
+    assert f.filter(record) and record.sampled == 3
+    again = _record()
+    assert not f.filter(again) and not hasattr(again, "sampled")
+
+
+def test_rate_filter_scope(clock):
+    f = log_pipeline.RateFilter()
+    f.set_rate("game", 1, burst=1)
+    assert f.filter(_record()) and not f.filter(_record())
+    assert f.filter(_record(level=logging.WARNING))     # warnings are never sampled
+    assert f.filter(_record(name="gamelobby"))          # not a child of "game"
+    f.set_rate("game", None)
+    assert f.filter(_record())
+
+
+def test_sampled_count_is_written():
+    record = _record(room="AB CD", sampled=3)
+    line = log_pipeline.KeyValueFormatter().format(record)
+    assert 'msg="moved x"' in line and 'room="AB CD"' in line and line.endswith("sampled=3")
+    assert log_pipeline.TextFormatter().format(_record(room="R1")).endswith("moved x | room=R1")
+
+
+def test_full_queue_drops_and_counts():
+    q = queue.SimpleQueue()
+    handler = log_pipeline.QueueHandler(q, capacity=2)
+    before = log_pipeline.get_stats()
+    for _ in range(3):
+        handler.handle(_record())
+    after = log_pipeline.get_stats()
+    assert q.qsize() == 2
+    assert (after["queued"] - before["queued"], after["dropped"] - before["dropped"]) == (2, 1)
+
+
+def test_counters_do_not_lose_updates():
+    before = log_pipeline.get_stats()["written"]
+    threads = [threading.Thread(target=lambda: [log_pipeline._bump("written") for _ in range(20000)])
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert log_pipeline.get_stats()["written"] - before == 160000
+
+
+def test_parse_spec():
+    assert log_pipeline.parse_spec(" a.b=1, c=WARNING,bad,=2 ") == {"a.b": "1", "c": "WARNING"}
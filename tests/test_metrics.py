@@ -0,0 +1,51 @@
+from services import metrics
+
+
+def test_counter_and_gauge_render():
+    c = metrics.Counter("events_total", "Events", ("event",))
+    c.inc("move")
+    c.inc("move", amount=2)
+    c.inc('say "hi"')
+    assert c.render() == [
+        "# HELP game_events_total Events",
+        "# TYPE game_events_total counter",
+        'game_events_total{event="move"} 3',
+        'game_events_total{event="say \\"hi\\""} 1',
+    ]
+    g = metrics.Gauge("open", "Open things")
+    g.set(5)
+    g.dec(amount=0.5)
+    assert g.render()[-1] == "game_open 4.5"
+
+
+def test_histogram_buckets_are_cumulative():
+    h = metrics.Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for v in (0.05, 0.1, 0.5, 3.0):
+        h.observe(v, "/x")
+    assert h.render()[2:] == [
+        'game_latency_seconds_bucket{route="/x",le="0.1"} 2',
+        'game_latency_seconds_bucket{route="/x",le="1"} 3',
+        'game_latency_seconds_bucket{route="/x",le="+Inf"} 4',
+        'game_latency_seconds_sum{route="/x"} 3.65',
+        'game_latency_seconds_count{route="/x"} 4',
+    ]
+
+
+def test_render_survives_a_broken_collector(monkeypatch):
+    c = metrics.Counter("things_total", "Things")
+    c.inc()
+
+    def broken():
+        raise RuntimeError("store down")
+
+    def rooms():
+        return metrics.family("rooms", "gauge", "Rooms by status", {(("status", "waiting"),): 2})
+
+    monkeypatch.setattr(metrics, "_registry", [c])
+    monkeypatch.setattr(metrics, "_collectors", [broken, rooms])
+    text = metrics.render()
+    assert text.endswith("\n")
+    lines = text.splitlines()
+    assert "game_things_total 1" in lines
+    assert "# collector broken failed: store down" in lines
+    assert lines[-1] == 'game_rooms{status="waiting"} 2'
@@ -0,0 +1,52 @@
+import config
+from services import presence_service, room_service
+
+NOW = 1_000_000.0
+GRACE = config.PRESENCE_GRACE
+TTL = config.PRESENCE_TTL
+
+
+def test_last_socket_gone_starts_the_grace_period():
+    presence_service.connect("s1", "room", "p1", now=NOW)
+    presence_service.connect("s2", "ROOM", "p1", now=NOW)
+    assert presence_service.disconnect("s1", now=NOW) == ("ROOM", "p1", True)
+    assert presence_service.disconnect("s2", now=NOW) == ("ROOM", "p1", False)
+    assert presence_service.disconnect("s2", now=NOW) is None
+
+    assert presence_service.abandoned(now=NOW + GRACE - 1) == []
+    assert presence_service.abandoned(now=NOW + GRACE) == [("ROOM", "p1")]
+    assert presence_service.abandoned(now=NOW + GRACE + 1) == []      # reported once
+
+
+def test_rejoining_within_the_grace_period_keeps_the_seat():
+    presence_service.connect("s1", "ROOM", "p1", now=NOW)
+    presence_service.disconnect("s1", now=NOW)
+    presence_service.connect("s2", "ROOM", "p1", now=NOW + GRACE / 2)
+    assert presence_service.abandoned(now=NOW + GRACE) == []
+
+
+def test_timed_out_sessions_are_swept_then_abandoned():
+    presence_service.connect("s1", "ROOM", "p1", now=NOW)
+    presence_service.connect("s2", "ROOM", "p2", now=NOW)
+    assert presence_service.heartbeat("s2", rtt_ms=42, now=NOW + TTL - 1)
+
+    assert presence_service.sweep(now=NOW + TTL) == [("ROOM", "p1")]
+    assert presence_service.sweep(now=NOW + TTL) == []
+    assert presence_service.online_players("ROOM", now=NOW + TTL) == {"p2": 1}
+    assert presence_service.rtt_ms(["s2"]) == {"s2": 42}
+    assert presence_service.abandoned(now=NOW + TTL + GRACE) == [("ROOM", "p1")]
+
+
+def test_abandoned_seat_is_freed_and_the_last_one_removes_the_room():
+    code, moderator, _ = room_service.create_room("mod")
+    _, player, _ = room_service.join_room(code, "red")
+    for sid, pid in (("s1", moderator), ("s2", player)):
+        presence_service.connect(sid, code, pid, now=NOW)
+        presence_service.disconnect(sid, now=NOW)
+
+    seats = presence_service.abandoned(now=NOW + GRACE)
+    assert sorted(pid for _, pid in seats) == sorted([moderator, player])
+    assert room_service.remove_player(code, player)
+    assert player not in room_service.get_room(code).players
+    assert room_service.remove_player(code, moderator)
+    assert room_service.get_room(code) is None
@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+
+from services import profiling_service
+
+
+def _spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _profile_while(handler, payload, **kwargs):
+    """Run ``profile`` in a thread and call ``handler`` until it returns"""
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(run=profiling_service.profile(**kwargs)))
+    worker.start()
+    while worker.is_alive():
+        handler(payload)
+    worker.join()
+    return result["run"]
+
+
+def test_deterministic_run_profiles_only_matching_handlers():
+    calls = []
+    moved = profiling_service.profiled_handler("move", lambda data: calls.append(_spin(0.001)))
+    run = _profile_while(moved, {"room_code": "other"}, mode="deterministic", seconds=0.1, rooms=["room"])
+    assert calls and run.calls == 0
+
+    run = _profile_while(moved, {"room_code": "room"}, mode="deterministic", seconds=0.1, rooms=["ROOM"])
+    assert run.calls > 0 and run.summary()["rooms"] == ["ROOM"]
+    assert "_spin" in run.pstats_text() and run.pstats_bytes()
+
+
+def test_scoped_sample_keeps_stacks_inside_the_handler():
+    spin = profiling_service.profiled_handler("spin", lambda data: _spin(0.01))
+    run = _profile_while(spin, {}, mode="sample", seconds=0.2, events=["spin"], interval=0.002)
+    stacks = run.collapsed().splitlines()
+    assert run.calls > 0 and stacks
+    assert all(line.startswith("spin;") for line in stacks)
+    assert any("_spin (test_profiling_service.py" in line for line in stacks)
+
+
+def test_one_run_at_a_time():
+    worker = threading.Thread(target=profiling_service.profile, kwargs={"mode": "deterministic", "seconds": 0.2})
+    worker.start()
+    time.sleep(0.05)
+    with pytest.raises(profiling_service.ProfilerBusy):
+        profiling_service.profile(mode="deterministic", seconds=0)
+    worker.join()
+    with pytest.raises(ValueError):
+        profiling_service.profile(mode="other", seconds=0)
+
+
+def test_memory_diff_shows_growth_between_snapshots():
+    status = profiling_service.memory_start(frames=5)
+    try:
+        assert status["tracing"] and status["frames"] == 5
+        kept = [bytes(1024) + bytes([i % 256]) for i in range(2000)]
+        diff = profiling_service.memory_diff(top=5)
+        assert diff["growth_bytes"] >= 2000 * 1024
+        assert any("test_profiling_service.py" in frame
+                   for site in diff["growth"] for frame in site["where"])
+        assert len(kept) == 2000
+    finally:
+        profiling_service.memory_stop()
+    assert not profiling_service.memory_status()["tracing"]
+    with pytest.raises(RuntimeError):
+        profiling_service.memory_diff()
@@ -0,0 +1,96 @@
+import threading
+import time
+
+from networking.rate_limit import MoveCoalescer, RateLimiter, TokenBucket
+
+
+def test_token_bucket_burst_then_refill():
+    bucket = TokenBucket(rate=2, burst=3)
+    now = bucket.stamp
+    assert [bucket.take(now) for _ in range(4)] == [True, True, True, False]
+    assert bucket.take(now + 0.25) is False       # half a token
+    assert bucket.take(now + 0.5) is True
+    assert bucket.take(now + 100) is True
+    assert bucket.tokens == 2                     # capped at burst, minus the one taken
+
+
+def test_rate_limiter_keys_are_independent():
+    limiter = RateLimiter(rate=0.001, burst=1)
+    assert limiter.allow("a") and not limiter.allow("a")
+    assert limiter.allow("b")
+    limiter.forget("a")
+    assert limiter.allow("a")
+
+
+def test_same_player_twice_is_a_duplicate():
+    c = MoveCoalescer()
+    assert c.acquire("ROOM", "p1") is None
+    c.release("ROOM", "p1", accepted=True)
+    assert c.acquire("ROOM", "p1") == "duplicate"
+    assert c.acquire("ROOM", "p2") is None
+    c.release("ROOM", "p2", accepted=True)
+    assert c.acquire("ROOM", "p1") is None
+    c.release("ROOM", "p1", accepted=False)
+    assert c.acquire("ROOM", "p1") is None        # a rejected move does not use the turn
+    c.release("ROOM", "p1", accepted=True)
+
+
+def test_reset_forgets_the_last_mover():
+    c = MoveCoalescer()
+    assert c.acquire("ROOM", "p1") is None
+    c.release("ROOM", "p1", accepted=True)
+    c.reset("ROOM")
+    assert c.acquire("ROOM", "p1") is None
+    c.release("ROOM", "p1", accepted=True)
+
+
+def test_move_held_across_a_reset_does_not_count():
+    c = MoveCoalescer()
+    assert c.acquire("ROOM", "p1") is None
+    c.reset("ROOM")                               # the trial ended while the move ran
+    c.release("ROOM", "p1", accepted=True)
+    assert c.acquire("ROOM", "p1") is None
+    c.release("ROOM", "p1", accepted=True)
+
+
+def _acquire_in_thread(c, room, player):
+    result = {}
+    t = threading.Thread(target=lambda: result.setdefault("reason", c.acquire(room, player)))
+    t.start()
+    return t, result
+
+
+def test_queued_move_is_superseded_by_a_newer_one():
+    c = MoveCoalescer()
+    assert c.acquire("ROOM", "p2") is None        # the room is busy
+    older, older_result = _acquire_in_thread(c, "ROOM", "p1")
+    older.join(0.1)
+    assert older.is_alive()
+    newer, newer_result = _acquire_in_thread(c, "ROOM", "p1")
+    newer.join(0.1)
+    c.release("ROOM", "p2", accepted=True)
+
+    # the lock wakes waiters in no particular order: the one that runs the
+    # move holds the room until it releases, whichever thread that was
+    deadline = time.monotonic() + 2
+    while not any(r.get("reason", "") is None for r in (older_result, newer_result)):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    c.release("ROOM", "p1", accepted=True)
+    older.join(1)
+    newer.join(1)
+    assert sorted(str(r["reason"]) for r in (older_result, newer_result)) == ["None", "coalesced"]
+
+
+def test_hold_excludes_moves():
+    c = MoveCoalescer()
+    with c.hold("ROOM"):
+        t, result = _acquire_in_thread(c, "ROOM", "p1")
+        t.join(0.1)
+        assert t.is_alive() and not result
+    t.join(1)
+    assert result == {"reason": None}
+    c.release("ROOM", "p1", accepted=True)
+    with c.hold("OTHER"):                         # rooms do not block each other
+        assert c.acquire("ROOM", "p2") is None
+        c.release("ROOM", "p2", accepted=True)
@@ -0,0 +1,104 @@
+import io
+import json
+
+import pytest
+
+from services import recording_format as rf
+
+
+def _events(room="ROOM"):
+    layout = {"start_positions": {"R": [0, 0], "B": [3, 3]}, "target": [2, 0], "capturer": "R"}
+    return [
+        {"ts": 1.0, "room": room, "kind": "game_start", "players": {"R": "p-r", "B": "p-b"}},
+        {"ts": 1.0, "room": room, "kind": "trial_start", "block_index": 0, "trial_index": 0, "layout": layout},
+        {"ts": 2.0, "room": room, "kind": "move", "role": "R", "dx": 1, "dy": 0, "turns_taken": 1,
+         "positions": {"R": [1, 0], "B": [3, 3]}, "block_index": 0, "trial_index": 0},
+        {"ts": 3.5, "room": room, "kind": "move", "role": "B", "dx": -1, "dy": 0, "turns_taken": 2,
+         "positions": {"R": [1, 0], "B": [2, 3]}, "block_index": 0, "trial_index": 0},
+        {"ts": 4.0, "room": room, "kind": "trial_complete", "block_index": 0, "trial_index": 0,
+         "reason": "timeout", "winner": None, "scores": {"R": 0, "B": 0}},
+        {"ts": 5.0, "room": room, "kind": "move", "role": "B", "dx": 0, "dy": -1, "turns_taken": 1,
+         "positions": {"R": None, "B": [0, 2]}, "block_index": 0, "trial_index": 1},
+        {"ts": 6.0, "room": room, "kind": "game_over", "scores": {"R": 0, "B": 0}},
+    ]
+
+
+def _pack(path, events, **kwargs):
+    with rf.ColumnarWriter(str(path), **kwargs) as writer:
+        moves = rf.pack_events(events, writer)
+    return moves
+
+
+def test_pack_and_read_back(tmp_path):
+    path = tmp_path / "rec.hhc"
+    assert _pack(path, _events()) == 3
+    with rf.ColumnarReader(str(path)) as reader:
+        assert reader.rows == 3
+        assert reader.rooms["ROOM"]["players"] == {"R": "p-r", "B": "p-b"}
+        assert reader.rooms["ROOM"]["scores"] == {"R": 0, "B": 0}
+        first, second = reader.segments(room="ROOM")
+        assert (first.block, first.trial, first.rows) == (0, 0, 2)
+        assert first.outcome["reason"] == "timeout"
+        assert first.layout["target"] == [2, 0]
+        assert list(first.column("ts")) == [2.0, 3.5]
+        assert list(first.iter_rows())[1] == (3.5, 1, -1, 0, 2, 1, 0, 2, 3)
+        assert second.outcome is None and second.layout is None
+        assert list(second.iter_rows()) == [(5.0, 1, 0, -1, 1, -1, -1, 0, 2)]
+        assert list(reader.column("role")) == [0, 1, 1]
+        del first, second
+
+
+def test_trials_never_straddle_row_groups(tmp_path):
+    path = tmp_path / "rec.hhc"
+    events = _events("A") + _events("B")
+    _pack(path, events, row_group_size=2)
+    with rf.ColumnarReader(str(path)) as reader:
+        assert reader.rows == 6
+        segments = reader.segments()
+        assert [(s.room, s.trial, s.rows) for s in segments] == [("A", 0, 2), ("B", 0, 2), ("A", 1, 1), ("B", 1, 1)]
+        assert all(s._start + s.rows <= reader._groups[s._group]["rows"] for s in segments)
+        del segments
+        assert [list(s.column("dx")) for s in reader.segments(room="B")] == [[1, -1], [0]]
+        assert list(reader.column("turns_taken")) == [1, 2, 1, 2, 1, 1]
+
+
+def test_export_ndjson_restores_the_moves(tmp_path):
+    path = tmp_path / "rec.hhc"
+    _pack(path, _events())
+    out = io.StringIO()
+    with rf.ColumnarReader(str(path)) as reader:
+        assert rf.export_ndjson(reader, out) == 4
+    lines = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [e["kind"] for e in lines] == ["move", "move", "trial_complete", "move"]
+    assert lines[1]["player_id"] == "p-b" and lines[1]["positions"] == {"R": [1, 0], "B": [2, 3]}
+    assert lines[3]["positions"] == {"R": None, "B": [0, 2]}
+
+
+def test_export_csv(tmp_path):
+    path = tmp_path / "rec.hhc"
+    _pack(path, _events())
+    out = io.StringIO()
+    with rf.ColumnarReader(str(path)) as reader:
+        assert rf.export_csv(reader, out) == 3
+    header, *rows = out.getvalue().splitlines()
+    assert header.split(",") == rf.CSV_HEADER
+    assert rows[0] == "ROOM,0,0,2.0,0,1,0,1,1,0,3,3"
+
+
+def test_pack_jsonl_skips_a_torn_last_line(tmp_path):
+    src = tmp_path / "events.jsonl"
+    src.write_text("".join(json.dumps(e) + "\n" for e in _events()) + '{"ts": 7.0, "ro')
+    out = tmp_path / "rec.hhc"
+    assert rf.pack_jsonl([str(src)], str(out)) == 3
+    assert not (tmp_path / "rec.hhc.tmp").exists()
+
+
+def test_reader_rejects_damaged_files(tmp_path):
+    path = tmp_path / "rec.hhc"
+    _pack(path, _events())
+    data = path.read_bytes()
+    bad = tmp_path / "bad.hhc"
+    for content in (b"", b"not a recording at all", data[:-4]):
+        bad.write_bytes(content)
+        with pytest.raises(rf.FormatError):
+            rf.ColumnarReader(str(bad))
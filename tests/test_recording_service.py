@@ -0,0 +1,67 @@
+import json
+import os
+
+import pytest
+
+import config
+from conf import conf_data
+from services import recording_service
+
+
+@pytest.fixture
+def recorder(tmp_path, monkeypatch):
+    """Start the writer on ``tmp_path``; it only writes when stopped"""
+    monkeypatch.setattr(conf_data, "ensure_recordings_dir", lambda: str(tmp_path))
+    monkeypatch.setattr(config, "RECORDING_ENABLED", True)
+    monkeypatch.setattr(config, "RECORDING_FLUSH_INTERVAL", 60.0)
+    assert recording_service.start()
+    yield tmp_path
+    recording_service.stop()
+
+
+def _lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_record_is_off_until_started():
+    assert not recording_service.record("ROOM", "move")
+    assert not recording_service.get_stats()["enabled"]
+
+
+def test_full_queue_drops_and_stop_writes_the_rest(recorder, monkeypatch):
+    monkeypatch.setattr(config, "RECORDING_QUEUE_SIZE", 3)
+    before = recording_service.get_stats()
+    accepted = [recording_service.record(room, "move", dx=i) for i, room in enumerate(["a", "b", "a", "b", "a"])]
+    assert accepted == [True, True, True, False, False]
+    stats = recording_service.get_stats()
+    assert stats["depth"] == 3 and stats["max_depth"] >= 3
+    assert stats["dropped"] - before["dropped"] == 2
+
+    recording_service.stop()
+    assert [e["dx"] for e in _lines(recorder / "A" / "events.jsonl")] == [0, 2]
+    assert [e["kind"] for e in _lines(recorder / "B" / "events.jsonl")] == ["move"]
+    after = recording_service.get_stats()
+    assert after["written"] - before["written"] == 3 and after["depth"] == 0
+    assert not recording_service.record("a", "move")      # stopped
+
+
+def test_batch_is_grouped_by_room_and_game_over_closes_the_file(tmp_path):
+    files = recording_service._Files(str(tmp_path), limit=1)
+    recording_service._write_batch(files, [
+        {"ts": 1.0, "room": "A", "kind": "move", "role": "R", "dx": 1, "dy": 0, "turns_taken": 1,
+         "positions": {"R": [1, 0], "B": [3, 3]}, "block_index": 0, "trial_index": 0},
+        {"ts": 1.1, "room": "B", "kind": "move", "dx": 2},      # evicts A's handle (limit=1)
+        {"ts": 1.2, "room": "A", "kind": "game_over"},
+    ])
+    assert [e["kind"] for e in _lines(tmp_path / "A" / "events.jsonl")] == ["move", "game_over"]
+    assert os.path.exists(tmp_path / "A" / "events.hhc")
+    files.close()
+
+
+def test_a_failed_batch_is_counted_not_raised(tmp_path):
+    (tmp_path / "A").write_text("not a directory")
+    before = recording_service.get_stats()["write_errors"]
+    recording_service._write_batch(recording_service._Files(str(tmp_path), 4),
+                                   [{"ts": 1.0, "room": "A", "kind": "move"}])
+    assert recording_service.get_stats()["write_errors"] == before + 1
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from conftest import trial
+from services import recording_format, replay_service
+from services.replay_service import Replay, ReplayError
+
+LAYOUT = trial(r=(0, 0), b=(3, 3), target=(2, 0))
+
+
+def _move(ts, role, dx, dy, trial_index=0):
+    return {"ts": ts, "room": "ROOM", "kind": "move", "role": role, "dx": dx, "dy": dy,
+            "block_index": 0, "trial_index": trial_index}
+
+
+def _recording():
+    """R reaches the target on the 3rd move of trial 0; trial 1 times out"""
+    return [
+        {"ts": 0, "room": "ROOM", "kind": "game_start", "players": {"R": "p-r", "B": "p-b"}},
+        {"ts": 0, "room": "ROOM", "kind": "trial_start", "block_index": 0, "trial_index": 0, "layout": LAYOUT},
+        _move(1, "R", 1, 0), _move(2, "B", -1, 0), _move(3, "R", 1, 0),
+        {"ts": 3, "room": "ROOM", "kind": "trial_complete", "block_index": 0, "trial_index": 0,
+         "reason": "target_reached", "winner": "R", "scores": {"R": 1, "B": 0}},
+        {"ts": 3, "room": "ROOM", "kind": "trial_start", "block_index": 0, "trial_index": 1, "layout": LAYOUT},
+        _move(4, "R", 0, 1, 1), _move(5, "B", 0, -1, 1),
+        {"ts": 9, "room": "ROOM", "kind": "trial_complete", "block_index": 0, "trial_index": 1,
+         "reason": "timeout", "winner": None, "scores": {"R": 1, "B": 0}},
+        {"ts": 9, "room": "ROOM", "kind": "game_over", "scores": {"R": 1, "B": 0}},
+    ]
+
+
+@pytest.fixture(autouse=True)
+def _sequence(blocks):
+    blocks([{"descriptor": "Main", "trials": [LAYOUT, LAYOUT], "count_scores": True}])
+
+
+def _replay(events, **kwargs):
+    session, = replay_service.sessions_from_events(events)
+    return Replay(session, **kwargs)
+
+
+def test_full_pass_rescores_the_session():
+    summary = _replay(_recording()).summary()
+    assert summary["moves"] == 5 and summary["trials"] == 2
+    assert summary["scores"] == {"R": 1, "B": 0} == summary["recorded_scores"]
+    assert summary["changed_trials"] == [] and summary["divergent_moves"] == 0
+
+
+@pytest.mark.parametrize("snapshot_every", [1, 2, 64])
+def test_state_at_scores_the_move_that_ends_the_trial(snapshot_every):
+    replay = _replay(_recording(), snapshot_every=snapshot_every)
+    before = replay.state_at(2)
+    assert before["trial_ended"] is None and before["scores"] == {"R": 0, "B": 0}
+    ending = replay.state_at(3)
+    assert ending["trial_ended"] == "target_reached"
+    assert ending["positions"]["R"] == [2, 0]
+    assert ending["scores"] == {"R": 1, "B": 0}
+    nxt = replay.state_at(4)
+    assert (nxt["trial_index"], nxt["turns_taken"], nxt["scores"]) == (1, 1, {"R": 1, "B": 0})
+    assert replay.state_at(0)["positions"] == LAYOUT["start_positions"]
+
+
+def test_state_at_is_the_same_from_any_snapshot():
+    dense, sparse = _replay(_recording(), snapshot_every=1), _replay(_recording(), snapshot_every=64)
+    for turn in range(dense.total_moves + 1):
+        assert dense.state_at(turn) == sparse.state_at(turn)
+    with pytest.raises(ReplayError):
+        dense.state_at(dense.total_moves + 1)
+
+
+def test_rule_change_shows_up_as_a_changed_trial(blocks):
+    blocks([{"descriptor": "Main", "trials": [LAYOUT, LAYOUT], "count_scores": False}])
+    summary = _replay(_recording()).summary()
+    assert summary["scores"] == {"R": 0, "B": 0}
+    assert summary["changed_trials"] == []         # the winner stands, it just earns nothing
+
+    events = _recording()
+    events[1] = dict(events[1], layout=dict(LAYOUT, target=[3, 0]))
+    changed = _replay(events).summary()["changed_trials"]
+    assert [(c["trial_index"], c["reason"], c["recorded_reason"]) for c in changed] == \
+        [(0, "incomplete", "target_reached")]
+
+
+def test_missing_layout_is_refused():
+    events = [e for e in _recording() if e["kind"] != "trial_start"]
+    with pytest.raises(ReplayError):
+        _replay(events)
+
+
+def test_rescore_all_reads_jsonl_and_hhc(tmp_path):
+    src = tmp_path / "events.jsonl"
+    src.write_text("".join(json.dumps(e) + "\n" for e in _recording()))
+    packed = tmp_path / "rec.hhc"
+    recording_format.pack_jsonl([str(src)], str(packed))
+    broken = tmp_path / "broken.hhc"
+    broken.write_bytes(b"nope")
+
+    from_jsonl, from_hhc, unreadable = replay_service.rescore_all([str(src), str(packed), str(broken)], workers=1)
+    for result in (from_jsonl, from_hhc):
+        assert result["scores"] == {"R": 1, "B": 0} and result["moves"] == 5
+    assert unreadable["source"] == str(broken) and "error" in unreadable
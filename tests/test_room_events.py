@@ -0,0 +1,57 @@
+import config
+from networking import wire
+from services import room_events
+
+
+class FakeSocketIO:
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, data, to=None, **kwargs):
+        self.emitted.append((event, data, to))
+
+
+def test_publish_sequences_per_room():
+    sio = FakeSocketIO()
+    assert room_events.publish("a", {"x": 1}, "abcd", sio) == 1
+    assert room_events.publish("b", None, "ABCD", sio) == 2
+    assert room_events.publish("a", {}, "other", sio) == 1
+    assert sio.emitted[0] == ("a", {"x": 1, "seq": 1}, "ABCD")
+    assert room_events.current_seqs(["abcd", "other", "none"]) == {"ABCD": 2, "OTHER": 1, "NONE": 0}
+
+
+def test_binary_audience_gets_frames():
+    sio = FakeSocketIO()
+    payload = {"block_index": 0, "trial_index": 0, "turns_taken": 1, "turn": "B",
+               "positions": {"R": [1, 0], "B": [3, 3]}}
+    room_events.publish(wire.BOARD_STATE, payload, "ROOM", sio, binary=wire.encode_board_state)
+    (_, as_json, json_room), (_, as_bytes, bin_room) = sio.emitted
+    assert json_room == room_events.wire_room("ROOM", "json") and as_json["seq"] == 1
+    assert bin_room == room_events.wire_room("ROOM", "bin")
+    assert wire.decode_board_state(as_bytes) == as_json
+    assert room_events.replay("ROOM", 0) == [(wire.BOARD_STATE, as_json)]
+
+
+def test_replay_returns_missed_events_in_order():
+    for i in range(5):
+        room_events.publish("e", {"i": i}, "ROOM")
+    assert room_events.replay("ROOM", 5) == []
+    missed = room_events.replay("ROOM", 2)
+    assert missed == [("e", {"i": 2, "seq": 3}), ("e", {"i": 3, "seq": 4}), ("e", {"i": 4, "seq": 5})]
+
+
+def test_replay_needs_a_snapshot_once_the_buffer_overflowed(monkeypatch):
+    monkeypatch.setattr(config, "ROOM_EVENT_BUFFER", 3)
+    for i in range(6):
+        room_events.publish("e", {"i": i}, "ROOM")
+    assert [p["seq"] for _, p in room_events.replay("ROOM", 3)] == [4, 5, 6]
+    assert room_events.replay("ROOM", 2) is None
+
+
+def test_replay_after_the_room_was_recreated():
+    room_events.publish("e", {}, "ROOM")
+    room_events.publish("e", {}, "ROOM")
+    room_events.clear("ROOM")
+    assert room_events.current_seq("ROOM") == 0
+    assert room_events.replay("ROOM", 2) is None
+    assert room_events.replay("ROOM", 0) == []
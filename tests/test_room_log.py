@@ -0,0 +1,48 @@
+import pytest
+
+import config
+from conftest import started_room, trial
+from services import game_service, room_log, room_service
+from services.redis_client import get_redis
+
+
+@pytest.fixture(autouse=True)
+def _sequence(blocks):
+    blocks([{"descriptor": "Main", "trials": [trial(r=(0, 0), b=(3, 3), target=(3, 0))] * 2}])
+
+
+@pytest.mark.parametrize("snapshot_every", [2, 50])
+def test_derive_matches_the_stored_room(monkeypatch, snapshot_every):
+    monkeypatch.setattr(config, "ROOM_LOG_SNAPSHOT_EVERY", snapshot_every)
+    code, red, blue = started_room()
+    for pid, dx, dy in ((red, 1, 0), (blue, 0, -1), (red, 1, 0), (blue, -1, 0)):
+        assert game_service.apply_move(code, pid, dx, dy)[1] is None
+
+    room, version = room_log.derive(code)
+    assert version == room_service.get_version(code)
+    assert room.to_meta() == room_service.get_room(code).to_meta()
+
+
+def test_derive_across_a_trial_boundary():
+    code, red, blue = started_room()
+    for pid, dx, dy in ((red, 1, 0), (blue, 0, -1), (red, 1, 0), (blue, -1, 0), (red, 1, 0)):
+        assert game_service.apply_move(code, pid, dx, dy)[1] is None
+    assert [e["op"] for e in room_log.entries(code, count=2)] == ["move", "advance"]
+    room, _ = room_log.derive(code)
+    assert room.current_trial_index == 1 and room.scores["R"] == 1
+    assert room.to_meta() == room_service.get_room(code).to_meta()
+
+
+def test_derive_of_a_removed_or_unknown_room():
+    code, _, _ = started_room()
+    room_service.remove_room(code)
+    assert room_log.derive(code) == (None, 0)
+    assert room_log.derive("NOROOM") == (None, 0)
+
+
+def test_save_reloads_the_script_after_a_flush():
+    code, red, _ = started_room()
+    get_redis.script_flush()
+    assert game_service.apply_move(code, red, 1, 0)[1] is None
+    assert room_log.entries(code, count=1)[0]["op"] == "move"
+    assert room_log.derive(code)[0].to_meta() == room_service.get_room(code).to_meta()
@@ -0,0 +1,91 @@
+import pytest
+from flask import Flask
+
+import config
+from routes import trace_routes
+from services import trace_service
+
+
+@pytest.fixture(autouse=True)
+def _fresh_buffer(monkeypatch):
+    monkeypatch.setattr(trace_service, "_sample_rate", 1.0)
+    trace_service.clear()
+    yield
+    trace_service.clear()
+
+
+def _trace(trace_id, room="ROOM", player="player-uuid", **fields):
+    trace_service.begin(trace_id, None, room=room, player=trace_service.player_tag(player))
+    for span in trace_service.SPANS:
+        trace_service.mark(span)
+    return trace_service.finish(**fields)
+
+
+def test_unsampled_moves_are_not_kept(monkeypatch):
+    monkeypatch.setattr(trace_service, "_sample_rate", 0.0)
+    assert trace_service.begin("t1") is None
+    trace_service.mark("load")
+    assert trace_service.finish() is None
+    assert trace_service.query() == []
+
+
+def test_finished_trace_has_its_spans():
+    assert _trace("t1", result="accepted") == "t1"
+    trace, = trace_service.query(trace_id="t1")
+    assert set(trace["spans"]) == set(trace_service.SPANS)
+    assert trace["result"] == "accepted" and trace["server_ms"] >= 0
+    assert not any(key.startswith("_") for key in trace)
+
+
+def test_traces_hold_no_player_id():
+    _trace("t1", player="secret-id")
+    trace, = trace_service.query()
+    assert "secret-id" not in repr(trace)
+    assert trace["player"] == trace_service.player_tag("secret-id")
+    assert trace_service.query(player="secret-id") == [trace]
+    assert trace_service.query(player=trace["player"]) == [trace]
+    assert trace_service.query(player="someone-else") == []
+
+
+def test_query_filters_newest_first(monkeypatch):
+    monkeypatch.setattr(config, "TRACE_BUFFER_SIZE", 3)
+    for i, room in enumerate(("A", "B", "A", "A")):
+        _trace(f"t{i}", room=room)
+    assert [t["trace_id"] for t in trace_service.query()] == ["t3", "t2", "t1"]   # t0 evicted
+    assert [t["trace_id"] for t in trace_service.query(room="a", limit=1)] == ["t3"]
+    assert trace_service.query(min_ms=10_000) == []
+
+
+def test_client_report_derives_network_and_render_time():
+    _trace("t1")
+    server_ms = trace_service.query(trace_id="t1")[0]["server_ms"]
+    assert trace_service.report_client("t1", ack_ms=server_ms + 20, render_ms=server_ms + 35)
+    assert not trace_service.report_client("t1", ack_ms=1, render_ms=2)      # reported once
+    assert not trace_service.report_client("unknown", ack_ms=1)
+    trace, = trace_service.query(trace_id="t1")
+    assert (trace["network_ms"], trace["client_render_ms"]) == (20, 15)
+    assert trace_service.summary()["percentiles_ms"]["network_ms"]["count"] == 1
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(config, "TRACE_TOKEN", "s3cret")
+    app = Flask(__name__)
+    trace_routes.init_routes(app)
+    return app.test_client()
+
+
+def test_endpoint_requires_the_token(client):
+    _trace("t1")
+    assert client.get("/debug/traces").status_code == 401
+    assert client.get("/debug/traces", headers={"Authorization": "Bearer nope"}).status_code == 401
+    assert client.put("/debug/traces?rate=1").status_code == 401
+    ok = client.get("/debug/traces", headers={"Authorization": "Bearer s3cret"})
+    assert ok.status_code == 200 and [t["trace_id"] for t in ok.get_json()["traces"]] == ["t1"]
+
+
+def test_endpoint_changes_the_sample_rate(client):
+    auth = {"Authorization": "Bearer s3cret"}
+    assert client.put("/debug/traces?rate=0.25", headers=auth).get_json() == {"sample_rate": 0.25}
+    assert client.put("/debug/traces?rate=x", headers=auth).status_code == 400
+    assert client.delete("/debug/traces", headers=auth).status_code == 204
@@ -0,0 +1,48 @@
+import pytest
+
+from networking import wire
+
+
+def test_board_state_round_trip():
+    payload = {"seq": 300, "block_index": 1, "trial_index": 129, "turns_taken": 7,
+               "turn": "B", "positions": {"R": [0, 3], "B": [2, 1]}}
+    frame = wire.encode_board_state(payload)
+    assert frame[0] == wire.FRAME_BOARD_STATE
+    assert wire.decode_board_state(frame) == payload
+
+
+def test_unplaced_players_are_omitted():
+    payload = {"block_index": 0, "trial_index": 0, "turn": "R", "positions": {"R": [1, 1]}}
+    decoded = wire.decode_board_state(wire.encode_board_state(payload))
+    assert decoded["positions"] == {"R": [1, 1]}
+    assert decoded["seq"] == 0 and decoded["turns_taken"] == 0 and decoded["turn"] == "R"
+
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 300, 2 ** 21, 2 ** 40])
+def test_varint_round_trip(value):
+    out = bytearray(b"x")
+    wire.write_varint(out, value)
+    assert wire.read_varint(bytes(out), 1) == (value, len(out))
+
+
+def test_varint_rejects_negative():
+    with pytest.raises(ValueError):
+        wire.write_varint(bytearray(), -1)
+
+
+def test_coordinate_outside_a_byte_is_rejected():
+    with pytest.raises(ValueError):
+        wire.encode_board_state({"block_index": 0, "trial_index": 0, "positions": {"R": [256, 0]}})
+
+
+def test_decode_rejects_other_frames():
+    with pytest.raises(ValueError):
+        wire.decode_board_state(b"")
+    with pytest.raises(ValueError):
+        wire.decode_board_state(b"\x02\x00")
+
+
+def test_negotiate():
+    assert wire.negotiate("bin") == wire.BINARY
+    assert wire.negotiate(None) == wire.JSON
+    assert wire.negotiate("msgpack") == wire.JSON
@@ -0,0 +1,3 @@
+"""
+Developer and operations tools (run with ``python -m tools.<name>``)
+"""
@@ -0,0 +1,146 @@
+"""
+Compare server async modes: concurrent connections and move latency.
+
+For every mode a fresh server is started (``python app.py`` with ASYNC_MODE
+and PORT set), ``--dyads`` rooms are set up concurrently (3 sockets each), then
+every dyad plays ``--moves`` paced moves in parallel. The report shows how many
+sockets were connected and the move-to-broadcast latency percentiles.
+
+The server uses the Redis at REDIS_URL, as in production.
+
+Usage:
+    python -m tools.bench_async_modes --modes threading eventlet --dyads 50 --moves 40
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from tools.dyad_client import Dyad
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(pct / 100.0 * (len(values) - 1)))))
+    return values[k]
+
+
+def start_server(mode: str, port: int, timeout: float = 20.0, extra_env: Optional[dict] = None) -> subprocess.Popen:
+    """Start ``app.py`` in ``mode`` and wait until it answers HTTP"""
+    env = dict(os.environ, ASYNC_MODE=mode, PORT=str(port), **(extra_env or {}))
+    proc = subprocess.Popen(
+        [sys.executable, "app.py"], cwd=ROOT, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited early in mode {mode} (code {proc.returncode})")
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1).read()
+            return proc
+        except Exception:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"server did not come up in mode {mode}")
+
+
+def run_mode(mode: str, port: int, dyads: int, moves: int, pace: float) -> dict:
+    proc = start_server(mode, port)
+    base = f"http://127.0.0.1:{port}"
+    pool = [Dyad(base) for _ in range(dyads)]
+    latencies: List[float] = []
+    try:
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(dyads, 64)) as ex:
+            setup_errors = sum(1 for r in ex.map(_safe_setup, pool) if not r)
+        setup_s = time.perf_counter() - t0
+        ready = [d for d in pool if d.started.is_set()]
+
+        def play(d: Dyad) -> List[float]:
+            out = []
+            for _ in range(moves):
+                lat = d.move()
+                if lat is not None:
+                    out.append(lat)
+                time.sleep(pace)
+            return out
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, len(ready))) as ex:
+            for out in ex.map(play, ready):
+                latencies.extend(out)
+        play_s = time.perf_counter() - t0
+    finally:
+        for d in pool:
+            d.close()
+        proc.terminate()
+        proc.wait(timeout=10)
+
+    return {
+        "mode": mode,
+        "sockets": 3 * len(ready),
+        "setup_errors": setup_errors,
+        "setup_s": setup_s,
+        "moves": len(latencies),
+        "errors": sum(d.errors for d in pool),
+        "moves_per_s": len(latencies) / play_s if play_s else 0.0,
+        "p50_ms": _ms(percentile(latencies, 50)),
+        "p95_ms": _ms(percentile(latencies, 95)),
+        "p99_ms": _ms(percentile(latencies, 99)),
+        "mean_ms": _ms(statistics.fmean(latencies)) if latencies else None,
+    }
+
+
+def _safe_setup(d: Dyad) -> bool:
+    try:
+        d.setup()
+        return True
+    except Exception:
+        return False
+
+
+def _ms(v: Optional[float]) -> Optional[float]:
+    return None if v is None else round(v * 1000.0, 2)
+
+
+def print_report(rows: List[dict]) -> None:
+    cols = ["mode", "sockets", "setup_errors", "setup_s", "moves", "errors",
+            "moves_per_s", "p50_ms", "p95_ms", "p99_ms", "mean_ms"]
+    print("  ".join(f"{c:>12}" for c in cols))
+    for row in rows:
+        cells = []
+        for c in cols:
+            v = row.get(c)
+            cells.append(f"{v:>12.2f}" if isinstance(v, float) else f"{str(v):>12}")
+        print("  ".join(cells))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["threading", "eventlet"])
+    parser.add_argument("--dyads", type=int, default=20)
+    parser.add_argument("--moves", type=int, default=30)
+    parser.add_argument("--pace", type=float, default=0.25, help="seconds between moves of one dyad")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    rows = []
+    for mode in args.modes:
+        print(f"benchmarking {mode} ...", file=sys.stderr)
+        rows.append(run_mode(mode, args.port, args.dyads, args.moves, args.pace))
+    print_report(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
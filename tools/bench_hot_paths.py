@@ -0,0 +1,293 @@
+"""
+Microbenchmarks for the room service and model hot paths, with baselines.
+
+The suite runs in-process against an in-process store by default
+(REDIS_URL=memory://, needs fakeredis from requirements-dev.txt). Pass
+``--store redis`` to use the Redis at REDIS_URL instead; rooms created by
+the run are removed at the end. Cases are measured at several room sizes
+(trials in the current block, players) and store populations (rooms):
+
+    meta.to_meta / meta.from_meta      GameRoom (de)serialization
+    room.create / room.join            room_service.create_room / join_room
+    room.get / room.save               room_service.get_room / save_room
+    game.update_position               game_service.update_position (one move)
+    rooms.active                       room_service.get_active_rooms
+    presence.disconnect                socket disconnect lookup (presence_service.disconnect)
+
+Each case is timed per call (setup between calls is not timed) for at least
+``--min-time`` seconds, ``--repeat`` times. The best repeat is the figure
+compared against a baseline; the median is shown for context.
+
+Usage:
+    python -m tools.bench_hot_paths                                  # run and print
+    python -m tools.bench_hot_paths --save bench_baseline.json       # record a baseline
+    python -m tools.bench_hot_paths --baseline bench_baseline.json   # exit 1 on a >25% regression
+    python -m tools.bench_hot_paths --baseline b.json --threshold 0.1 --filter room.
+"""
+import argparse
+import copy
+import gc
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOM_SIZES = [(8, 2), (64, 2), (64, 8)]      # (trials, players)
+POPULATIONS = [10, 1000]                      # rooms in the store
+
+_created: List[str] = []
+
+
+def _services():
+    from services import game_service, presence_service, room_service
+    return room_service, game_service, presence_service
+
+
+def measure(op: Callable, setup: Optional[Callable] = None, min_time: float = 0.2,
+            repeat: int = 5, max_calls: int = 100000) -> Tuple[float, float, int]:
+    """Time ``op(setup())`` per call
+
+    Returns:
+        tuple: (best, median) seconds per call over ``repeat`` runs, calls per run
+    """
+    runs, calls = [], 0
+    gc_was_enabled = gc.isenabled()
+    gc.disable()            # as timeit does: collections land on whichever call happens to trigger them
+    try:
+        for _ in range(repeat):
+            total, calls = 0.0, 0
+            while total < min_time and calls < max_calls:
+                arg = setup() if setup else None
+                t0 = time.perf_counter()
+                op(arg)
+                total += time.perf_counter() - t0
+                calls += 1
+            runs.append(total / calls)
+            gc.collect()
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return min(runs), statistics.median(runs), calls
+
+
+# ----------------------- Fixtures -----------------------
+def make_room(trials: int, players: int, started: bool = False):
+    """A stored room with ``players`` joined and ``trials`` trials in its block"""
+    room_service, _, _ = _services()
+    code, _, _ = room_service.create_room("bench-mod", max_players=players)
+    _created.append(code)
+    for i in range(players):
+        room_service.join_room(code, f"bench-{i}")
+    room = room_service.get_room(code)
+    base = room.trials[0] if room.trials else {}
+    room.trials = [copy.deepcopy(base) for _ in range(trials)]
+    room.current_trial_index = 0
+    if started:
+        for p in room.players.values():
+            p["ready"] = True
+        room.started = True
+    room_service.save_room(room)
+    return room
+
+
+def populate(rooms: int) -> None:
+    """Grow the store to at least ``rooms`` rooms"""
+    room_service, _, _ = _services()
+    missing = rooms - len(room_service.get_active_rooms())
+    for _ in range(max(0, missing)):
+        make_room(8, 2)
+
+
+def _step(room, player_id: str) -> Optional[Tuple[int, int]]:
+    for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+        if room.check_move(player_id, dx, dy) is None:
+            return dx, dy
+    return None
+
+
+# ----------------------- Cases -----------------------
+def case_to_meta(trials, players, rooms):
+    room = make_room(trials, players)
+    return (lambda _: room.to_meta()), None
+
+
+def case_from_meta(trials, players, rooms):
+    from models.game_room import GameRoom
+    meta = json.loads(json.dumps(make_room(trials, players).to_meta()))
+    return (lambda _: GameRoom.from_meta(meta)), None
+
+
+def case_create(trials, players, rooms):
+    room_service, _, _ = _services()
+
+    def op(_):
+        _created.append(room_service.create_room("bench-mod", max_players=players)[0])
+    return op, None
+
+
+def case_join(trials, players, rooms):
+    room_service, _, _ = _services()
+
+    def setup():
+        code, _, _ = room_service.create_room("bench-mod", max_players=players)
+        _created.append(code)
+        return code
+    return (lambda code: room_service.join_room(code, "bench-join")), setup
+
+
+def case_get(trials, players, rooms):
+    room_service, _, _ = _services()
+    code = make_room(trials, players).room_code
+    return (lambda _: room_service.get_room(code)), None
+
+
+def case_save(trials, players, rooms):
+    room_service, _, _ = _services()
+    room = make_room(trials, players)
+    pid = next(p for p, info in room.players.items() if not info.get("moderator"))
+    return (lambda _: room_service.save_room(room, "move", player_id=pid, dx=1, dy=0)), None
+
+
+def case_update_position(trials, players, rooms):
+    room_service, game_service, _ = _services()
+    state = {"room": make_room(trials, players, started=True)}
+
+    def setup():
+        # the next legal move of whoever has the turn; a fresh room once the sequence is over
+        room = room_service.get_room(state["room"].room_code)
+        trial = room.current_trial()
+        if room.finished or not trial:
+            room = state["room"] = make_room(trials, players, started=True)
+            trial = room.current_trial()
+        pid = next(p for p, info in room.players.items() if info.get("role") == trial.get("turn"))
+        step = _step(room, pid)
+        if step is None:
+            room = state["room"] = make_room(trials, players, started=True)
+            pid = next(p for p, info in room.players.items() if info.get("role") == room.current_trial().get("turn"))
+            step = _step(room, pid)
+        return room.room_code, pid, step
+    return (lambda a: game_service.update_position(a[0], a[1], *a[2])), setup
+
+
+def case_active_rooms(trials, players, rooms):
+    room_service, _, _ = _services()
+    return (lambda _: room_service.get_active_rooms()), None
+
+
+def case_disconnect(trials, players, rooms):
+    _, _, presence_service = _services()
+    room = make_room(trials, players)
+    pids = [p for p, info in room.players.items() if not info.get("moderator")]
+    counter = itertools.count()
+
+    def setup():
+        sid = f"bench-sid-{next(counter)}"
+        presence_service.connect(sid, room.room_code, pids[0])
+        return sid
+    return (lambda sid: presence_service.disconnect(sid)), setup
+
+
+# name -> (factory, grid of (trials, players, rooms))
+CASES: Dict[str, Tuple[Callable, List[Tuple[int, int, int]]]] = {
+    "meta.to_meta": (case_to_meta, [(t, p, POPULATIONS[0]) for t, p in ROOM_SIZES]),
+    "meta.from_meta": (case_from_meta, [(t, p, POPULATIONS[0]) for t, p in ROOM_SIZES]),
+    "room.create": (case_create, [(8, 2, n) for n in POPULATIONS]),
+    "room.join": (case_join, [(8, 2, n) for n in POPULATIONS]),
+    "room.get": (case_get, [(t, p, n) for t, p in ROOM_SIZES for n in POPULATIONS[:1]] + [(64, 2, POPULATIONS[-1])]),
+    "room.save": (case_save, [(t, p, POPULATIONS[0]) for t, p in ROOM_SIZES]),
+    "game.update_position": (case_update_position, [(8, 2, POPULATIONS[0]), (64, 2, POPULATIONS[0])]),
+    "rooms.active": (case_active_rooms, [(8, 2, n) for n in POPULATIONS]),
+    "presence.disconnect": (case_disconnect, [(8, 2, n) for n in POPULATIONS]),
+}
+
+
+def case_id(name: str, trials: int, players: int, rooms: int) -> str:
+    return f"{name}[trials={trials},players={players},rooms={rooms}]"
+
+
+def run_suite(name_filter: str = "", min_time: float = 0.2, repeat: int = 5) -> Dict[str, dict]:
+    """Run every case (smallest store population first)"""
+    plan = sorted(((grid[2], name, grid) for name, (_, grids) in CASES.items() for grid in grids
+                   if name_filter in name), key=lambda item: item[0])
+    results = {}
+    for rooms, name, (trials, players, _) in plan:
+        populate(rooms)
+        factory = CASES[name][0]
+        op, setup = factory(trials, players, rooms)
+        best, median, calls = measure(op, setup, min_time, repeat)
+        key = case_id(name, trials, players, rooms)
+        results[key] = {"best_us": round(best * 1e6, 2), "median_us": round(median * 1e6, 2), "calls": calls}
+        print(f"{key:<62} {best * 1e6:>10.1f} us  (median {median * 1e6:.1f}, {calls} calls)", flush=True)
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Cases slower than ``baseline`` by more than ``threshold`` (0.25 = 25%)"""
+    regressions = []
+    for key, r in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        ratio = r["best_us"] / base["best_us"] if base["best_us"] else 1.0
+        if ratio > 1.0 + threshold:
+            regressions.append(f"{key}: {base['best_us']:.1f} -> {r['best_us']:.1f} us (+{(ratio - 1) * 100:.0f}%)")
+    return regressions
+
+
+def cleanup() -> None:
+    room_service, _, _ = _services()
+    for code in _created:
+        room_service.remove_room(code)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", choices=["memory", "redis"], default="memory")
+    parser.add_argument("--filter", default="", help="only cases whose name contains this")
+    parser.add_argument("--min-time", type=float, default=0.2, help="timed seconds per repeat")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", metavar="FILE", help="write the results as a baseline")
+    parser.add_argument("--baseline", metavar="FILE", help="compare with this baseline; exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    # Before the services (and the Redis client) are imported
+    if args.store == "memory":
+        os.environ["REDIS_URL"] = "memory://"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("RECORDING_ENABLED", "False")
+
+    try:
+        results = run_suite(args.filter, args.min_time, args.repeat)
+    finally:
+        cleanup()
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"python": platform.python_version(), "machine": platform.node(),
+                       "store": args.store, "results": results}, f, indent=2, sort_keys=True)
+        print(f"baseline written to {args.save}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("store") != args.store:
+            print(f"warning: baseline was recorded with --store {baseline.get('store')}", file=sys.stderr)
+        regressions = compare(results, baseline.get("results", {}), args.threshold)
+        missing = sorted(set(results) - set(baseline.get("results", {})))
+        if missing:
+            print(f"{len(missing)} cases not in the baseline (e.g. {missing[0]})")
+        if regressions:
+            print(f"{len(regressions)} regressions over {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"no regressions over {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""
+Build fingerprinted, precompressed static bundles.
+
+Every page's ES modules are bundled into one file (one request instead of one
+per module), then every output is named after a hash of its content and
+written next to ``.gz`` and, when the ``brotli`` package is installed,
+``.br`` variants. ``manifest.json`` maps logical names (``js/pages/gamePage.js``,
+``css/style.css``) to the built files; templates
+resolve them with ``asset_url`` and ``routes/asset_routes.py`` serves them
+with immutable cache headers. Without a manifest the templates fall back to
+the raw ``static/`` files, so development needs no build step.
+
+JS bundling uses ``esbuild`` (minified) when it is on PATH, otherwise a small
+built-in bundler that supports exactly the module syntax this tree uses:
+``import { a, b as c } from "./x.js"`` and ``export function/class/const/let``.
+
+Only what the templates load is built. The web client plays no sounds and
+shows no result GIFs, so ``assets/sounds*`` and ``assets/resultTexts`` are
+not published, and ``css/game.css`` is linked by no page.
+
+Usage:
+    python -m tools.build_assets [--out static/dist] [--no-esbuild]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List
+
+try:
+    import brotli
+except ImportError:  # optional: .br variants are skipped
+    brotli = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC = os.path.join(ROOT, "static")
+DEFAULT_OUT = os.path.join(STATIC, "dist")
+
+ENTRY_POINTS = ["js/pages/gamePage.js", "js/pages/indexPage.js", "js/pages/dashboardPage.js"]
+CLASSIC_SCRIPTS = ["js/pages/waiting.js"]            # plain scripts: fingerprint only
+STYLESHEETS = ["css/style.css"]
+
+COMPRESSIBLE = {".js", ".css", ".json"}
+
+
+# ----------------------- Bundling -----------------------
+_IMPORT_RE = re.compile(r'^\s*import\s*\{([^}]*)\}\s*from\s*["\']([^"\']+)["\']\s*;?[ \t]*$', re.M)
+_EXPORT_RE = re.compile(r'^export\s+((?:async\s+)?function\*?|class|const|let|var)\s+([A-Za-z_$][\w$]*)', re.M)
+_UNSUPPORTED_RE = re.compile(r'^\s*(?:import\s+[^{\s]|import\s*\(|export\s+default\b|export\s*[{*])', re.M)
+
+
+class BundleError(Exception):
+    pass
+
+
+def _module_var(rel: str) -> str:
+    return "__mod_" + re.sub(r"\W", "_", rel[:-3] if rel.endswith(".js") else rel)
+
+
+def _bundle_builtin(entry: str) -> str:
+    """Concatenate ``entry`` and its imports, dependencies first, each in its own scope"""
+    order: List[str] = []
+    sources: Dict[str, str] = {}
+
+    def visit(rel: str, stack: tuple) -> None:
+        if rel in sources:
+            return
+        if rel in stack:
+            raise BundleError(f"import cycle: {' -> '.join(stack + (rel,))}")
+        with open(os.path.join(STATIC, rel), encoding="utf-8") as f:
+            src = f.read()
+        bad = _UNSUPPORTED_RE.search(src)
+        if bad:
+            raise BundleError(f"{rel}: unsupported module syntax {bad.group(0).strip()!r} (install esbuild)")
+        for m in _IMPORT_RE.finditer(src):
+            visit(os.path.normpath(os.path.join(os.path.dirname(rel), m.group(2))).replace(os.sep, "/"),
+                  stack + (rel,))
+        sources[rel] = src
+        order.append(rel)
+
+    visit(entry, ())
+
+    parts = [f"// {entry} bundle (tools/build_assets.py)"]
+    for rel in order:
+        src = sources[rel]
+        base = os.path.dirname(rel)
+
+        def rewrite_import(m):
+            dep = os.path.normpath(os.path.join(base, m.group(2))).replace(os.sep, "/")
+            names = [n.strip() for n in m.group(1).split(",") if n.strip()]
+            bindings = ", ".join(n.replace(" as ", ": ") for n in names)
+            return f"const {{ {bindings} }} = {_module_var(dep)};"
+
+        src = _IMPORT_RE.sub(rewrite_import, src)
+        exports = [m.group(2) for m in _EXPORT_RE.finditer(src)]
+        src = _EXPORT_RE.sub(lambda m: f"{m.group(1)} {m.group(2)}", src)
+        if re.search(r"^\s*export\b", src, re.M):
+            raise BundleError(f"{rel}: unsupported export form (install esbuild)")
+
+        ret = f"return {{ {', '.join(exports)} }};" if exports else ""
+        parts.append(f"const {_module_var(rel)} = (() => {{\n{src.rstrip()}\n{ret}\n}})();")
+    return "\n".join(parts) + "\n"
+
+
+def _bundle_esbuild(entry: str, esbuild: str) -> str:
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "bundle.js")
+        subprocess.run([esbuild, os.path.join(STATIC, entry), "--bundle", "--format=esm",
+                        "--minify", f"--outfile={out}", "--log-level=warning"], check=True)
+        with open(out, encoding="utf-8") as f:
+            return f.read()
+
+
+# ----------------------- Output -----------------------
+class Builder:
+    def __init__(self, out_dir: str):
+        self.out_dir = out_dir
+        self.manifest: Dict[str, object] = {"files": {}}
+        self.stats = {"files": 0, "raw": 0, "gz": 0, "br": 0}
+
+    def emit(self, logical: str, data: bytes) -> str:
+        """Write ``data`` under a content-hashed name; return its path inside the output dir"""
+        stem, ext = os.path.splitext(logical)
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        rel = f"{stem}.{digest}{ext}"
+        path = os.path.join(self.out_dir, rel)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        self.stats["files"] += 1
+        self.stats["raw"] += len(data)
+
+        if ext in COMPRESSIBLE:
+            gz = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(gz) < len(data):
+                with open(path + ".gz", "wb") as f:
+                    f.write(gz)
+                self.stats["gz"] += len(gz)
+            if brotli is not None:
+                br = brotli.compress(data, quality=11)
+                if len(br) < len(data):
+                    with open(path + ".br", "wb") as f:
+                        f.write(br)
+                    self.stats["br"] += len(br)
+
+        self.manifest["files"][logical] = rel
+        return rel
+
+    def write_manifest(self) -> None:
+        with open(os.path.join(self.out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def build(out_dir: str = DEFAULT_OUT, use_esbuild: bool = True) -> dict:
+    """Build everything into ``out_dir`` (replaced); return the manifest"""
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+    os.makedirs(out_dir)
+    b = Builder(out_dir)
+
+    esbuild = shutil.which("esbuild") if use_esbuild else None
+    for entry in ENTRY_POINTS:
+        js = _bundle_esbuild(entry, esbuild) if esbuild else _bundle_builtin(entry)
+        b.emit(entry, js.encode("utf-8"))
+    for script in CLASSIC_SCRIPTS:
+        b.emit(script, _read(os.path.join(STATIC, script)))
+    for css in STYLESHEETS:
+        b.emit(css, _read(os.path.join(STATIC, css)))
+
+    b.write_manifest()
+    b.manifest["stats"] = dict(b.stats, esbuild=bool(esbuild), brotli=brotli is not None)
+    return b.manifest
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=DEFAULT_OUT, help="output directory (replaced)")
+    parser.add_argument("--no-esbuild", action="store_true", help="always use the built-in bundler")
+    args = parser.parse_args(argv)
+
+    try:
+        manifest = build(args.out, use_esbuild=not args.no_esbuild)
+    except BundleError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    s = manifest["stats"]
+    print(f"built {s['files']} files ({s['raw']} bytes; gzip {s['gz']}, brotli {s['br']}) into {args.out}")
+    for tool in ("esbuild", "brotli"):
+        if not s[tool]:
+            print(f"note: {tool} not available", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""
+Scripted dyad driver used by the benchmarks and load tests.
+
+A ``Dyad`` creates a room over HTTP, joins two players, connects their
+Socket.IO clients plus the moderator's, readies everyone, starts the game and
+then plays moves that stay on the board and avoid the target, so a trial never
+ends on its own. Each ``move()`` returns the move-to-broadcast latency seen
+by the mover's socket. The clock stops at the first broadcast past the board
+position the move was played from (block, trial, turns taken), not at any
+``room_state``. A move the server acks as rejected fails at once. With
+``wire="bin"`` the sockets negotiate binary ``board_state`` frames;
+``bytes_received`` counts the board payload bytes.
+
+Requires the client extras from ``requirements-dev.txt``.
+"""
+import json
+import threading
+import time
+import urllib.request
+from typing import Optional
+
+import socketio
+
+from networking import wire
+
+
+def http_json(base_url: str, path: str, payload: Optional[dict] = None, timeout: float = 10.0) -> dict:
+    """POST (or GET when payload is None) and decode a JSON response"""
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(
+        base_url.rstrip("/") + path,
+        data=data,
+        headers={"Content-Type": "application/json"},
+        method="POST" if data is not None else "GET",
+    )
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return json.loads(resp.read() or b"{}")
+
+
+class _Player:
+    def __init__(self, dyad: "Dyad", player_id: str):
+        self.dyad = dyad
+        self.player_id = player_id
+        self.role: Optional[str] = None
+        self.seen = (-1, -1, -1)               # newest (block, trial, turns_taken) broadcast
+        self.rejected: Optional[str] = None    # move_id of the last move acked as rejected
+        self._cond = threading.Condition()
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on("room_state", self._on_room_state)
+        self.sio.on(wire.BOARD_STATE, self._on_board_state)
+        self.sio.on("game_start", lambda *_: dyad.started.set())
+        self.sio.on("error", self._on_error)
+
+    def _on_room_state(self, data):
+        self.dyad.apply_room_state(data)
+        trials, idx = data.get("trials") or [], data.get("current_trial_index")
+        if isinstance(idx, int) and 0 <= idx < len(trials):
+            block = (data.get("block") or {}).get("block_index", 0)
+            self._saw((block, idx, int(trials[idx].get("turns_taken", 0))))
+
+    def _on_board_state(self, data):
+        if isinstance(data, (bytes, bytearray)):
+            self.dyad.bytes_received += len(data)
+            data = wire.decode_board_state(data)
+        else:
+            self.dyad.bytes_received += len(json.dumps(data, separators=(",", ":")))
+        self.dyad.apply_board_state(data)
+        self._saw((data["block_index"], data["trial_index"], data.get("turns_taken", 0)))
+
+    def _saw(self, position) -> None:
+        with self._cond:
+            if position > self.seen:
+                self.seen = position
+                self._cond.notify_all()
+
+    def on_ack(self, ack) -> None:
+        if ack and not ack.get("accepted"):
+            with self._cond:
+                self.rejected = ack.get("move_id")
+                self._cond.notify_all()
+
+    def wait_past(self, position, move_id: str, timeout: float) -> bool:
+        """Wait for a broadcast newer than ``position``; False on timeout or rejection"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.seen > position or self.rejected == move_id, timeout)
+            return self.seen > position
+
+    def _on_error(self, data):
+        self.dyad.errors += 1
+
+    def connect(self):
+        url = f"{self.dyad.base_url}?room={self.dyad.room_code}"
+        self.sio.connect(url, transports=self.dyad.transports, wait_timeout=self.dyad.timeout)
+        # call, not emit: the socket must be in the room before the game starts
+        self.sio.call("join_game", {
+            "room_code": self.dyad.room_code,
+            "player_id": self.player_id,
+            "wire": self.dyad.wire,
+        }, timeout=self.dyad.timeout)
+
+
+class Dyad:
+    """Two players and a moderator sharing one room"""
+
+    def __init__(self, base_url: str, transports=("websocket",), timeout: float = 10.0, wire: str = "json"):
+        self.base_url = base_url.rstrip("/")
+        self.wire = wire
+        self.transports = list(transports)
+        self.timeout = timeout
+        self.room_code: Optional[str] = None
+        self.players = {}                    # role -> _Player
+        self.moderator: Optional[_Player] = None
+        self.turn = "R"
+        self.trial: dict = {}
+        self.started = threading.Event()
+        self.errors = 0
+        self.bytes_received = 0
+        self.moves_sent = 0
+        self._lock = threading.Lock()
+
+    # ---- setup ----
+    def setup(self) -> None:
+        """Create the room, join and ready both players, start the game"""
+        created = http_json(self.base_url, "/api/create-room", {"username": "bench-mod"})
+        self.room_code = created["room_code"]
+        self.moderator = _Player(self, created["player_id"])
+
+        joined = []
+        for name in ("bench-red", "bench-blue"):
+            res = http_json(self.base_url, "/api/join-room", {"room_code": self.room_code, "username": name})
+            if not res.get("success"):
+                raise RuntimeError(f"join-room failed: {res}")
+            joined.append(_Player(self, res["player_id"]))
+        joined[0].role, joined[1].role = "R", "B"
+        self.players = {p.role: p for p in joined}
+
+        for p in [self.moderator, *joined]:
+            p.connect()
+        for p in joined:
+            p.sio.call("player_ready", {"room_code": self.room_code, "player_id": p.player_id},
+                       timeout=self.timeout)
+        self.moderator.sio.emit("start_game", {"room_code": self.room_code, "player_id": self.moderator.player_id})
+        if not self.started.wait(self.timeout):
+            raise RuntimeError(f"game did not start in room {self.room_code}")
+
+    def apply_room_state(self, data: dict) -> None:
+        trials = data.get("trials") or []
+        idx = data.get("current_trial_index")
+        if isinstance(idx, int) and 0 <= idx < len(trials):
+            with self._lock:
+                self.trial = trials[idx]
+                self.turn = self.trial.get("turn", self.turn)
+
+    def apply_board_state(self, data: dict) -> None:
+        with self._lock:
+            self.trial = dict(self.trial, start_positions=data["positions"], turn=data["turn"])
+            self.turn = data["turn"]
+
+    def _pick_step(self, role: str):
+        """First unit step that stays on the board, off the target and the other player"""
+        trial = self.trial
+        size = trial.get("board_size", 4)
+        positions = trial.get("start_positions", {})
+        x, y = positions.get(role, (0, 0))
+        other = positions.get("B" if role == "R" else "R")
+        target = trial.get("target")
+        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+            nxt = [x + dx, y + dy]
+            if 0 <= nxt[0] < size and 0 <= nxt[1] < size and nxt != other and nxt != target:
+                return dx, dy
+        return 0, 0
+
+    # ---- play ----
+    def move(self) -> Optional[float]:
+        """Play one move for whoever has the turn
+
+        Returns:
+            float: seconds from emit to the mover receiving the broadcast of
+            this move, or None if it was rejected or none arrived within the
+            timeout
+        """
+        with self._lock:
+            player = self.players[self.turn]
+            dx, dy = self._pick_step(player.role)
+            self.moves_sent += 1
+            move_id = f"{self.room_code}-{self.moves_sent}"
+        # the newest position any socket of the dyad has seen: the mover's own
+        # socket may still be waiting for the previous broadcast
+        position = max(p.seen for p in self.players.values())
+        t0 = time.perf_counter()
+        player.sio.emit("board_update", {
+            "room_code": self.room_code,
+            "player_id": player.player_id,
+            "move": {"dx": dx, "dy": dy},
+            "move_id": move_id,
+        }, callback=player.on_ack)
+        if not player.wait_past(position, move_id, self.timeout):
+            self.errors += 1
+            return None
+        return time.perf_counter() - t0
+
+    def close(self) -> None:
+        for p in [self.moderator, *self.players.values()]:
+            if p is not None:
+                try:
+                    p.sio.disconnect()
+                except Exception:
+                    pass
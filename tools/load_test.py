@@ -0,0 +1,343 @@
+"""
+Load test one local worker with N concurrent dyads.
+
+Each dyad (``tools.dyad_client.Dyad``) creates a room through
+``/api/create-room``, joins two players through ``/api/join-room``,
+connects three Socket.IO clients, readies the players and starts the game.
+It then plays a move every ``--pace`` seconds through ``board_update`` until
+the test ends. Dyads are launched following the ramp profile. Every
+``--interval`` seconds a line reports the following:
+
+    t  dyads  moves/s  p50/p95/p99 move-to-broadcast ms  errors  server CPU %  RSS MB
+
+A summary for the whole run follows at the end. Errors are failed setups
+plus moves that were rejected or whose broadcast never came back (or
+``error`` events). A dyad still setting up when it is stopped (ramp-down or
+end of run) counts as an aborted setup, which is a failure too: every
+launched dyad ends up either played or in ``setup_errors``/``setup_aborted``.
+
+The server is started here (``app.py`` in ``--mode``) against the Redis at
+REDIS_URL (``--store redis``), or against an in-process store
+(``--store memory``, REDIS_URL=memory://, needs fakeredis). With ``--url``
+an already running server is used instead; pass ``--server-pid`` to sample
+its CPU and memory.
+
+Ramp profiles are ``SECONDS:DYADS`` points joined by commas. The number of
+active dyads moves linearly between points and holds after the last one;
+when it goes down, the most recent dyads stop::
+
+    --ramp 0:10                  10 dyads at once
+    --ramp 0:0,60:200            add dyads steadily up to 200 over a minute
+    --ramp 0:20,30:20,30:60      20 dyads, then a step to 60 at 30 s
+    --ramp 0:0,30:100,60:0       up to 100 and back down
+
+Usage:
+    python -m tools.load_test --dyads 50 --duration 60
+    python -m tools.load_test --ramp 0:0,120:300 --duration 180 --mode eventlet --store memory
+    python -m tools.load_test --url http://127.0.0.1:8000 --server-pid 1234 --ramp 0:0,60:100
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from tools.bench_async_modes import percentile, start_server
+from tools.dyad_client import Dyad
+
+
+def parse_ramp(spec: str) -> List[Tuple[float, int]]:
+    """``"0:0,60:200"`` -> ``[(0.0, 0), (60.0, 200)]``"""
+    points = []
+    for part in spec.split(","):
+        t, _, n = part.strip().partition(":")
+        points.append((float(t), int(n)))
+    if not points or any(b[0] < a[0] for a, b in zip(points, points[1:])):
+        raise ValueError(f"ramp points must be SECONDS:DYADS in time order, got {spec!r}")
+    return points
+
+
+def ramp_target(points: List[Tuple[float, int]], t: float) -> int:
+    """Dyads that should be active ``t`` seconds into the run"""
+    if t < points[0][0]:
+        return 0
+    for (t0, n0), (t1, n1) in zip(points, points[1:]):
+        if t0 <= t < t1:
+            return int(n0 + (n1 - n0) * (t - t0) / (t1 - t0))
+    return points[-1][1]
+
+
+class ProcSampler:
+    """CPU (% of one core) and RSS of a process, from /proc (Linux)"""
+
+    def __init__(self, pid: Optional[int]):
+        self.pid = pid
+        self._tick = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+        self._last = self._cpu_seconds()
+
+    def _cpu_seconds(self) -> Optional[Tuple[float, float]]:
+        if not self.pid:
+            return None
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                fields = f.read().rpartition(")")[2].split()
+            # fields[11], fields[12] are utime and stime (fields 14 and 15 of stat)
+            return time.monotonic(), (int(fields[11]) + int(fields[12])) / self._tick
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def rss_mb(self) -> Optional[float]:
+        if not self.pid:
+            return None
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1]) / 1024.0
+        except OSError:
+            pass
+        return None
+
+    def cpu_percent(self) -> Optional[float]:
+        """CPU use since the previous call"""
+        now = self._cpu_seconds()
+        last, self._last = self._last, now
+        if now is None or last is None or now[0] <= last[0]:
+            return None
+        return 100.0 * (now[1] - last[1]) / (now[0] - last[0])
+
+
+class Stats:
+    """Latencies and errors, per report window and for the whole run"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.window: List[float] = []
+        self.window_errors = 0
+        self.latencies: List[float] = []
+        self.setup_errors = 0
+        self.setup_aborted = 0
+        self.setting_up = 0
+        self.last_setup_error: Optional[str] = None
+        self.move_errors = 0
+        self.active = 0
+
+    def move(self, latency: Optional[float]) -> None:
+        with self._lock:
+            if latency is None:
+                self.window_errors += 1
+                self.move_errors += 1
+            else:
+                self.window.append(latency)
+                self.latencies.append(latency)
+
+    def setup_begun(self) -> None:
+        with self._lock:
+            self.setting_up += 1
+
+    def setup_failed(self, error: Exception) -> None:
+        with self._lock:
+            self.setting_up -= 1
+            self.setup_errors += 1
+            self.last_setup_error = repr(error)
+            self.window_errors += 1
+
+    def setup_cut_short(self) -> None:
+        """A dyad was stopped before its setup finished"""
+        with self._lock:
+            self.setting_up -= 1
+            self.setup_aborted += 1
+            self.window_errors += 1
+
+    def dyad_started(self) -> None:
+        with self._lock:
+            self.setting_up -= 1
+            self.active += 1
+
+    def setups(self) -> Tuple[int, int]:
+        """(failed, aborted) so far; dyads still setting up count as aborted"""
+        with self._lock:
+            return self.setup_errors, self.setup_aborted + self.setting_up
+
+    def dyad_stopped(self) -> None:
+        with self._lock:
+            self.active -= 1
+
+    def take_window(self) -> Tuple[List[float], int]:
+        with self._lock:
+            window, errors = self.window, self.window_errors
+            self.window, self.window_errors = [], 0
+        return window, errors
+
+
+def _ms(v: Optional[float]) -> Optional[float]:
+    return None if v is None else round(v * 1000.0, 2)
+
+
+def _peak(timeline: List[dict], key: str) -> Optional[float]:
+    values = [r[key] for r in timeline if r[key] is not None]
+    return round(max(values), 1) if values else None
+
+
+def run_dyad(base_url: str, pace: float, stats: Stats, stop: threading.Event, dyads: List[Dyad]) -> None:
+    d = Dyad(base_url)
+    dyads.append(d)
+    try:
+        d.setup()
+    except Exception as e:
+        if stop.is_set():
+            stats.setup_cut_short()
+        else:
+            stats.setup_failed(e)
+        d.close()
+        return
+    if stop.is_set():              # ready only after the ramp or the run let it go
+        stats.setup_cut_short()
+        d.close()
+        return
+    stats.dyad_started()
+    try:
+        while not stop.is_set():
+            stats.move(d.move())
+            stop.wait(pace)
+    except Exception:
+        stats.move(None)
+    finally:
+        stats.dyad_stopped()
+        d.close()
+
+
+def _row(cols, values) -> str:
+    cells = []
+    for c, v in zip(cols, values):
+        cells.append(f"{v:>9.1f}" if isinstance(v, float) else f"{'-' if v is None else v:>9}")
+    return " ".join(cells)
+
+
+def run(base_url: str, ramp: List[Tuple[float, int]], duration: float, pace: float,
+        interval: float, sampler: ProcSampler) -> dict:
+    """Drive dyads along ``ramp`` for ``duration`` seconds; print one line per interval"""
+    stats = Stats()
+    dyads: List[Dyad] = []
+    threads: List[threading.Thread] = []
+    running: List[threading.Event] = []     # stop flags of dyads still wanted, oldest first
+    timeline = []
+    cols = ["t", "dyads", "moves/s", "p50_ms", "p95_ms", "p99_ms", "errors", "cpu_%", "rss_mb"]
+    print(" ".join(f"{c:>9}" for c in cols))
+
+    t_start = time.monotonic()
+    next_report = t_start + interval
+    sampler.cpu_percent()
+    while True:
+        now = time.monotonic()
+        elapsed = now - t_start
+        if elapsed >= duration:
+            break
+        target = ramp_target(ramp, elapsed)
+        while len(running) < target:
+            flag = threading.Event()
+            stats.setup_begun()
+            th = threading.Thread(target=run_dyad, args=(base_url, pace, stats, flag, dyads), daemon=True)
+            th.start()
+            threads.append(th)
+            running.append(flag)
+        while len(running) > target:
+            running.pop().set()
+        if now >= next_report:
+            window, errors = stats.take_window()
+            row = {
+                "t": round(elapsed, 1),
+                "dyads": stats.active,
+                "moves_per_s": len(window) / interval,
+                "p50_ms": _ms(percentile(window, 50)),
+                "p95_ms": _ms(percentile(window, 95)),
+                "p99_ms": _ms(percentile(window, 99)),
+                "errors": errors,
+                "cpu_percent": sampler.cpu_percent(),
+                "rss_mb": sampler.rss_mb(),
+            }
+            timeline.append(row)
+            print(_row(cols, list(row.values())), flush=True)
+            next_report += interval
+        time.sleep(0.05)
+
+    play_s = time.monotonic() - t_start
+    for flag in running:
+        flag.set()
+    for th in threads:
+        th.join(timeout=15)
+    moves = len(stats.latencies)
+    setup_errors, setup_aborted = stats.setups()
+    setup_failures = setup_errors + setup_aborted
+    return {
+        "dyads_launched": len(threads),
+        "peak_dyads": max((r["dyads"] for r in timeline), default=stats.active),
+        "duration_s": round(play_s, 1),
+        "moves": moves,
+        "moves_per_s": round(moves / play_s, 1) if play_s else 0.0,
+        "p50_ms": _ms(percentile(stats.latencies, 50)),
+        "p95_ms": _ms(percentile(stats.latencies, 95)),
+        "p99_ms": _ms(percentile(stats.latencies, 99)),
+        "setup_errors": setup_errors,
+        "setup_aborted": setup_aborted,
+        "last_setup_error": stats.last_setup_error,
+        "move_errors": stats.move_errors,
+        "server_errors": max(0, sum(d.errors for d in dyads) - stats.move_errors),
+        "error_rate": round((stats.move_errors + setup_failures) / max(1, moves + stats.move_errors + setup_failures), 4),
+        "peak_cpu_percent": _peak(timeline, "cpu_percent"),
+        "peak_rss_mb": _peak(timeline, "rss_mb"),
+        "timeline": timeline,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dyads", type=int, default=20, help="dyads launched at once (ignored with --ramp)")
+    parser.add_argument("--ramp", help="SECONDS:DYADS,... active-dyad profile")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of load, ramp included")
+    parser.add_argument("--pace", type=float, default=0.25, help="seconds between moves of one dyad")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds per report line")
+    parser.add_argument("--mode", default="eventlet", help="server ASYNC_MODE when started here")
+    parser.add_argument("--store", choices=["redis", "memory"], default="redis",
+                        help="REDIS_URL as set, or the in-process memory:// store")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", help="use this running server instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="pid of the --url server, for CPU/RSS")
+    parser.add_argument("--json", help="also write the summary and timeline to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        ramp = parse_ramp(args.ramp) if args.ramp else [(0.0, args.dyads)]
+    except ValueError as e:
+        parser.error(str(e))
+
+    proc = None
+    if args.url:
+        base_url, pid = args.url.rstrip("/"), args.server_pid
+    else:
+        extra_env = {"REDIS_URL": "memory://", "SOCKETIO_MESSAGE_QUEUE": ""} if args.store == "memory" else {}
+        print(f"starting server: mode={args.mode} store={args.store} port={args.port}", file=sys.stderr)
+        proc = start_server(args.mode, args.port, extra_env=extra_env)
+        base_url, pid = f"http://127.0.0.1:{args.port}", proc.pid
+
+    try:
+        result = run(base_url, ramp, args.duration, args.pace, args.interval, ProcSampler(pid))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    print()
+    for key, value in result.items():
+        if key != "timeline":
+            print(f"{key:>18}: {value}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(dict(result, mode=args.mode, store=args.store, ramp=ramp, pace=args.pace), f, indent=2)
+    return 0 if result["moves"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,21 @@
+"""
+Write the /api/rooms listing records for rooms stored before the index existed.
+
+Scans ``room:*`` with SCAN (not KEYS), so it can run against a live Redis.
+
+Usage:
+    python -m tools.rebuild_room_index
+"""
+import sys
+
+from services import room_service
+
+
+def main() -> int:
+    n = room_service.rebuild_room_index()
+    print(f"indexed {n} rooms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+Pack recordings into the columnar ``.hhc`` format and export them as text.
+
+Usage:
+    python -m tools.recordings pack RECORDINGS_DIR_OR_JSONL... -o moves.hhc
+    python -m tools.recordings export moves.hhc --format csv|ndjson [--room CODE] [-o out]
+    python -m tools.recordings info moves.hhc
+
+``pack`` accepts ``events.jsonl`` files, room directories or the whole
+recordings directory. Exports stream trial by trial, so memory stays flat
+whatever the size of the recording.
+"""
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+from conf import conf_data
+from services import recording_format
+
+
+def _jsonl_files(paths: List[str]) -> List[str]:
+    found = []
+    for path in paths:
+        if os.path.isfile(path):
+            found.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            if conf_data.append_saver_eventFilename in files:
+                found.append(os.path.join(root, conf_data.append_saver_eventFilename))
+    return found
+
+
+def _pack(args) -> int:
+    files = _jsonl_files(args.paths)
+    if not files:
+        print("error: no recordings found", file=sys.stderr)
+        return 1
+    t0 = time.perf_counter()
+    moves = recording_format.pack_jsonl(files, args.out)
+    print(f"packed {moves} moves from {len(files)} recordings into {args.out} "
+          f"({os.path.getsize(args.out)} bytes, {time.perf_counter() - t0:.2f}s)")
+    return 0
+
+
+def _export(args) -> int:
+    export = recording_format.export_csv if args.format == "csv" else recording_format.export_ndjson
+    room = args.room.upper() if args.room else None
+    with recording_format.ColumnarReader(args.path) as reader:
+        if args.out == "-":
+            export(reader, sys.stdout, room=room)
+        else:
+            with open(args.out, "w", encoding="utf-8", newline="") as out:
+                n = export(reader, out, room=room)
+            print(f"wrote {n} lines to {args.out}", file=sys.stderr)
+    return 0
+
+
+def _info(args) -> int:
+    t0 = time.perf_counter()
+    with recording_format.ColumnarReader(args.path) as reader:
+        ts = reader.column("ts")
+        opened_ms = (time.perf_counter() - t0) * 1000.0
+        segments = reader.segments()
+        print(f"{args.path}: {reader.rows} moves, {len(segments)} trials, {len(reader.rooms)} rooms "
+              f"(opened and mapped ts in {opened_ms:.1f} ms)")
+        if reader.rows:
+            print(f"time span: {min(ts):.3f} .. {max(ts):.3f}")
+        ts.release()
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("pack", help="pack events.jsonl recordings into a .hhc file")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("-o", "--out", required=True)
+    p.set_defaults(run=_pack)
+
+    p = sub.add_parser("export", help="stream a .hhc file out as CSV or NDJSON")
+    p.add_argument("path")
+    p.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    p.add_argument("--room", help="only this room")
+    p.add_argument("-o", "--out", default="-")
+    p.set_defaults(run=_export)
+
+    p = sub.add_parser("info", help="summarize a .hhc file")
+    p.add_argument("path")
+    p.set_defaults(run=_info)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.run(args)
+    except (recording_format.FormatError, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
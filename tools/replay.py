@@ -0,0 +1,97 @@
+"""
+Replay recorded sessions: inspect the board at any turn or re-score sessions.
+
+Usage:
+    python -m tools.replay state RECORDING --room CODE --turn N
+    python -m tools.replay rescore RECORDINGS... [--workers N] [--json]
+
+RECORDING is an ``events.jsonl`` or ``.hhc`` file; ``rescore`` also accepts
+directories (every recording below them, the ``.hhc`` when a room has both).
+Scores are recomputed with the rules in the current tree.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from typing import List
+
+from conf import conf_data
+from services import recording_format, replay_service
+
+
+def _recordings(paths: List[str]) -> List[str]:
+    found = []
+    for path in paths:
+        if os.path.isfile(path):
+            found.append(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            packed = sorted(f for f in files if f.endswith(".hhc"))
+            if packed:
+                found.extend(os.path.join(root, f) for f in packed)
+            elif conf_data.append_saver_eventFilename in files:
+                found.append(os.path.join(root, conf_data.append_saver_eventFilename))
+    return found
+
+
+def _state(args) -> int:
+    sessions = {s.room_code: s for s in replay_service.load_sessions(args.path)}
+    room = args.room.upper() if args.room else (next(iter(sessions)) if len(sessions) == 1 else None)
+    if room not in sessions:
+        print(f"error: pick a room with --room ({', '.join(sorted(sessions))})", file=sys.stderr)
+        return 1
+    replay = replay_service.Replay(sessions[room])
+    print(json.dumps(replay.state_at(args.turn), indent=2))
+    return 0
+
+
+def _rescore(args) -> int:
+    files = _recordings(args.paths)
+    if not files:
+        print("error: no recordings found", file=sys.stderr)
+        return 1
+    results = replay_service.rescore_all(files, workers=args.workers)
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return 0
+    for r in results:
+        if "error" in r:
+            print(f"{r['room_code'] or r['source']}: skipped ({r['error']})")
+            continue
+        flag = "" if r["scores"] == r["recorded_scores"] else "  <- differs"
+        print(f"{r['room_code']}: {r['moves']} moves, {r['trials']} trials, scores {r['scores']} "
+              f"(recorded {r['recorded_scores']}), {len(r['changed_trials'])} trials changed, "
+              f"{r['divergent_moves']} divergent moves{flag}")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("state", help="board after N moves of a session")
+    p.add_argument("path")
+    p.add_argument("--room")
+    p.add_argument("--turn", type=int, default=0)
+    p.set_defaults(run=_state)
+
+    p = sub.add_parser("rescore", help="replay and re-score sessions in parallel")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(run=_rescore)
+
+    args = parser.parse_args(argv)
+    logging.getLogger("models.game_room").setLevel(logging.WARNING)
+    try:
+        return args.run(args)
+    except (replay_service.ReplayError, recording_format.FormatError, OSError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
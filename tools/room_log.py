@@ -0,0 +1,79 @@
+"""
+Inspect room mutation logs, rebuild rooms from them and drain them to disk.
+
+Usage:
+    python -m tools.room_log show CODE [--count N]
+    python -m tools.room_log derive CODE [--restore]
+    python -m tools.room_log archive [--follow]
+
+``derive`` prints the room rebuilt from its log and whether it matches the
+stored state; ``--restore`` writes it back (logged as a ``restore``
+snapshot). ``archive`` runs the archiver outside the app, e.g. with
+ROOM_LOG_ARCHIVER=false on the web workers.
+"""
+import argparse
+import json
+import sys
+import time
+
+import config
+from services import room_log, room_service
+
+
+def _show(args) -> int:
+    for e in room_log.entries(args.code, count=args.count):
+        state = " +snapshot" if "state" in e else ""
+        print(f"{e['id']}  v{e['v']:<5} {e['op']:<8} {json.dumps(e['data'])}{state}")
+    return 0
+
+
+def _derive(args) -> int:
+    room, version = room_log.derive(args.code)
+    if room is None:
+        print("error: no log to rebuild from (empty, removed or trimmed past its last snapshot)", file=sys.stderr)
+        return 1
+    stored, stored_version = room_service.get_room_versioned(args.code)
+    same = stored is not None and stored.to_meta() == room.to_meta()
+    print(json.dumps(room.to_meta(), indent=2))
+    print(f"log version {version}, stored version {stored_version}, "
+          f"{'matches' if same else 'differs from'} stored state", file=sys.stderr)
+    if args.restore and not same:
+        room_service.save_room(room, "restore", from_version=version)
+        print("restored", file=sys.stderr)
+    return 0
+
+
+def _archive(args) -> int:
+    consumer, known = room_log.consumer_name(), set()
+    while True:
+        n = room_log.archive_pass(consumer, known, claim=True)
+        print(f"archived {n} entries")
+        if not args.follow:
+            return 0
+        time.sleep(config.ROOM_LOG_ARCHIVE_INTERVAL)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("show", help="print a room's log")
+    p.add_argument("code", type=str.upper)
+    p.add_argument("--count", type=int, default=None, help="only the last N entries")
+    p.set_defaults(run=_show)
+
+    p = sub.add_parser("derive", help="rebuild a room from its log")
+    p.add_argument("code", type=str.upper)
+    p.add_argument("--restore", action="store_true", help="write the rebuilt room back if it differs")
+    p.set_defaults(run=_derive)
+
+    p = sub.add_parser("archive", help="drain room logs to disk")
+    p.add_argument("--follow", action="store_true", help="keep running")
+    p.set_defaults(run=_archive)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Run N game workers locally, one process per port, sharing a Socket.IO message queue.
+
+Every worker is a single-process gunicorn (eventlet) server, exactly like the
+production service, listening on consecutive ports. Emits travel through the
+Redis message queue so a broadcast from any worker reaches every socket. Put
+the room-affinity proxy from ``deploy/nginx/flaskgame.conf`` in front so all
+sockets of a room land on the same worker (use ``--print-upstream`` to get the
+matching ``upstream`` block).
+
+Usage:
+    python -m tools.run_workers -n 4
+    python -m tools.run_workers -n 4 --base-port 8000 --print-upstream
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+DEFAULT_QUEUE = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+
+
+def upstream_block(n: int, base_port: int, host: str = "127.0.0.1") -> str:
+    """Return an nginx upstream block for ``n`` workers"""
+    servers = "\n".join(f"    server {host}:{base_port + i};" for i in range(n))
+    return (
+        "upstream flaskgame_workers {\n"
+        "    hash $flaskgame_affinity consistent;\n"
+        f"{servers}\n"
+        "}\n"
+    )
+
+
+def worker_command(port: int, host: str, worker_class: str) -> list:
+    return [
+        sys.executable, "-m", "gunicorn",
+        "-k", worker_class,
+        "-w", "1",
+        "-b", f"{host}:{port}",
+        "app:app",
+    ]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--base-port", type=int, default=8000)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--worker-class", default="eventlet")
+    parser.add_argument("--message-queue", default=os.environ.get("SOCKETIO_MESSAGE_QUEUE") or DEFAULT_QUEUE)
+    parser.add_argument("--print-upstream", action="store_true", help="print the nginx upstream block and exit")
+    args = parser.parse_args(argv)
+
+    if args.print_upstream:
+        print(upstream_block(args.workers, args.base_port, args.host), end="")
+        return 0
+
+    env = dict(os.environ, SOCKETIO_MESSAGE_QUEUE=args.message_queue)
+    procs = []
+    for i in range(args.workers):
+        port = args.base_port + i
+        cmd = worker_command(port, args.host, args.worker_class)
+        procs.append(subprocess.Popen(cmd, env=env))
+        print(f"worker {i}: pid {procs[-1].pid} on {args.host}:{port}")
+
+    def stop(*_):
+        for p in procs:
+            if p.poll() is None:
+                p.terminate()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        while any(p.poll() is None for p in procs):
+            time.sleep(0.5)
+    finally:
+        stop()
+    return max((p.returncode or 0) for p in procs)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Play headless sessions in-process and report outcomes and per-phase timing.
+
+Each session runs create room, join x2, ready x2, start, then every trial of
+the sequence (every block) until game over, with the players driven by
+policies (``services.simulation_service``). No server or socket is needed.
+
+    --backend model     GameRoom + sequence_service only (rules and
+                        sequencing; thousands of sessions/s)
+    --backend service   room_service / game_service, the code the handlers
+                        run, over the in-process memory:// store (or the
+                        Redis at REDIS_URL with ``--store redis``)
+
+Policies: random, greedy (the capturer walks to the target), helper (greedy,
+the other player keeps clear of the target), hinderer (greedy, the other
+player crowds the target), or ``module:Class`` for your own.
+
+Usage:
+    python -m tools.simulate --sessions 5000
+    python -m tools.simulate --sessions 500 --backend service --red greedy --blue hinderer
+    python -m tools.simulate --sessions 20000 --workers 8 --json sim.json
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+
+
+def _print(result: dict) -> None:
+    for key, value in result.items():
+        if key != "phases":
+            print(f"{key:>16}: {value}")
+    print()
+    print(f"{'phase':<14} {'calls':>10} {'total_s':>10} {'mean_us':>10} {'share':>7}")
+    for phase, p in result["phases"].items():
+        print(f"{phase:<14} {p['calls']:>10} {p['total_s']:>10.3f} {p['mean_us']:>10.1f} {p['share']:>6.1%}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--backend", choices=["model", "service"], default="model")
+    parser.add_argument("--store", choices=["memory", "redis"], default="memory",
+                        help="store of the service backend")
+    parser.add_argument("--red", default="greedy", help="policy of player R")
+    parser.add_argument("--blue", default="random", help="policy of player B")
+    parser.add_argument("--workers", type=int, help="processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-moves", type=int, default=200, help="moves before a trial times out")
+    parser.add_argument("--move-seconds", type=float, default=1.0,
+                        help="simulated seconds per move, against time_limit_sec")
+    parser.add_argument("--json", help="also write the result to this file")
+    args = parser.parse_args(argv)
+
+    # Before the services (and the Redis client) are imported; workers inherit it
+    if args.store == "memory":
+        os.environ["REDIS_URL"] = "memory://"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("RECORDING_ENABLED", "False")
+    from services import simulation_service
+    logging.getLogger("models.game_room").setLevel(logging.WARNING)
+
+    try:
+        result = simulation_service.simulate(
+            args.sessions, {"R": args.red, "B": args.blue}, backend=args.backend, workers=args.workers,
+            seed=args.seed, max_moves=args.max_moves, move_seconds=args.move_seconds)
+    except simulation_service.SimulationError as e:
+        parser.error(str(e))
+
+    _print(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    return 1 if result["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+"""
+Worker startup report and import-time budget.
+
+Every measurement runs in a fresh interpreter, so it reflects a cold worker
+after a deploy restart:
+
+    build_ms             ``import app; app.app``: every import plus create_app
+    ready_ms             ``python app.py`` spawned -> first HTTP answer
+    first_page_ms        first ``GET /`` (template compile included)
+    first_room_ms        first ``POST /api/create-room`` (trial bank, store)
+    first_party_ms       import time spent in this repo's own modules (self time)
+    module_ms            the slowest single module of this repo (self time)
+
+Per-module costs come from ``python -X importtime``. The report lists the
+heaviest imports overall (cumulative) and this repo's own modules (self time).
+
+With ``--budget FILE`` the run fails (exit 1) when a figure exceeds its limit
+in the file (same keys as above, milliseconds). CI runs it on every push.
+``--save FILE`` writes the measured figures, with ``--headroom`` added, as a
+new budget.
+
+The server runs on the in-process store (REDIS_URL=memory://, needs
+fakeredis) unless ``--store redis``.
+
+Usage:
+    python -m tools.startup_budget
+    python -m tools.startup_budget --budget startup_budget.json
+    python -m tools.startup_budget --save startup_budget.json --headroom 1.5
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIRST_PARTY = ("app", "config", "log_pipeline", "services", "networking", "routes", "models", "conf", "assets")
+KEYS = ("build_ms", "ready_ms", "first_page_ms", "first_room_ms", "first_party_ms", "module_ms")
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+_BUILD = """
+import time
+t0 = time.perf_counter()
+import app
+app.app
+print(round((time.perf_counter() - t0) * 1000.0, 1))
+"""
+
+
+def _env(store: str, mode: str) -> Dict[str, str]:
+    env = dict(os.environ, ASYNC_MODE=mode, SOCKETIO_MESSAGE_QUEUE="", LOG_LEVEL="WARNING")
+    if store == "memory":
+        env["REDIS_URL"] = "memory://"
+    env.setdefault("RECORDINGS_DIR", os.path.join(tempfile.gettempdir(), "startup_budget_recordings"))
+    return env
+
+
+def parse_importtime(text: str) -> List[Tuple[str, int, int, int]]:
+    """``-X importtime`` output -> [(module, self_us, cumulative_us, depth)]"""
+    rows = []
+    for line in text.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2))
+    return rows
+
+
+def is_first_party(module: str) -> bool:
+    """This repo's modules, except ``app`` itself: its own time is the
+    eventlet/gevent monkey patching, which no budget can trim"""
+    return module != "app" and module.split(".", 1)[0] in FIRST_PARTY
+
+
+def measure_imports(env: Dict[str, str]) -> List[Tuple[str, int, int, int]]:
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", _BUILD], cwd=ROOT, env=env,
+                          capture_output=True, text=True, timeout=120)
+    if proc.returncode:
+        raise RuntimeError(f"building the app failed:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def measure_build(env: Dict[str, str], repeat: int) -> float:
+    """Best of ``repeat`` cold builds (ms)"""
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-c", _BUILD], cwd=ROOT, env=env,
+                              capture_output=True, text=True, timeout=120)
+        if proc.returncode:
+            raise RuntimeError(f"building the app failed:\n{proc.stderr[-2000:]}")
+        ms = float(proc.stdout.strip().splitlines()[-1])
+        best = ms if best is None else min(best, ms)
+    return best
+
+
+def _timed_request(url: str, payload: Optional[dict] = None) -> float:
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"} if data else {})
+    t0 = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        resp.read()
+    return (time.perf_counter() - t0) * 1000.0
+
+
+def measure_server(env: Dict[str, str], port: int, timeout: float = 30.0) -> Dict[str, float]:
+    """Spawn ``app.py``; time until it answers, then its first page and room"""
+    base = f"http://127.0.0.1:{port}"
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "app.py"], cwd=ROOT, env=dict(env, PORT=str(port)),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited early (code {proc.returncode})")
+            try:
+                _timed_request(f"{base}/api/rooms")
+                break
+            except OSError:
+                if time.perf_counter() - t0 > timeout:
+                    raise RuntimeError("server did not come up")
+                time.sleep(0.01)
+        ready = (time.perf_counter() - t0) * 1000.0
+        return {"ready_ms": ready, "first_page_ms": _timed_request(f"{base}/"),
+                "first_room_ms": _timed_request(f"{base}/api/create-room", {"username": "budget"})}
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+
+
+def report(rows: List[Tuple[str, int, int, int]], top: int) -> None:
+    print("heaviest top-level imports (cumulative)")
+    roots = sorted((r for r in rows if r[3] == 0), key=lambda r: -r[2])
+    for module, self_us, cum_us, _ in roots[:top]:
+        print(f"  {cum_us / 1000.0:>8.1f} ms  {module}")
+    print("this repo's modules (self time)")
+    own = sorted((r for r in rows if is_first_party(r[0])), key=lambda r: -r[1])
+    for module, self_us, cum_us, _ in own[:top]:
+        print(f"  {self_us / 1000.0:>8.1f} ms  {module}  (cumulative {cum_us / 1000.0:.1f} ms)")
+
+
+def check(results: Dict[str, float], budget: Dict[str, float]) -> List[str]:
+    """Figures over their limit"""
+    return [f"{key}: {results[key]:.1f} ms > {limit} ms"
+            for key, limit in budget.items() if key in results and results[key] > limit]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", default="eventlet", help="ASYNC_MODE of the measured worker")
+    parser.add_argument("--store", choices=["memory", "redis"], default="memory")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--repeat", type=int, default=3, help="cold builds; the best one counts")
+    parser.add_argument("--top", type=int, default=15, help="modules listed per table")
+    parser.add_argument("--budget", metavar="FILE", help="limits to enforce; exit 1 when one is exceeded")
+    parser.add_argument("--save", metavar="FILE", help="write the figures (times --headroom) as a budget")
+    parser.add_argument("--headroom", type=float, default=1.5)
+    parser.add_argument("--json", help="also write the figures and module table to this file")
+    args = parser.parse_args(argv)
+
+    env = _env(args.store, args.mode)
+    rows = measure_imports(env)
+    own = [r for r in rows if is_first_party(r[0])]
+    results = {
+        "build_ms": measure_build(env, args.repeat),
+        "first_party_ms": sum(r[1] for r in own) / 1000.0,
+        "module_ms": max((r[1] for r in own), default=0) / 1000.0,
+    }
+    results.update(measure_server(env, args.port))
+
+    report(rows, args.top)
+    print()
+    for key in KEYS:
+        print(f"{key:>16}: {results[key]:.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"mode": args.mode, "store": args.store, "results": results,
+                       "modules": [{"module": m, "self_us": s, "cumulative_us": c} for m, s, c, _ in rows]},
+                      f, indent=2)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({key: round(results[key] * args.headroom) for key in KEYS}, f, indent=2)
+            f.write("\n")
+        print(f"budget written to {args.save}")
+    if args.budget:
+        with open(args.budget, encoding="utf-8") as f:
+            budget = json.load(f)
+        over = check(results, budget)
+        if over:
+            print(f"{len(over)} over budget:")
+            for line in over:
+                print(f"  {line}")
+            return 1
+        print("within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())